@@ -0,0 +1,161 @@
+"""
+تقسيم وتطبيع النص العربي
+مرور واحد بتعبير منتظم مُجمَّع يُخرج الكلمات والجمل والفقرات مع مواضعها،
+ويتعامل مع علامات الترقيم العربية (؟ ؛ ،) والتطويل والتشكيل.
+تستخدمه جميع دوال التحليل حتى يُقسَّم النص مرة واحدة في كل طلب.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+# التشكيل (الفتحة إلى السكون، الحركات القرآنية، الألف الخنجرية) والتطويل
+DIACRITICS = '\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED'
+TATWEEL = '\u0640'
+
+# علامات نهاية الجملة (الفواصل العربية ، ؛ لا تنهي الجملة)
+SENTENCE_TERMINATORS = '.!?؟…'
+
+_DIACRITICS_RE = re.compile(f'[{DIACRITICS}{TATWEEL}]')
+_ALEF_VARIANTS_RE = re.compile('[إأآٱ]')
+
+# كلمة: حروف وأرقام مع ما يتخللها من تشكيل وتطويل وشرطة أو فاصلة عليا داخلية
+_SCANNER_RE = re.compile(
+    rf"(?P<word>[^\W_](?:[^\W_]|[{DIACRITICS}{TATWEEL}]|['’\-](?=[^\W_]))*)"
+    rf"|(?P<end>[{re.escape(SENTENCE_TERMINATORS)}]+)"
+    rf"|(?P<break>\n[ \t\r\f\v]*(?:\n[ \t\r\f\v]*)*)"
+)
+
+
+def strip_diacritics(text: str) -> str:
+    """إزالة التشكيل والتطويل"""
+    return _DIACRITICS_RE.sub('', text)
+
+
+def normalize_arabic(text: str, unify_alef: bool = False) -> str:
+    """تطبيع كلمة أو نص للمقارنة: إزالة التشكيل والتطويل وتوحيد حالة الأحرف"""
+    normalized = strip_diacritics(text).lower()
+    if unify_alef:
+        normalized = _ALEF_VARIANTS_RE.sub('ا', normalized)
+    return normalized
+
+
+@dataclass
+class Token:
+    """كلمة في النص مع موضعها وصيغتها المطبَّعة"""
+    text: str
+    normalized: str
+    start: int
+    end: int
+
+
+@dataclass
+class Span:
+    """مقطع من النص (جملة أو فقرة) مع نطاق كلماته"""
+    start: int
+    end: int
+    first_token: int
+    last_token: int  # غير شامل
+
+    @property
+    def word_count(self) -> int:
+        return self.last_token - self.first_token
+
+
+@dataclass
+class TextStructure:
+    """نتيجة تقسيم النص: الكلمات والجمل والفقرات"""
+    text: str
+    tokens: List[Token] = field(default_factory=list)
+    sentences: List[Span] = field(default_factory=list)
+    paragraphs: List[Span] = field(default_factory=list)
+    has_terminal_punctuation: bool = False
+
+    @property
+    def word_count(self) -> int:
+        return len(self.tokens)
+
+    @property
+    def sentence_count(self) -> int:
+        return len(self.sentences)
+
+    @property
+    def paragraph_count(self) -> int:
+        return len(self.paragraphs)
+
+    @property
+    def avg_words_per_sentence(self) -> float:
+        return self.word_count / max(self.sentence_count, 1)
+
+    @property
+    def avg_word_length(self) -> float:
+        if not self.tokens:
+            return 0.0
+        return sum(len(token.normalized) for token in self.tokens) / len(self.tokens)
+
+    @property
+    def unique_word_count(self) -> int:
+        return len({token.normalized for token in self.tokens})
+
+    @property
+    def vocabulary_diversity(self) -> float:
+        return self.unique_word_count / self.word_count if self.tokens else 0.0
+
+    def sentence_text(self, sentence: Span) -> str:
+        return self.text[sentence.start:sentence.end]
+
+
+def analyze_structure(text: str) -> TextStructure:
+    """تقسيم النص إلى كلمات وجمل وفقرات في مرور واحد"""
+    structure = TextStructure(text=text)
+    tokens = structure.tokens
+
+    sentence_start: Optional[int] = None
+    sentence_first = 0
+    paragraph_start: Optional[int] = None
+    paragraph_first = 0
+    last_end = 0
+
+    def close_sentence(end: int):
+        nonlocal sentence_start
+        if sentence_start is not None and len(tokens) > sentence_first:
+            structure.sentences.append(Span(sentence_start, end, sentence_first, len(tokens)))
+        sentence_start = None
+
+    def close_paragraph():
+        nonlocal paragraph_start
+        if paragraph_start is not None:
+            structure.paragraphs.append(Span(paragraph_start, last_end, paragraph_first, len(tokens)))
+        paragraph_start = None
+
+    for match in _SCANNER_RE.finditer(text):
+        kind = match.lastgroup
+        start, end = match.span()
+
+        if kind == 'word':
+            if sentence_start is None:
+                sentence_start, sentence_first = start, len(tokens)
+            if paragraph_start is None:
+                paragraph_start, paragraph_first = start, len(tokens)
+            word = match.group()
+            tokens.append(Token(word, normalize_arabic(word), start, end))
+            last_end = end
+
+        elif kind == 'end':
+            structure.has_terminal_punctuation = True
+            if sentence_start is not None:
+                last_end = end
+                close_sentence(end)
+
+        else:  # فاصل أسطر ينهي الجملة والفقرة
+            close_sentence(last_end)
+            close_paragraph()
+
+    close_sentence(last_end)
+    close_paragraph()
+    return structure
+
+
+def count_words(text: str) -> int:
+    """عدد الكلمات فقط دون بناء بنية النص كاملة"""
+    return sum(1 for match in _SCANNER_RE.finditer(text) if match.lastgroup == 'word')
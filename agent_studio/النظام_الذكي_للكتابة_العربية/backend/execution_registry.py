@@ -0,0 +1,347 @@
+"""
+سجل تنفيذات سير العمل ومنفّذها المحدود
+- منفّذ بعدد عمال ثابت وطابور محدود بدلاً من خيط جديد لكل تنفيذ
+- سجل حالات يحذف التنفيذات المنتهية بعد مدة صلاحية ويلتزم بحد أقصى للذاكرة
+- نقل النتائج الزائدة اختيارياً إلى SQLite أو Redis بدلاً من فقدانها
+- إلغاء حقيقي للمهمة الجارية داخل حلقة الأحداث الخاصة بها
+"""
+
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except ImportError:
+    REDIS_AVAILABLE = False
+
+
+# حالات التنفيذ
+STATUS_QUEUED = "queued"
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+STATUS_CANCELLED = "cancelled"
+
+FINISHED_STATUSES = {STATUS_COMPLETED, STATUS_FAILED, STATUS_CANCELLED}
+
+
+class ExecutorBusyError(Exception):
+    """الطابور ممتلئ ولا يمكن قبول تنفيذ جديد"""
+
+
+def _estimate_size(record: Dict[str, Any]) -> int:
+    """تقدير حجم السجل في الذاكرة بحجم تمثيله كـ JSON"""
+    return len(json.dumps(record, ensure_ascii=False, default=str).encode('utf-8'))
+
+
+# ================== مخازن النقل (Spill) ==================
+
+def _serialize_record(record: Dict[str, Any]) -> str:
+    """تمثيل السجل المنقول كـ JSON
+
+    القيم غير القابلة للتمثيل بـ JSON في النتيجة (تواريخ، كائنات...) تُحفظ بنصها str(value)
+    وتعود من المخزن نصوصاً لا كائناتها الأصلية.
+    """
+    return json.dumps(record, ensure_ascii=False, default=str)
+
+
+class SQLiteSpillStore:
+    """حفظ التنفيذات المنتهية في SQLite (بتمثيل _serialize_record)"""
+
+    def __init__(self, path: str, ttl_seconds: float):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS workflow_executions ("
+                "execution_id TEXT PRIMARY KEY, record TEXT NOT NULL, expires_at REAL NOT NULL)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        return sqlite3.connect(self.path, timeout=10)
+
+    def put(self, execution_id: str, record: Dict[str, Any]) -> None:
+        payload = _serialize_record(record)
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO workflow_executions VALUES (?, ?, ?)",
+                (execution_id, payload, time.time() + self.ttl_seconds)
+            )
+            conn.execute("DELETE FROM workflow_executions WHERE expires_at < ?", (time.time(),))
+
+    def get(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock, self._connect() as conn:
+            row = conn.execute(
+                "SELECT record FROM workflow_executions WHERE execution_id = ? AND expires_at >= ?",
+                (execution_id, time.time())
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+
+class RedisSpillStore:
+    """حفظ التنفيذات المنتهية في Redis مع انتهاء صلاحية تلقائي (بتمثيل _serialize_record)"""
+
+    def __init__(self, url: str, ttl_seconds: float, prefix: str = "workflow_execution:"):
+        self.client = redis.Redis.from_url(url)
+        self.ttl_seconds = int(ttl_seconds)
+        self.prefix = prefix
+
+    def put(self, execution_id: str, record: Dict[str, Any]) -> None:
+        payload = _serialize_record(record)
+        self.client.setex(self.prefix + execution_id, self.ttl_seconds, payload)
+
+    def get(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        payload = self.client.get(self.prefix + execution_id)
+        return json.loads(payload) if payload else None
+
+
+def create_spill_store(url: Optional[str], ttl_seconds: float):
+    """إنشاء مخزن النقل من عنوان مثل sqlite:///path.db أو redis://host:6379/0"""
+    if not url:
+        return None
+    if url.startswith("sqlite:///"):
+        return SQLiteSpillStore(url[len("sqlite:///"):], ttl_seconds)
+    if url.startswith(("redis://", "rediss://")):
+        if not REDIS_AVAILABLE:
+            print("⚠️ مكتبة redis غير متوفرة - سيتم تعطيل نقل نتائج سير العمل")
+            return None
+        return RedisSpillStore(url, ttl_seconds)
+    raise ValueError(f"عنوان مخزن غير مدعوم: {url}")
+
+
+# ================== سجل التنفيذات ==================
+
+class ExecutionRegistry:
+    """سجل حالات التنفيذ مع صلاحية زمنية وحد أقصى للحجم"""
+
+    def __init__(self, ttl_seconds: float = 3600, max_bytes: int = 64 * 1024 * 1024, spill_store=None):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.spill_store = spill_store
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._total_bytes = 0
+        self._lock = threading.Lock()
+
+    def create(self, execution_id: str) -> None:
+        # التنفيذات المنتهية التي لا يستعلم عنها أحد تُحذف هنا أيضاً لا عند get فقط
+        self._evict_expired()
+        self._put(execution_id, {
+            "status": STATUS_QUEUED,
+            "progress": None,
+            "created_at": time.time(),
+            "last_update": time.time()
+        })
+
+    def mark_running(self, execution_id: str) -> None:
+        self._update(execution_id, status=STATUS_RUNNING)
+
+    def update_progress(self, execution_id: str, progress: Dict[str, Any]) -> None:
+        self._update(execution_id, status=STATUS_RUNNING, progress=progress)
+
+    def _update(self, execution_id: str, **changes) -> None:
+        with self._lock:
+            record = self._records.get(execution_id)
+            if record is None or record["status"] in FINISHED_STATUSES:
+                return
+            record = dict(record, last_update=time.time(), **changes)
+            spilled = self._store(execution_id, record)
+        self._spill(spilled)
+
+    def finish(self, execution_id: str, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        with self._lock:
+            record = self._records.get(execution_id)
+            if record is None or record["status"] in FINISHED_STATUSES:
+                # لا تُستبدل حالة الإلغاء بنتيجة وصلت بعده
+                return
+            record = dict(record, status=status, last_update=time.time(), finished_at=time.time())
+            if result is not None:
+                record["result"] = result
+            if error is not None:
+                record["error"] = error
+            spilled = self._store(execution_id, record)
+        self._spill(spilled)
+
+    def get(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        self._evict_expired()
+        with self._lock:
+            record = self._records.get(execution_id)
+        if record is None and self.spill_store is not None:
+            try:
+                record = self.spill_store.get(execution_id)
+            except Exception as e:
+                print(f"⚠️ خطأ في قراءة التنفيذ من المخزن: {str(e)}")
+        return record
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_status: Dict[str, int] = {}
+            for record in self._records.values():
+                by_status[record["status"]] = by_status.get(record["status"], 0) + 1
+            return {
+                "entries": len(self._records),
+                "size_bytes": self._total_bytes,
+                "max_bytes": self.max_bytes,
+                "by_status": by_status,
+                "spill_enabled": self.spill_store is not None
+            }
+
+    def _put(self, execution_id: str, record: Dict[str, Any]) -> None:
+        with self._lock:
+            spilled = self._store(execution_id, record)
+        self._spill(spilled)
+
+    def _store(self, execution_id: str, record: Dict[str, Any]):
+        """حفظ السجل وإرجاع ما أُخرج بسبب الحجم (يُستدعى مع القفل)"""
+        size = _estimate_size(record)
+        self._total_bytes += size - self._sizes.get(execution_id, 0)
+        self._records[execution_id] = record
+        self._records.move_to_end(execution_id)
+        self._sizes[execution_id] = size
+        return self._enforce_size_limit()
+
+    def _enforce_size_limit(self):
+        """إخراج أقدم التنفيذات المنتهية حتى يعود الحجم تحت الحد (يُستدعى مع القفل)"""
+        spilled = []
+        for execution_id in list(self._records):
+            if self._total_bytes <= self.max_bytes:
+                break
+            record = self._records[execution_id]
+            if record["status"] not in FINISHED_STATUSES:
+                continue
+            spilled.append((execution_id, self._pop(execution_id)))
+        return spilled
+
+    def _evict_expired(self) -> None:
+        now = time.time()
+        with self._lock:
+            expired = [
+                execution_id for execution_id, record in self._records.items()
+                if record["status"] in FINISHED_STATUSES
+                and now - record.get("finished_at", record["last_update"]) > self.ttl_seconds
+            ]
+            for execution_id in expired:
+                self._pop(execution_id)
+
+    def _pop(self, execution_id: str) -> Dict[str, Any]:
+        self._total_bytes -= self._sizes.pop(execution_id, 0)
+        return self._records.pop(execution_id)
+
+    def _spill(self, spilled) -> None:
+        if self.spill_store is None:
+            return
+        for execution_id, record in spilled:
+            try:
+                self.spill_store.put(execution_id, record)
+            except Exception as e:
+                print(f"⚠️ خطأ في نقل التنفيذ {execution_id} إلى المخزن: {str(e)}")
+
+
+# ================== المنفّذ المحدود ==================
+
+class WorkflowExecutor:
+    """تشغيل تنفيذات سير العمل على عدد ثابت من العمال مع إمكانية الإلغاء"""
+
+    def __init__(self, registry: ExecutionRegistry, max_workers: int = 4, max_queued: int = 32):
+        self.registry = registry
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="workflow")
+        self._local = threading.local()
+        self._tasks: Dict[str, "asyncio.Task"] = {}
+        self._cancel_requested = set()
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, execution_id: str, coroutine_factory: Callable[[], Awaitable[Any]]) -> None:
+        """إضافة تنفيذ إلى الطابور؛ يرفع ExecutorBusyError عند امتلاء الطابور"""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queued:
+                raise ExecutorBusyError("عدد تنفيذات سير العمل الجارية بلغ الحد الأقصى")
+            self._pending += 1
+        self.registry.create(execution_id)
+        self._pool.submit(self._run, execution_id, coroutine_factory)
+
+    def cancel(self, execution_id: str) -> bool:
+        """إلغاء تنفيذ في الطابور أو قيد التشغيل"""
+        record = self.registry.get(execution_id)
+        if record is None or record["status"] in FINISHED_STATUSES:
+            return False
+
+        with self._lock:
+            self._cancel_requested.add(execution_id)
+            task = self._tasks.get(execution_id)
+        if task is not None:
+            task.get_loop().call_soon_threadsafe(task.cancel)
+        self.registry.finish(execution_id, STATUS_CANCELLED)
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queued": self.max_queued,
+                "running": len(self._tasks),
+                "pending": self._pending
+            }
+
+    def _worker_loop(self) -> asyncio.AbstractEventLoop:
+        # حلقة واحدة لكل عامل تُعاد لكل التنفيذات بدلاً من إنشائها في كل مرة
+        loop = getattr(self._local, "loop", None)
+        if loop is None:
+            loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(loop)
+            self._local.loop = loop
+        return loop
+
+    def _run(self, execution_id: str, coroutine_factory: Callable[[], Awaitable[Any]]) -> None:
+        try:
+            with self._lock:
+                if execution_id in self._cancel_requested:
+                    return
+            self.registry.mark_running(execution_id)
+            loop = self._worker_loop()
+            task = loop.create_task(coroutine_factory())
+            with self._lock:
+                self._tasks[execution_id] = task
+                cancelled_meanwhile = execution_id in self._cancel_requested
+            if cancelled_meanwhile:
+                task.cancel()
+
+            try:
+                result = loop.run_until_complete(task)
+                self.registry.finish(execution_id, STATUS_COMPLETED, result=result)
+            except asyncio.CancelledError:
+                self.registry.finish(execution_id, STATUS_CANCELLED)
+            except Exception as e:
+                print(f"خطأ في تنفيذ سير العمل: {str(e)}")
+                self.registry.finish(execution_id, STATUS_FAILED, error=str(e))
+        finally:
+            with self._lock:
+                self._tasks.pop(execution_id, None)
+                self._cancel_requested.discard(execution_id)
+                self._pending -= 1
+
+
+def create_workflow_executor_from_env() -> WorkflowExecutor:
+    """إنشاء المنفّذ والسجل من متغيرات البيئة"""
+    ttl_seconds = float(os.getenv('WORKFLOW_RESULT_TTL_SECONDS', 3600))
+    registry = ExecutionRegistry(
+        ttl_seconds=ttl_seconds,
+        max_bytes=int(os.getenv('WORKFLOW_REGISTRY_MAX_BYTES', 64 * 1024 * 1024)),
+        spill_store=create_spill_store(os.getenv('WORKFLOW_RESULT_SPILL_URL'), ttl_seconds)
+    )
+    return WorkflowExecutor(
+        registry,
+        max_workers=int(os.getenv('WORKFLOW_MAX_WORKERS', 4)),
+        max_queued=int(os.getenv('WORKFLOW_MAX_QUEUED', 32))
+    )
@@ -0,0 +1,63 @@
+"""
+مطابقة متعددة الأنماط للمعاجم (مشاعر، أسلوب، مفردات)
+تُبنى شجرة بادئات (Trie) من كلمات المعجم وتُحوَّل إلى تعبير منتظم واحد مُجمَّع،
+فيُمسح النص مرة واحدة مهما كبر المعجم، بدلاً من تكرار replace أو البحث لكل مدخل.
+التطابق يبدأ من أقصى اليسار ويأخذ أطول مدخل ممكن عند كل موضع.
+"""
+
+import re
+from typing import Any, Dict, Iterator, Mapping, Tuple
+
+
+def _trie_to_regex(node: Dict[str, Any]) -> str:
+    """تحويل شجرة البادئات إلى تعبير منتظم يفضّل أطول تطابق"""
+    is_terminal = '' in node
+    branches = []
+    for char in sorted(key for key in node if key):
+        branches.append(re.escape(char) + _trie_to_regex(node[char]))
+
+    if not branches:
+        return ''
+    if len(branches) == 1:
+        body = branches[0]
+    else:
+        body = '(?:' + '|'.join(branches) + ')'
+    # المتابعة الاختيارية تأتي قبل الانتهاء لأن الكمّ ? جشع (الأطول أولاً)
+    if is_terminal:
+        return '(?:' + body + ')?'
+    return body
+
+
+class LexiconMatcher:
+    """معجم مُجمَّع: مدخل -> قيمة (بديل نصي أو تصنيف)"""
+
+    def __init__(self, entries: Mapping[str, Any]):
+        self.entries = {key: value for key, value in entries.items() if key}
+        trie: Dict[str, Any] = {}
+        for key in self.entries:
+            node = trie
+            for char in key:
+                node = node.setdefault(char, {})
+            node[''] = True
+        self.pattern = re.compile(_trie_to_regex(trie)) if trie else None
+
+    def finditer(self, text: str) -> Iterator[Tuple[int, int, str, Any]]:
+        """التطابقات غير المتداخلة: (البداية، النهاية، المدخل، القيمة)"""
+        if self.pattern is None:
+            return
+        for match in self.pattern.finditer(text):
+            key = match.group()
+            yield match.start(), match.end(), key, self.entries[key]
+
+    def replace(self, text: str) -> str:
+        """استبدال كل المدخلات بقيمها في مرور واحد"""
+        if self.pattern is None:
+            return text
+        return self.pattern.sub(lambda match: self.entries[match.group()], text)
+
+    def categories(self, text: str) -> set:
+        """مجموعة القيم التي ظهرت مدخلاتها في النص"""
+        return {value for _, _, _, value in self.finditer(text)}
+
+    def __len__(self) -> int:
+        return len(self.entries)
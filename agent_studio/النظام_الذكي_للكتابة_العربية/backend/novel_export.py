@@ -0,0 +1,414 @@
+"""
+محرك تصدير الرواية
+TXT و JSON يُنتجان كمولّد يُرسل للعميل على دفعات دون بناء النص كاملاً،
+و DOCX و EPUB يُكتبان فصلاً فصلاً مباشرة داخل أرشيف zip في ملف مؤقت
+(في الذاكرة حتى حد معين ثم على القرص) ثم يُرسل الملف على دفعات.
+كاتب DOCX هنا يكتب WordprocessingML مباشرة بدلاً من python-docx الذي يبني المستند كاملاً في الذاكرة.
+"""
+
+import json
+import re
+import tempfile
+import uuid
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from xml.sax.saxutils import escape
+
+# الصيغة -> (نوع المحتوى، امتداد الملف)
+EXPORT_FORMATS: Dict[str, Tuple[str, str]] = {
+    'txt': ('text/plain; charset=utf-8', 'txt'),
+    'json': ('application/json; charset=utf-8', 'json'),
+    'docx': ('application/vnd.openxmlformats-officedocument.wordprocessingml.document', 'docx'),
+    'epub': ('application/epub+zip', 'epub')
+}
+
+CHUNK_SIZE = 64 * 1024
+SPOOL_MEMORY_LIMIT = 8 * 1024 * 1024
+
+# محارف تحكم غير مسموحة في XML
+_INVALID_XML_RE = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+@dataclass
+class NovelExport:
+    """محتوى التصدير كما يصل من الواجهة"""
+    chapters: List[Any]
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    include_analysis: bool = False
+    quality_report: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def has_report(self) -> bool:
+        return bool(self.include_analysis and self.quality_report)
+
+
+def chapter_text(chapter: Any) -> str:
+    if isinstance(chapter, dict):
+        return chapter.get('content', str(chapter))
+    return str(chapter)
+
+
+def _xml(text: Any) -> str:
+    return escape(_INVALID_XML_RE.sub('', str(text)))
+
+
+def _chunked(pieces: Iterable[str], chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    """تجميع القطع النصية الصغيرة في دفعات بايت بحجم معقول"""
+    buffer: List[bytes] = []
+    size = 0
+    for piece in pieces:
+        data = piece.encode('utf-8')
+        buffer.append(data)
+        size += len(data)
+        if size >= chunk_size:
+            yield b''.join(buffer)
+            buffer = []
+            size = 0
+    if buffer:
+        yield b''.join(buffer)
+
+
+def _report_lines(report: Dict[str, Any]) -> Iterator[Tuple[str, Optional[List[str]]]]:
+    """أقسام تقرير الجودة: (العنوان، البنود أو None لسطر منفرد)"""
+    if "overall_quality" in report:
+        yield f"الجودة الإجمالية: {report['overall_quality']}%", None
+    if "strengths" in report:
+        yield "نقاط القوة:", [str(item) for item in report['strengths']]
+    if "improvements" in report:
+        yield "نقاط التحسين:", [str(item) for item in report['improvements']]
+
+
+# ================== TXT و JSON ==================
+
+def iter_txt(export: NovelExport) -> Iterator[str]:
+    metadata = export.metadata
+    if metadata:
+        yield f"عنوان الرواية: {metadata.get('title', 'غير محدد')}\n"
+        yield f"الوصف: {metadata.get('description', 'غير محدد')}\n"
+        yield f"تاريخ الإنشاء: {metadata.get('created_at', 'غير محدد')}\n"
+        yield f"عدد الفصول: {len(export.chapters)}\n"
+        yield "\n" + "=" * 50 + "\n\n"
+
+    for i, chapter in enumerate(export.chapters, 1):
+        yield f"الفصل {i}\n" + "-" * 20 + "\n\n"
+        yield chapter_text(chapter)
+        yield "\n\n"
+
+    if export.has_report:
+        yield "\n" + "=" * 50 + "\n" + "تقرير الجودة والتحليل\n" + "=" * 50 + "\n\n"
+        for title, items in _report_lines(export.quality_report):
+            if items is None:
+                yield f"{title}\n\n"
+                continue
+            yield f"{title}\n"
+            for item in items:
+                yield f"• {item}\n"
+            yield "\n"
+
+
+def iter_json(export: NovelExport) -> Iterator[str]:
+    """JSON يُكتب فصلاً فصلاً؛ عدد الكلمات يُجمع أثناء المرور ويُكتب في النهاية"""
+    dumps = lambda value: json.dumps(value, ensure_ascii=False)
+    yield '{\n  "metadata": ' + dumps(export.metadata) + ',\n  "chapters": ['
+    total_words = 0
+    for i, chapter in enumerate(export.chapters):
+        total_words += len(str(chapter).split())
+        yield (',\n    ' if i else '\n    ') + dumps(chapter)
+    yield '\n  ],\n'
+    yield '  "quality_report": ' + dumps(export.quality_report if export.include_analysis else None) + ',\n'
+    yield '  "export_date": ' + dumps(datetime.now().isoformat()) + ',\n'
+    yield '  "total_words": ' + dumps(total_words) + '\n}\n'
+
+
+# ================== DOCX ==================
+
+_DOCX_CONTENT_TYPES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/word/document.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+    '<Override PartName="/word/styles.xml" '
+    'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>'
+    '</Types>'
+)
+
+_DOCX_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+    'Target="word/document.xml"/>'
+    '</Relationships>'
+)
+
+_DOCX_DOCUMENT_RELS = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" '
+    'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" '
+    'Target="styles.xml"/>'
+    '</Relationships>'
+)
+
+_DOCX_STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    '<w:styles xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+    '<w:docDefaults><w:rPrDefault><w:rPr><w:rtl/><w:sz w:val="28"/><w:szCs w:val="28"/>'
+    '<w:lang w:bidi="ar-SA"/></w:rPr></w:rPrDefault>'
+    '<w:pPrDefault><w:pPr><w:bidi/><w:spacing w:after="160"/></w:pPr></w:pPrDefault></w:docDefaults>'
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal"><w:name w:val="Normal"/></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Title"><w:name w:val="Title"/><w:basedOn w:val="Normal"/>'
+    '<w:rPr><w:b/><w:bCs/><w:sz w:val="56"/><w:szCs w:val="56"/></w:rPr></w:style>'
+    '<w:style w:type="paragraph" w:styleId="Heading1"><w:name w:val="heading 1"/><w:basedOn w:val="Normal"/>'
+    '<w:pPr><w:keepNext/><w:outlineLvl w:val="0"/></w:pPr>'
+    '<w:rPr><w:b/><w:bCs/><w:sz w:val="36"/><w:szCs w:val="36"/></w:rPr></w:style>'
+    '</w:styles>'
+)
+
+_DOCX_PAGE_BREAK = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+
+def _docx_paragraph(runs: Iterable[Tuple[str, bool]], style: Optional[str] = None,
+                    align: Optional[str] = None) -> str:
+    """فقرة من مقاطع (النص، عريض؛ الأسطر داخل المقطع تصبح فواصل أسطر)"""
+    properties = ''
+    if style:
+        properties += f'<w:pStyle w:val="{style}"/>'
+    properties += '<w:bidi/>'
+    if align:
+        properties += f'<w:jc w:val="{align}"/>'
+
+    parts = [f'<w:p><w:pPr>{properties}</w:pPr>']
+    for text, bold in runs:
+        run_properties = '<w:rPr><w:b/><w:bCs/><w:rtl/></w:rPr>' if bold else '<w:rPr><w:rtl/></w:rPr>'
+        lines = text.split('\n')
+        for index, line in enumerate(lines):
+            if index:
+                parts.append(f'<w:r>{run_properties}<w:br/></w:r>')
+            if line:
+                parts.append(f'<w:r>{run_properties}<w:t xml:space="preserve">{_xml(line)}</w:t></w:r>')
+    parts.append('</w:p>')
+    return ''.join(parts)
+
+
+def _iter_docx_body(export: NovelExport) -> Iterator[str]:
+    metadata = export.metadata
+    if metadata and 'title' in metadata:
+        yield _docx_paragraph([(str(metadata['title']), False)], style='Title', align='center')
+
+    if metadata:
+        runs = []
+        if 'author' in metadata:
+            runs.append((f"المؤلف: {metadata['author']}\n", True))
+        if 'description' in metadata:
+            runs.append((f"الوصف: {metadata['description']}\n", False))
+        if 'total_words' in metadata:
+            try:
+                runs.append((f"عدد الكلمات: {int(metadata['total_words']):,}\n", False))
+            except (TypeError, ValueError):
+                runs.append((f"عدد الكلمات: {metadata['total_words']}\n", False))
+        if 'chapters' in metadata:
+            runs.append((f"عدد الفصول: {metadata['chapters']}\n", False))
+        yield _docx_paragraph(runs)
+
+    yield _docx_paragraph([("=" * 50, False)])
+    yield _DOCX_PAGE_BREAK
+
+    for i, chapter in enumerate(export.chapters, 1):
+        yield _docx_paragraph([(f"الفصل {i}", False)], style='Heading1')
+        for paragraph in chapter_text(chapter).split('\n'):
+            if paragraph.strip():
+                yield _docx_paragraph([(paragraph, False)], align='both')
+        if i < len(export.chapters):
+            yield _DOCX_PAGE_BREAK
+
+    if export.has_report:
+        yield _DOCX_PAGE_BREAK
+        yield _docx_paragraph([("تقرير الجودة والتحليل", False)], style='Heading1')
+        for title, items in _report_lines(export.quality_report):
+            if items is None:
+                yield _docx_paragraph([(title, False)])
+            else:
+                yield _docx_paragraph([(f"{title}\n", True)] + [(f"• {item}\n", False) for item in items])
+
+
+def write_docx(export: NovelExport, fileobj) -> None:
+    """كتابة مستند Word فصلاً فصلاً داخل الأرشيف"""
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', _DOCX_CONTENT_TYPES)
+        archive.writestr('_rels/.rels', _DOCX_RELS)
+        archive.writestr('word/_rels/document.xml.rels', _DOCX_DOCUMENT_RELS)
+        archive.writestr('word/styles.xml', _DOCX_STYLES)
+        with archive.open('word/document.xml', 'w') as document:
+            document.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"><w:body>'
+            )
+            for chunk in _chunked(_iter_docx_body(export)):
+                document.write(chunk)
+            document.write(
+                b'<w:sectPr><w:bidi/><w:pgSz w:w="11906" w:h="16838"/>'
+                b'<w:pgMar w:top="1440" w:right="1440" w:bottom="1440" w:left="1440"/></w:sectPr>'
+                b'</w:body></w:document>'
+            )
+
+
+# ================== EPUB ==================
+
+_EPUB_CONTAINER = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<container version="1.0" xmlns="urn:oasis:names:tc:opendocument:xmlns:container">'
+    '<rootfiles><rootfile full-path="OEBPS/content.opf" media-type="application/oebps-package+xml"/>'
+    '</rootfiles></container>'
+)
+
+_EPUB_STYLES = (
+    'body { direction: rtl; text-align: justify; line-height: 1.8; }\n'
+    'h1 { text-align: center; }\n'
+    'p { margin: 0 0 0.8em 0; }\n'
+)
+
+
+def _xhtml_page(title: str, body: str) -> str:
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>\n<!DOCTYPE html>\n'
+        '<html xmlns="http://www.w3.org/1999/xhtml" xmlns:epub="http://www.idpf.org/2007/ops" '
+        'xml:lang="ar" lang="ar" dir="rtl">'
+        f'<head><meta charset="utf-8"/><title>{_xml(title)}</title>'
+        '<link rel="stylesheet" type="text/css" href="styles.css"/></head>'
+        f'<body>{body}</body></html>'
+    )
+
+
+def _xhtml_paragraphs(text: str) -> str:
+    return ''.join(f'<p>{_xml(line)}</p>' for line in text.split('\n') if line.strip())
+
+
+def write_epub(export: NovelExport, fileobj) -> None:
+    """كتابة كتاب EPUB 3 (فصل لكل ملف XHTML) بترتيب قراءة من اليمين لليسار"""
+    metadata = export.metadata
+    book_title = str(metadata.get('title') or 'رواية')
+    # (المعرف، اسم الملف، العنوان في الفهرس)
+    documents: List[Tuple[str, str, str]] = []
+
+    with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as archive:
+        # ملف mimetype يجب أن يكون أولاً وبدون ضغط
+        archive.writestr(zipfile.ZipInfo('mimetype'), 'application/epub+zip', compress_type=zipfile.ZIP_STORED)
+        archive.writestr('META-INF/container.xml', _EPUB_CONTAINER)
+        archive.writestr('OEBPS/styles.css', _EPUB_STYLES)
+
+        if metadata:
+            lines = [f'<h1>{_xml(book_title)}</h1>']
+            if 'author' in metadata:
+                lines.append(f'<p><strong>المؤلف: {_xml(metadata["author"])}</strong></p>')
+            if 'description' in metadata:
+                lines.append(f'<p>{_xml(metadata["description"])}</p>')
+            archive.writestr('OEBPS/title.xhtml', _xhtml_page(book_title, ''.join(lines)))
+            documents.append(('title', 'title.xhtml', book_title))
+
+        for i, chapter in enumerate(export.chapters, 1):
+            heading = f"الفصل {i}"
+            if isinstance(chapter, dict) and chapter.get('title'):
+                heading = f"{heading}: {chapter['title']}"
+            name = f'chapter_{i:04d}.xhtml'
+            body = f'<section epub:type="chapter"><h1>{_xml(heading)}</h1>{_xhtml_paragraphs(chapter_text(chapter))}</section>'
+            archive.writestr(f'OEBPS/{name}', _xhtml_page(heading, body))
+            documents.append((f'chapter_{i:04d}', name, heading))
+
+        if export.has_report:
+            parts = ['<h1>تقرير الجودة والتحليل</h1>']
+            for title, items in _report_lines(export.quality_report):
+                if items is None:
+                    parts.append(f'<p>{_xml(title)}</p>')
+                    continue
+                parts.append(f'<p><strong>{_xml(title)}</strong></p>')
+                if items:
+                    parts.append('<ul>' + ''.join(f'<li>{_xml(item)}</li>' for item in items) + '</ul>')
+            archive.writestr('OEBPS/report.xhtml', _xhtml_page("تقرير الجودة والتحليل", ''.join(parts)))
+            documents.append(('report', 'report.xhtml', "تقرير الجودة والتحليل"))
+
+        nav_items = ''.join(f'<li><a href="{name}">{_xml(label)}</a></li>' for _, name, label in documents)
+        archive.writestr('OEBPS/nav.xhtml', _xhtml_page(
+            book_title, f'<nav epub:type="toc" id="toc"><h1>المحتويات</h1><ol>{nav_items}</ol></nav>'
+        ))
+
+        modified = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%SZ')
+        creator = f'<dc:creator>{_xml(metadata["author"])}</dc:creator>' if 'author' in metadata else ''
+        manifest = ''.join(
+            f'<item id="{item_id}" href="{name}" media-type="application/xhtml+xml"/>'
+            for item_id, name, _ in documents
+        )
+        spine = ''.join(f'<itemref idref="{item_id}"/>' for item_id, _, _ in documents)
+        archive.writestr('OEBPS/content.opf', (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<package xmlns="http://www.idpf.org/2007/opf" version="3.0" unique-identifier="book-id" '
+            'xml:lang="ar" dir="rtl">'
+            '<metadata xmlns:dc="http://purl.org/dc/elements/1.1/">'
+            f'<dc:identifier id="book-id">urn:uuid:{uuid.uuid4()}</dc:identifier>'
+            f'<dc:title>{_xml(book_title)}</dc:title><dc:language>ar</dc:language>{creator}'
+            f'<meta property="dcterms:modified">{modified}</meta>'
+            '</metadata><manifest>'
+            '<item id="nav" href="nav.xhtml" media-type="application/xhtml+xml" properties="nav"/>'
+            '<item id="css" href="styles.css" media-type="text/css"/>'
+            f'{manifest}</manifest>'
+            f'<spine page-progression-direction="rtl">{spine}</spine></package>'
+        ))
+
+
+# ================== الإرسال ==================
+
+_ARCHIVE_WRITERS = {'docx': write_docx, 'epub': write_epub}
+
+
+def _iter_file(fileobj, chunk_size: int = CHUNK_SIZE) -> Iterator[bytes]:
+    try:
+        fileobj.seek(0)
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+def write_export(export: NovelExport, export_format: str, fileobj) -> None:
+    """كتابة ملف التصدير كاملاً في ملف مفتوح للكتابة الثنائية"""
+    writer = _ARCHIVE_WRITERS.get(export_format)
+    if writer is not None:
+        writer(export, fileobj)
+        return
+    pieces = {'txt': iter_txt, 'json': iter_json}.get(export_format)
+    if pieces is None:
+        raise ValueError(f"صيغة التصدير غير مدعومة: {export_format}")
+    for chunk in _chunked(pieces(export)):
+        fileobj.write(chunk)
+
+
+def stream_export(export: NovelExport, export_format: str,
+                  spool_memory_limit: int = SPOOL_MEMORY_LIMIT) -> Iterator[bytes]:
+    """دفعات البايت لملف التصدير
+
+    TXT و JSON تُولَّد أثناء الإرسال. DOCX و EPUB تُكتب كاملة في ملف مؤقت
+    قبل الإرجاع حتى تظهر أخطاء الكتابة قبل بدء الاستجابة.
+    """
+    if export_format == 'txt':
+        return _chunked(iter_txt(export))
+    if export_format == 'json':
+        return _chunked(iter_json(export))
+
+    writer = _ARCHIVE_WRITERS.get(export_format)
+    if writer is None:
+        raise ValueError(f"صيغة التصدير غير مدعومة: {export_format}")
+
+    spool = tempfile.SpooledTemporaryFile(max_size=spool_memory_limit)
+    try:
+        writer(export, spool)
+    except BaseException:
+        spool.close()
+        raise
+    return _iter_file(spool)
@@ -0,0 +1,206 @@
+"""
+محرك استخراج نص PDF بالتوازي
+تُقسَّم الصفحات إلى مجموعات وتوزَّع على مجمّع عمليات، وتُجمع النتائج في قائمة
+بترتيب الصفحات ثم تُضم مرة واحدة (بدلاً من += المتكرر)، مع إبلاغ عن التقدم لكل صفحة.
+الملفات الصغيرة تُعالج في العملية نفسها لأن كلفة توزيعها أكبر من فائدته.
+العمليات العاملة تُنشأ بطريقة spawn (لا نسخ لخيوط الخادم وأقفاله بـ fork)، وتفتح الملف
+بمساره؛ البيانات المرفوعة في الذاكرة تُكتب أولاً إلى ملف مؤقت بدلاً من إرسالها لكل مجموعة.
+نسخة مطابقة من الوحدة في خادم Flask (agent_studio و dancing_ui) لأن لكل خادم جذر استيراد
+مستقلاً؛ أي تعديل يُنسخ إلى النسخ كلها، واختبار في backend/tests يكشف اختلافها.
+"""
+
+import io
+import multiprocessing
+import os
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+try:
+    from pypdf import PdfReader
+    PDF_READER_AVAILABLE = True
+except ImportError:
+    try:
+        from PyPDF2 import PdfReader
+        PDF_READER_AVAILABLE = True
+    except ImportError:
+        PDF_READER_AVAILABLE = False
+
+# مصدر PDF: مسار ملف أو بياناته
+PDFSource = Union[str, os.PathLike, bytes]
+
+# دالة التقدم: (رقم الصفحة، عدد الصفحات المنجزة، العدد الكلي)
+ProgressCallback = Callable[[int, int, int], None]
+
+
+@dataclass
+class PDFExtraction:
+    """نتيجة الاستخراج"""
+    page_texts: List[str] = field(default_factory=list)
+    page_errors: Dict[int, str] = field(default_factory=dict)
+    parallel: bool = False
+
+    @property
+    def pages_count(self) -> int:
+        return len(self.page_texts)
+
+    @property
+    def text(self) -> str:
+        return "\n".join(self.page_texts)
+
+
+def _open_reader(source: PDFSource) -> "PdfReader":
+    if not PDF_READER_AVAILABLE:
+        raise RuntimeError("مكتبة قراءة PDF غير متوفرة (pypdf أو PyPDF2)")
+    if isinstance(source, (bytes, bytearray)):
+        return PdfReader(io.BytesIO(source))
+    return PdfReader(os.fspath(source))
+
+
+def _extract_page_range(source: PDFSource, start: int, end: int) -> List[Tuple[int, str, Optional[str]]]:
+    """استخراج الصفحات [start, end) داخل عملية عاملة"""
+    reader = _open_reader(source)
+    pages = []
+    for index in range(start, end):
+        try:
+            pages.append((index, reader.pages[index].extract_text() or "", None))
+        except Exception as e:
+            pages.append((index, "", str(e)))
+    return pages
+
+
+class PDFIngestionEngine:
+    """استخراج صفحات PDF على مجمّع عمليات مع الحفاظ على الترتيب"""
+
+    def __init__(self, max_workers: Optional[int] = None, pages_per_shard: int = 16,
+                 min_pages_for_pool: int = 24):
+        self.max_workers = max_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.pages_per_shard = pages_per_shard
+        self.min_pages_for_pool = min_pages_for_pool
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'))
+            return self._pool
+
+    def _reset_pool(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def page_count(self, source: PDFSource) -> int:
+        return len(_open_reader(source).pages)
+
+    def uses_pool(self, total_pages: int) -> bool:
+        """هل يستحق الملف توزيعه على مجمّع العمليات"""
+        return total_pages >= self.min_pages_for_pool and self.max_workers >= 2
+
+    def iter_pages(self, source: PDFSource,
+                   progress_callback: Optional[ProgressCallback] = None,
+                   extraction: Optional[PDFExtraction] = None) -> Iterator[Tuple[int, str, Optional[str]]]:
+        """إرجاع (رقم الصفحة، النص، الخطأ) بترتيب الصفحات فور جاهزية كل صفحة
+
+        extraction.parallel (إن مُرِّرت) يصبح True فقط إذا وُزِّعت الصفحات فعلاً على العمليات.
+        """
+        total = self.page_count(source)
+        done = 0
+
+        def report(page_index: int):
+            nonlocal done
+            done += 1
+            if progress_callback:
+                progress_callback(page_index + 1, done, total)
+
+        if not self.uses_pool(total):
+            for page in _extract_page_range(source, 0, total):
+                report(page[0])
+                yield page
+            return
+
+        spooled_path = None
+        if isinstance(source, (bytes, bytearray)):
+            with tempfile.NamedTemporaryFile(prefix='pdf_', suffix='.pdf', delete=False) as spooled:
+                spooled.write(source)
+            source = spooled_path = spooled.name
+
+        shards = [(start, min(start + self.pages_per_shard, total))
+                  for start in range(0, total, self.pages_per_shard)]
+        futures = {}
+        try:
+            try:
+                pool = self._get_pool()
+                futures = {pool.submit(_extract_page_range, source, start, end): start for start, end in shards}
+            except (BrokenProcessPool, OSError, RuntimeError):
+                # بيئة لا تسمح بإنشاء عمليات: استخراج تسلسلي
+                self._reset_pool()
+                for page in _extract_page_range(source, 0, total):
+                    report(page[0])
+                    yield page
+                return
+
+            if extraction is not None:
+                extraction.parallel = True
+            # المجموعات تكتمل بأي ترتيب، وتُرسل الصفحات بالترتيب عند اكتمال ما قبلها
+            ready: Dict[int, List[Tuple[int, str, Optional[str]]]] = {}
+            next_shard = 0
+            for future in as_completed(futures):
+                shard_start = futures[future]
+                pages = future.result()
+                for page in pages:
+                    report(page[0])
+                ready[shard_start] = pages
+
+                while next_shard < len(shards) and shards[next_shard][0] in ready:
+                    yield from ready.pop(shards[next_shard][0])
+                    next_shard += 1
+        except BrokenProcessPool:
+            self._reset_pool()
+            raise
+        finally:
+            for future in futures:
+                future.cancel()
+            if spooled_path is not None:
+                # نتائج أي مجموعة ما زالت تعمل بعد الإلغاء لم تعد مطلوبة
+                try:
+                    os.remove(spooled_path)
+                except OSError:
+                    pass
+
+    def extract(self, source: PDFSource,
+                progress_callback: Optional[ProgressCallback] = None) -> PDFExtraction:
+        """استخراج كل الصفحات وإرجاعها مرتبة"""
+        result = PDFExtraction()
+        for index, text, error in self.iter_pages(source, progress_callback, result):
+            result.page_texts.append(text)
+            if error:
+                result.page_errors[index + 1] = error
+        return result
+
+    def extract_text(self, source: PDFSource,
+                     progress_callback: Optional[ProgressCallback] = None) -> str:
+        return self.extract(source, progress_callback).text
+
+
+_engine: Optional[PDFIngestionEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_pdf_ingestion_engine() -> PDFIngestionEngine:
+    """محرك مشترك على مستوى العملية (مجمّع عمليات واحد)"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = PDFIngestionEngine(
+                max_workers=int(os.getenv('PDF_INGESTION_WORKERS', 0)) or None,
+                pages_per_shard=int(os.getenv('PDF_INGESTION_PAGES_PER_SHARD', 16)),
+                min_pages_for_pool=int(os.getenv('PDF_INGESTION_MIN_PAGES_FOR_POOL', 24))
+            )
+        return _engine
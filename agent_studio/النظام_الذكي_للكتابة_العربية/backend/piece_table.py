@@ -0,0 +1,222 @@
+"""
+نموذج المستند بجدول القطع (Piece Table)
+النص الأصلي لا يُنسخ عند التعديل؛ كل تعديل يضيف قطعة جديدة ويقسم القطع المحيطة،
+فتكون تكلفة التعديل متناسبة مع عدد القطع لا مع طول الفصل.
+التعديلات تُطبَّق بالمواضع (start/end) فرادى أو دفعة واحدة، ويُعاد النطاق المتغير فقط.
+"""
+
+import bisect
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# (النص المصدر، بداية القطعة، طولها)
+Piece = Tuple[str, int, int]
+
+
+class EditConflictError(ValueError):
+    """تعديلات متداخلة أو خارج حدود المستند أو مبنية على نسخة قديمة"""
+
+
+class PieceTable:
+    """نص قابل للتعديل بالمواضع دون إعادة بناء النص كاملاً"""
+
+    # عند تجاوز هذا العدد من القطع يُدمج النص في قطعة واحدة
+    COMPACT_THRESHOLD = 2048
+
+    def __init__(self, text: str = ''):
+        self._pieces: List[Piece] = [(text, 0, len(text))] if text else []
+        self._starts: List[int] = [0] if text else []
+        self._length = len(text)
+        self.version = 0
+
+    def __len__(self) -> int:
+        return self._length
+
+    def get_text(self, start: int = 0, end: Optional[int] = None) -> str:
+        """نص المستند أو جزء منه"""
+        end = self._length if end is None else end
+        if not 0 <= start <= end <= self._length:
+            raise EditConflictError(f"نطاق خارج حدود المستند: {start}-{end} من {self._length}")
+        if start == end:
+            return ''
+
+        parts = []
+        index = self._piece_index(start)
+        while index < len(self._pieces) and self._starts[index] < end:
+            source, offset, length = self._pieces[index]
+            piece_start = self._starts[index]
+            lo = max(start, piece_start) - piece_start
+            hi = min(end, piece_start + length) - piece_start
+            parts.append(source[offset + lo:offset + hi])
+            index += 1
+        return ''.join(parts)
+
+    def replace(self, start: int, end: int, text: str) -> Dict[str, Any]:
+        """استبدال النطاق [start, end) بالنص وإرجاع النطاق المتغير"""
+        return self.apply_edits([{'start': start, 'end': end, 'text': text}])[0]
+
+    def apply_edits(self, edits: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """تطبيق عدة تعديلات مواضعها محسوبة على النص قبل الدفعة
+
+        تُطبَّق من الأخير إلى الأول حتى لا تنزاح مواضع التعديلات السابقة،
+        وتُعاد النطاقات المتغيرة بمواضعها في النص بعد الدفعة.
+        """
+        try:
+            normalized = sorted(
+                (
+                    (int(edit['start']), int(edit.get('end', edit['start'])), str(edit.get('text', '')), position)
+                    for position, edit in enumerate(edits)
+                ),
+                key=lambda item: (item[0], item[1])
+            )
+        except (KeyError, TypeError, ValueError) as e:
+            raise EditConflictError(f"تعديل غير صالح: {str(e)}")
+
+        previous_end = 0
+        for start, end, _, _ in normalized:
+            if start < previous_end or not 0 <= start <= end <= self._length:
+                raise EditConflictError(f"تعديل متداخل أو خارج الحدود: {start}-{end}")
+            previous_end = end
+
+        removed = {}
+        for start, end, text, position in reversed(normalized):
+            removed[position] = self.get_text(start, end)
+            self._replace(start, end, text)
+
+        self.version += 1
+        if len(self._pieces) > self.COMPACT_THRESHOLD:
+            self.compact()
+
+        # مواضع النطاقات بعد تطبيق الدفعة كاملة
+        spans = []
+        shift = 0
+        for start, end, text, position in normalized:
+            new_start = start + shift
+            spans.append({
+                'start': new_start,
+                'end': new_start + len(text),
+                'old_start': start,
+                'old_end': end,
+                'removed': removed[position],
+                'text': text
+            })
+            shift += len(text) - (end - start)
+        return spans
+
+    def compact(self) -> None:
+        """دمج كل القطع في قطعة واحدة"""
+        text = self.get_text()
+        self._pieces = [(text, 0, len(text))] if text else []
+        self._starts = [0] if text else []
+
+    def _piece_index(self, offset: int) -> int:
+        """موضع القطعة التي تحتوي offset"""
+        return max(bisect.bisect_right(self._starts, offset) - 1, 0)
+
+    def _split(self, offset: int) -> int:
+        """تقسيم القطعة عند offset وإرجاع موضع أول قطعة تبدأ عنده"""
+        if offset >= self._length:
+            return len(self._pieces)
+        index = self._piece_index(offset)
+        piece_start = self._starts[index]
+        if piece_start == offset:
+            return index
+        source, start, length = self._pieces[index]
+        head = offset - piece_start
+        self._pieces[index:index + 1] = [(source, start, head), (source, start + head, length - head)]
+        self._starts.insert(index + 1, offset)
+        return index + 1
+
+    def _replace(self, start: int, end: int, text: str) -> None:
+        first = self._split(start)
+        last = self._split(end)
+        new_pieces = [(text, 0, len(text))] if text else []
+        self._pieces[first:last] = new_pieces
+
+        delta = len(text) - (end - start)
+        self._starts[first:last] = [start] if text else []
+        following = first + len(new_pieces)
+        if delta:
+            for i in range(following, len(self._starts)):
+                self._starts[i] += delta
+        self._length += delta
+
+
+class DocumentStore:
+    """مستندات المحرر المفتوحة بمعرفاتها مع حذف الأقدم استخداماً"""
+
+    def __init__(self, max_documents: int = 200):
+        self.max_documents = max_documents
+        self._documents: "OrderedDict[str, PieceTable]" = OrderedDict()
+        self._locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def load(self, document_id: str, text: str) -> PieceTable:
+        document = PieceTable(text)
+        with self._lock:
+            self._documents[document_id] = document
+            self._documents.move_to_end(document_id)
+            self._locks.setdefault(document_id, threading.Lock())
+            while len(self._documents) > self.max_documents:
+                evicted, _ = self._documents.popitem(last=False)
+                self._locks.pop(evicted, None)
+        return document
+
+    def get(self, document_id: str) -> Optional[PieceTable]:
+        with self._lock:
+            document = self._documents.get(document_id)
+            if document is not None:
+                self._documents.move_to_end(document_id)
+            return document
+
+    def lock(self, document_id: str) -> threading.Lock:
+        with self._lock:
+            return self._locks.setdefault(document_id, threading.Lock())
+
+    def apply_edits(self, document_id: str, edits: List[Dict[str, Any]],
+                    base_version: Optional[int] = None) -> Tuple[PieceTable, List[Dict[str, Any]]]:
+        """تطبيق دفعة تعديلات على مستند محفوظ"""
+        document = self.get(document_id)
+        if document is None:
+            raise KeyError(document_id)
+        with self.lock(document_id):
+            if base_version is not None and base_version != document.version:
+                raise EditConflictError(
+                    f"نسخة المستند الحالية {document.version} وليست {base_version}"
+                )
+            return document, document.apply_edits(edits)
+
+    def transform_range(self, document_id: str, start: int, end: int, transform: Callable[[str], str],
+                        base_version: Optional[int] = None) -> Tuple[PieceTable, str, List[Dict[str, Any]]]:
+        """قراءة النطاق وتحويله واستبداله تحت قفل المستند نفسه
+
+        لا يمكن لتعديل متزامن أن يغيّر النص بين قراءته واستبداله.
+        """
+        document = self.get(document_id)
+        if document is None:
+            raise KeyError(document_id)
+        with self.lock(document_id):
+            if base_version is not None and base_version != document.version:
+                raise EditConflictError(
+                    f"نسخة المستند الحالية {document.version} وليست {base_version}"
+                )
+            original = document.get_text(start, end)
+            return document, original, document.apply_edits(
+                [{'start': start, 'end': end, 'text': transform(original)}]
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "documents": len(self._documents),
+                "max_documents": self.max_documents,
+                "total_characters": sum(len(document) for document in self._documents.values())
+            }
+
+
+# المستندات المفتوحة في المحرر
+document_store = DocumentStore(
+    max_documents=int(os.getenv('EDITOR_MAX_DOCUMENTS', 200))
+)
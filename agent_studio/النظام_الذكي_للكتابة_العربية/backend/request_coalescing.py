@@ -0,0 +1,79 @@
+"""
+دمج الطلبات المتطابقة الجارية (Single-Flight)
+عندما تصل عدة طلبات بنفس البصمة في الوقت نفسه ينفَّذ استدعاء واحد فقط للنموذج
+وتنتظر بقية الطلبات نتيجته المشتركة بدلاً من فتح استدعاءات مكررة
+"""
+
+import copy
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Optional
+
+
+def prompt_fingerprint(messages: Any, params: Optional[Dict[str, Any]] = None) -> str:
+    """حساب بصمة ثابتة للرسائل ومعاملات التوليد"""
+    payload = json.dumps(
+        {"messages": messages, "params": params or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _InFlightCall:
+    """استدعاء جارٍ تنتظره الطلبات المكررة"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """تنفيذ استدعاء واحد لكل مفتاح جارٍ ومشاركة نتيجته بين الخيوط"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _InFlightCall] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = _InFlightCall()
+                self._calls[key] = call
+                self.executed += 1
+            else:
+                self.coalesced += 1
+
+        if is_leader:
+            try:
+                call.result = fn()
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    self._calls.pop(key, None)
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+
+        # كل طلب يحصل على نسخته الخاصة لأن المسارات تعدّل النتيجة قبل إرجاعها
+        return copy.deepcopy(call.result)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            in_flight = len(self._calls)
+        return {
+            "in_flight": in_flight,
+            "executed": self.executed,
+            "coalesced": self.coalesced
+        }
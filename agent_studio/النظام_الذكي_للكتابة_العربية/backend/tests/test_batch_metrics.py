@@ -0,0 +1,35 @@
+import pytest
+
+import batch_metrics
+from batch_metrics import compute_batch_metrics
+
+TEXTS = [
+    "قصة قصيرة. جملة ثانية؟",
+    " ".join(["كلمة"] * 40) + ".",
+    "",
+    "فقرة أولى.\n\nفقرة ثانية فيها كلمات أطول قليلاً من المعتاد.",
+]
+
+def test_numpy_and_python_paths_agree(monkeypatch):
+    vectorized = compute_batch_metrics(TEXTS)
+    monkeypatch.setattr(batch_metrics, "NUMPY_AVAILABLE", False)
+    plain = compute_batch_metrics(TEXTS)
+
+    assert len(vectorized["results"]) == len(TEXTS)
+    for fast, slow in zip(vectorized["results"], plain["results"]):
+        assert fast.keys() == slow.keys()
+        for key, value in slow.items():
+            if isinstance(value, float):
+                assert fast[key] == pytest.approx(value)
+            else:
+                assert fast[key] == value
+    assert vectorized["summary"] == pytest.approx(plain["summary"])
+
+def test_scores_are_bounded_and_levels_follow_sentence_length():
+    results = compute_batch_metrics(TEXTS)["results"]
+
+    assert all(0 <= result["readabilityScore"] <= 1 for result in results)
+    assert all(0 <= result["styleScore"] <= 1 for result in results)
+    assert results[1]["complexityLevel"] == "متقدم"
+    assert results[0]["complexityLevel"] == "بسيط"
+    assert results[2]["wordCount"] == 0 and results[2]["avgWordLength"] == 0.0
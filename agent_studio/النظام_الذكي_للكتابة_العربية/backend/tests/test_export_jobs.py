@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+
+import pytest
+
+import export_jobs
+from execution_registry import ExecutorBusyError, STATUS_COMPLETED, STATUS_FAILED
+from export_jobs import ArtifactStore, ExportJobManager, export_artifact_key
+from novel_export import NovelExport
+
+def novel(*chapters):
+    return NovelExport(chapters=list(chapters), metadata={"title": "رواية"})
+
+def wait_for(manager, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job["status"] in (STATUS_COMPLETED, STATUS_FAILED):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("export job did not finish")
+
+def test_artifact_key_depends_on_content_and_format():
+    key = export_artifact_key(novel("أ", "ب"), "txt")
+    assert key == export_artifact_key(novel("أ", "ب"), "txt")
+    assert key != export_artifact_key(novel("أب"), "txt")
+    assert key != export_artifact_key(novel("أ", "ب"), "json")
+
+def test_identical_exports_reuse_the_running_job_then_the_file(tmp_path, monkeypatch):
+    release = threading.Event()
+    renders = []
+    original_write = export_jobs.write_export
+
+    def slow_write(export, export_format, f):
+        renders.append(export_format)
+        release.wait(5)
+        original_write(export, export_format, f)
+
+    monkeypatch.setattr(export_jobs, "write_export", slow_write)
+    manager = ExportJobManager(ArtifactStore(str(tmp_path)), max_workers=1)
+
+    first = manager.submit(novel("فصل"), "txt")
+    joined = manager.submit(novel("فصل"), "txt")
+    assert joined["job_id"] == first["job_id"]
+
+    release.set()
+    finished = wait_for(manager, first["job_id"])
+    assert finished["size"] > 0
+    with open(manager.artifact_path(first["job_id"]), encoding="utf-8") as f:
+        assert "فصل" in f.read()
+
+    cached = manager.submit(novel("فصل"), "txt")
+    assert cached["cached"] and cached["status"] == STATUS_COMPLETED
+    assert renders == ["txt"]
+
+def test_queue_limit_and_failures(tmp_path, monkeypatch):
+    release = threading.Event()
+
+    def blocked_write(export, export_format, f):
+        release.wait(5)
+        raise ValueError("disk full")
+
+    monkeypatch.setattr(export_jobs, "write_export", blocked_write)
+    manager = ExportJobManager(ArtifactStore(str(tmp_path)), max_workers=1, max_queued=1)
+
+    first = manager.submit(novel("1"), "txt")
+    second = manager.submit(novel("2"), "txt")
+    with pytest.raises(ExecutorBusyError):
+        manager.submit(novel("3"), "txt")
+
+    release.set()
+    failed = wait_for(manager, first["job_id"])
+    assert failed["status"] == STATUS_FAILED and failed["error"] == "disk full"
+    assert manager.artifact_path(first["job_id"]) is None
+    wait_for(manager, second["job_id"])
+    assert [name for _, _, files in os.walk(tmp_path) for name in files] == []
+
+def test_failed_pool_submit_leaves_no_stuck_job(tmp_path, monkeypatch):
+    """A job the pool refused is forgotten, so the same export can be submitted again"""
+    manager = ExportJobManager(ArtifactStore(str(tmp_path)), max_workers=1, max_queued=0)
+    submit = manager._pool.submit
+
+    def refuse(*args):
+        raise RuntimeError("cannot schedule new futures after shutdown")
+
+    monkeypatch.setattr(manager._pool, "submit", refuse)
+    with pytest.raises(RuntimeError):
+        manager.submit(novel("1"), "txt")
+    assert manager.stats()["pending"] == 0
+    assert manager.stats()["jobs"] == 0
+
+    monkeypatch.setattr(manager._pool, "submit", submit)
+    job = wait_for(manager, manager.submit(novel("1"), "txt")["job_id"])
+    assert job["status"] == STATUS_COMPLETED and not job["cached"]
+
+def test_expired_artifacts_are_not_served(tmp_path):
+    store = ArtifactStore(str(tmp_path), ttl_seconds=60)
+    key = export_artifact_key(novel("فصل"), "txt")
+    path = store.render(key, novel("فصل"), "txt")
+    assert store.get(key, "txt") == path
+
+    old = time.time() - 120
+    os.utime(path, (old, old))
+    assert store.get(key, "txt") is None
+    assert not os.path.exists(path)
@@ -0,0 +1,95 @@
+import json
+
+import pytest
+
+from llm_streaming import LLMStreamError, chapter_stream_events, stream_llm, stream_model_for
+
+class FakeResponse:
+    def __init__(self, lines, status_code=200):
+        self.lines = lines
+        self.status_code = status_code
+        self.text = ""
+        self.closed = False
+
+    def iter_lines(self):
+        yield from self.lines
+
+    def close(self):
+        self.closed = True
+
+class FakeSession:
+    def __init__(self, response):
+        self.response = response
+        self.requests = []
+
+    def post(self, url, **kwargs):
+        self.requests.append((url, kwargs))
+        return self.response
+
+def completion_lines(deltas):
+    lines = [b": keep-alive", b""]
+    for delta in deltas:
+        event = {"choices": [{"index": 0, "delta": {"content": delta}}]}
+        lines += [("data: " + json.dumps(event, ensure_ascii=False)).encode("utf-8"), b""]
+    return lines + [b"data: [DONE]", b""]
+
+def parse_events(messages):
+    events = []
+    for message in messages:
+        name, data = message.strip().split("\n")
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+def test_chapter_stream_sends_tokens_before_done(monkeypatch):
+    """Provider deltas reach the client as separate token events ahead of the final chapter"""
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    deltas = ['{"content": "', "كان يا", " ما كان", " في قديم الزمان", '"}']
+    session = FakeSession(FakeResponse(completion_lines(deltas)))
+
+    events = parse_events(chapter_stream_events(
+        stream_llm([{"role": "user", "content": "اكتب"}], model="m", max_tokens=50, session=session)
+    ))
+
+    names = [name for name, _ in events]
+    assert names == ["token"] * len(deltas) + ["done"]
+    assert [data["token"] for _, data in events[:-1]] == deltas
+    assert events[-1][1]["chapter"] == {"content": "كان يا ما كان في قديم الزمان"}
+
+    url, request = session.requests[0]
+    assert url.endswith("/chat/completions")
+    assert request["stream"] is True
+    assert request["json"] == {"model": "m", "messages": [{"role": "user", "content": "اكتب"}],
+                               "stream": True, "max_tokens": 50}
+    assert session.response.closed
+
+def test_provider_errors_become_error_events(monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")
+    lines = completion_lines(["جزء"])[:-2] + [b'data: {"error": {"message": "overloaded"}}', b""]
+    session = FakeSession(FakeResponse(lines))
+
+    events = parse_events(chapter_stream_events(stream_llm([], session=session)))
+
+    assert [name for name, _ in events] == ["token", "error"]
+    assert "overloaded" in events[-1][1]["error"]
+
+def test_stream_requires_an_api_key(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    monkeypatch.delenv("LLM_STREAM_API_KEY", raising=False)
+
+    with pytest.raises(LLMStreamError):
+        next(stream_llm([], session=FakeSession(FakeResponse([]))))
+
+def test_task_models_are_mapped_to_the_streaming_provider(monkeypatch):
+    """Unmapped task models have no streaming counterpart, so callers fall back to call_llm"""
+    monkeypatch.setenv("LLM_STREAM_MODEL", "gpt-4o-mini")
+    monkeypatch.setenv("LLM_STREAM_MODEL_MAP", " openai_gpt4 = gpt-4o ,broken, claude_opus=")
+
+    assert stream_model_for("openai_gpt4") == "gpt-4o"
+    assert stream_model_for("gpt-4o") == "gpt-4o"
+    assert stream_model_for("gpt-4o-mini") == "gpt-4o-mini"
+    assert stream_model_for(None) == "gpt-4o-mini"
+    assert stream_model_for("claude_opus") is None
+    assert stream_model_for("gemini_pro") is None
+
+    monkeypatch.delenv("LLM_STREAM_MODEL_MAP")
+    assert stream_model_for("openai_gpt4") is None
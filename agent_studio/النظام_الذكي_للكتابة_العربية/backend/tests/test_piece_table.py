@@ -0,0 +1,92 @@
+import random
+import threading
+
+import pytest
+
+from piece_table import DocumentStore, EditConflictError, PieceTable
+
+def test_random_edits_match_plain_string():
+    rng = random.Random(1)
+    text = "كان يا ما كان في قديم الزمان " * 20
+    table = PieceTable(text)
+    table.COMPACT_THRESHOLD = 64  # exercise compaction too
+
+    for _ in range(500):
+        start = rng.randint(0, len(text))
+        end = rng.randint(start, min(len(text), start + 8))
+        insert = rng.choice(["", "س", "نص جديد", "\n", "كلمات أطول قليلاً"])
+        span = table.replace(start, end, insert)
+        assert span["removed"] == text[start:end]
+        text = text[:start] + insert + text[end:]
+        assert len(table) == len(text)
+
+    assert table.get_text() == text
+    middle = len(text) // 2
+    assert table.get_text(middle - 5, middle + 5) == text[middle - 5:middle + 5]
+    assert table.version == 500
+
+def test_batch_offsets_refer_to_the_text_before_the_batch():
+    table = PieceTable("abcdefghij")
+
+    spans = table.apply_edits([
+        {"start": 8, "end": 10, "text": "XYZ"},
+        {"start": 0, "end": 2, "text": ""},
+        {"start": 4, "end": 4, "text": "--"},
+    ])
+
+    assert table.get_text() == "cd--efghXYZ"
+    assert [(span["start"], span["end"], span["removed"]) for span in spans] == [
+        (0, 0, "ab"), (2, 4, ""), (8, 11, "ij")
+    ]
+
+@pytest.mark.parametrize("edits", [
+    [{"start": 0, "end": 5, "text": ""}, {"start": 3, "end": 6, "text": ""}],
+    [{"start": 8, "end": 20, "text": "x"}],
+    [{"end": 2}],
+])
+def test_invalid_batches_leave_the_document_untouched(edits):
+    table = PieceTable("abcdefghij")
+    with pytest.raises(EditConflictError):
+        table.apply_edits(edits)
+    assert table.get_text() == "abcdefghij"
+    assert table.version == 0
+
+def test_store_rejects_stale_versions():
+    store = DocumentStore()
+    store.load("doc", "نص المستند")
+    store.apply_edits("doc", [{"start": 0, "end": 2, "text": "ال"}], base_version=0)
+
+    with pytest.raises(EditConflictError):
+        store.apply_edits("doc", [{"start": 0, "end": 0, "text": "x"}], base_version=0)
+    with pytest.raises(EditConflictError):
+        store.transform_range("doc", 0, 2, str.upper, base_version=0)
+
+def test_transform_range_reads_and_replaces_atomically():
+    """No concurrent edit can land between reading a range and replacing it"""
+    store = DocumentStore()
+    store.load("doc", "0" * 10)
+    reading = threading.Event()
+
+    def slow_transform(text):
+        reading.set()
+        threading.Event().wait(0.05)
+        return text.replace("0", "1")
+
+    worker = threading.Thread(target=store.transform_range, args=("doc", 0, 10, slow_transform))
+    worker.start()
+    reading.wait()
+    store.apply_edits("doc", [{"start": 0, "end": 0, "text": "XX"}])
+    worker.join()
+
+    assert store.get("doc").get_text() == "XX" + "1" * 10
+
+def test_store_evicts_least_recently_used_documents():
+    store = DocumentStore(max_documents=2)
+    store.load("a", "1")
+    store.load("b", "2")
+    store.get("a")
+    store.load("c", "3")
+
+    assert store.get("b") is None
+    assert store.get("a") is not None
+    assert store.stats()["documents"] == 2
@@ -0,0 +1,39 @@
+from arabic_text import normalize_arabic
+from text_issues import detect_text_issues
+
+def by_type(issues, issue_type):
+    return [issue for issue in issues if issue["type"] == issue_type]
+
+def test_repetition_offsets_point_at_the_repeated_word():
+    """Diacritics, tatweel and Arabic punctuation around a word do not shift its span"""
+    text = "«الكتابةُ» فنٌّ، والكتابة صبر؛ الكتـابة حياة؟ نعم: الكتابة، ثم الكتابةُ! ومرة أخرى الكتابة."
+
+    issues = by_type(detect_text_issues(text), "repetition")
+
+    assert len(issues) == 2  # fourth and fifth occurrences; "والكتابة" is another word
+    for issue in issues:
+        assert text[issue["start"]:issue["end"]] == issue["text"]
+        assert normalize_arabic(issue["text"]) == "الكتابة"
+    assert [issue["start"] for issue in issues] == sorted(issue["start"] for issue in issues)
+    assert text[issues[-1]["end"]] == "."
+
+def test_long_sentence_offsets_cover_the_whole_sentence():
+    short = "جملة قصيرة، ثم توقف؛ "
+    long_sentence = "وفي المساء " + " ".join(f"كلمة{i}" for i in range(30)) + " ثم سكت؟"
+    text = short.replace("؛ ", "؟ ") + long_sentence + " انتهى."
+
+    issues = by_type(detect_text_issues(text), "unclear")
+
+    assert len(issues) == 1
+    span = text[issues[0]["start"]:issues[0]["end"]]
+    assert span.startswith("وفي المساء")
+    assert span.rstrip().endswith("سكت؟")
+    assert issues[0]["text"] == span[:50] + "..."
+
+def test_missing_punctuation_spans_the_whole_text():
+    text = "نص بلا أي علامة ترقيم في نهايته"
+
+    issues = by_type(detect_text_issues(text), "grammar")
+
+    assert len(issues) == 1
+    assert text[issues[0]["start"]:issues[0]["end"]] == text
@@ -0,0 +1,75 @@
+"""
+اكتشاف مشاكل النص (التكرار، الجمل الطويلة، غياب الترقيم)
+يعمل على بنية arabic_text فتشير start/end في كل مشكلة إلى موضعها في النص الأصلي.
+"""
+
+from typing import Dict
+
+from arabic_text import TextStructure, analyze_structure
+
+
+def detect_text_issues(text: str, issue_types: list = None, structure: TextStructure = None) -> list:
+    """اكتشاف مشاكل النص في مرور واحد على الكلمات ومواضعها
+
+    issue_types مقبول للتوافق لكنه لا يرشّح الفحوص: كل الأنواع تُفحص دائماً كما كانت.
+    """
+    issues = []
+
+    try:
+        structure = structure or analyze_structure(text)
+
+        # اكتشاف التكرار (الكلمة المطبَّعة -> عدد مرات الظهور)
+        word_counts: Dict[str, int] = {}
+        repeated: Dict[str, list] = {}
+        for position, token in enumerate(structure.tokens):
+            if len(token.normalized) > 3:  # تجاهل الكلمات القصيرة
+                count = word_counts.get(token.normalized, 0) + 1
+                word_counts[token.normalized] = count
+                if count > 3:  # بدءاً من المرة الرابعة
+                    repeated.setdefault(token.normalized, []).append((position, token))
+
+        for word, occurrences in repeated.items():
+            for position, token in occurrences:
+                issues.append({
+                    'id': f"rep_{position}",
+                    'type': 'repetition',
+                    'severity': 'medium',
+                    'start': token.start,
+                    'end': token.end,
+                    'text': token.text,
+                    'message': f"كلمة '{word}' مكررة كثيراً",
+                    'suggestion': f"حاول استخدام مرادف لـ '{word}'"
+                })
+
+        # اكتشاف الجمل الطويلة جداً
+        for i, sentence in enumerate(structure.sentences):
+            if sentence.word_count > 25:
+                issues.append({
+                    'id': f"long_{i}",
+                    'type': 'unclear',
+                    'severity': 'medium',
+                    'start': sentence.start,
+                    'end': sentence.end,
+                    'text': structure.sentence_text(sentence)[:50] + "...",
+                    'message': "جملة طويلة قد تكون صعبة الفهم",
+                    'suggestion': "قسم الجملة إلى جمل أقصر"
+                })
+
+        # اكتشاف علامات الترقيم المفقودة
+        if not structure.has_terminal_punctuation:
+            issues.append({
+                'id': "punct_1",
+                'type': 'grammar',
+                'severity': 'high',
+                'start': 0,
+                'end': len(text),
+                'text': text[:50] + "...",
+                'message': "لا توجد علامات ترقيم في النص",
+                'suggestion': "أضف نقاط وعلامات ترقيم مناسبة"
+            })
+
+        return issues[:10]  # إرجاع أول 10 مشاكل فقط
+
+    except Exception as e:
+        print(f"خطأ في اكتشاف مشاكل النص: {e}")
+        return []
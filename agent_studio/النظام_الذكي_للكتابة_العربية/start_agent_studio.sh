@@ -99,6 +99,13 @@ OPENAI_API_KEY=your_openai_key_here
 CLAUDE_API_KEY=your_claude_key_here
 GEMINI_API_KEY=your_gemini_key_here
 
+# بث نص الفصل (واجهة Chat Completions متوافقة مع OpenAI)؛ المفتاح الافتراضي OPENAI_API_KEY
+LLM_STREAM_BASE_URL=https://api.openai.com/v1
+LLM_STREAM_API_KEY=
+LLM_STREAM_MODEL=gpt-4o-mini
+# نموذج_المهمة=نموذج_المزود؛ النماذج غير المذكورة تُولَّد دون بث عبر call_llm
+LLM_STREAM_MODEL_MAP=openai_gpt4=gpt-4o
+
 # إعدادات استوديو الوكلاء
 AGENT_STUDIO_ENABLED=true
 AGENT_COLLABORATION_MAX_MESSAGES=100
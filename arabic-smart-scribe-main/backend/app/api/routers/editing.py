@@ -24,6 +24,16 @@ async def get_editing_tools():
     tools = gemini_service.get_editing_tools()
     return {"tools": tools}
 
+@router.get("/llm-cache/stats")
+async def get_llm_cache_stats():
+    """Get hit/miss statistics of the LLM response cache"""
+    return gemini_service.response_cache.stats()
+
+@router.get("/llm-limiter/stats")
+async def get_llm_limiter_stats():
+    """Get queue depth and wait-time metrics of the shared LLM rate limiter"""
+    return gemini_service.rate_limiter.stats()
+
 @router.post("/edit-text", response_model=EditingResponse)
 async def edit_text(
     request: EditingRequest,
@@ -18,6 +18,30 @@ class Settings(BaseSettings):
     # Redis (for background tasks)
     redis_url: str = "redis://localhost:6379/0"
     
+    # LLM response cache
+    llm_cache_enabled: bool = True
+    llm_cache_max_entries: int = 512
+    llm_cache_max_bytes: int = 32 * 1024 * 1024
+    llm_cache_ttl_seconds: int = 3600
+    llm_cache_redis_enabled: bool = False
+    llm_cache_redis_max_entries: int = 10000
+    
+    # LLM rate limiting (0 disables a bucket)
+    llm_max_concurrency: int = 8
+    llm_requests_per_minute: int = 60
+    llm_tokens_per_minute: int = 0
+    
+    # Long transcripts are split into chunks of this many (estimated) tokens
+    transcript_chunk_tokens: int = 3000
+    transcript_chunk_overlap_tokens: int = 200
+    
+    # Book generation: chapters written in parallel (also capped by the LLM limits above)
+    chapter_writing_max_parallel: int = 4
+    
+    # Uploads (0 disables the size limit)
+    max_upload_bytes: int = 500 * 1024 * 1024
+    upload_chunk_size: int = 1024 * 1024
+    
     # App settings
     app_name: str = "الشاهد الاحترافي - Smart Writing Platform API"
     app_version: str = "2.5.0"
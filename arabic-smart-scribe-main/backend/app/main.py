@@ -58,8 +58,8 @@ if __name__ == "__main__":
 from fastapi import UploadFile, File, Form, BackgroundTasks
 from fastapi.responses import FileResponse
 from multimedia_service import MultimediaAnalysisService, MultimediaOutputService
-import shutil
 from pathlib import Path
+from .services.upload_pipeline import store_upload, UploadTooLargeError
 
 # خدمات متعددة الوسائط
 multimedia_service = MultimediaAnalysisService()
@@ -83,13 +83,15 @@ async def upload_multimedia_source(
         project_storage = Path(f"data/multimedia/{project_id}")
         project_storage.mkdir(parents=True, exist_ok=True)
         
-        # حفظ الملف
+        # حفظ الملف على دفعات مع حساب البصمة ورفض الملفات الكبيرة فور تجاوز الحد
         source_id = str(uuid.uuid4())
         file_extension = Path(file.filename).suffix
         file_path = project_storage / f"{source_id}{file_extension}"
         
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        try:
+            stored = await store_upload(file, file_path)
+        except UploadTooLargeError as e:
+            raise HTTPException(status_code=413, detail=f"حجم الملف كبير جداً: {str(e)}")
         
         # إنشاء سجل المصدر
         source = Source(
@@ -98,7 +100,7 @@ async def upload_multimedia_source(
             file_name=file.filename,
             file_path=str(file_path),
             source_type=source_type,
-            file_size=file_path.stat().st_size,
+            file_size=stored.size,
             mime_type=file.content_type,
             status='uploaded'
         )
@@ -111,10 +113,14 @@ async def upload_multimedia_source(
             "source_id": source_id,
             "file_name": file.filename,
             "source_type": source_type,
+            "file_size": stored.size,
+            "sha256": stored.sha256,
             "status": "uploaded",
             "message": "تم رفع الملف بنجاح"
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"خطأ في رفع الملف: {str(e)}")
 
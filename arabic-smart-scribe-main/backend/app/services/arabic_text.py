@@ -0,0 +1,162 @@
+"""Arabic-aware tokenizer and normalizer.
+
+One compiled-regex pass yields tokens, sentence spans and paragraph spans with
+character offsets. It understands the Arabic question mark and separators
+(؟ ؛ ،), tatweel and diacritics, so word counts and sentence counts agree
+across every analytics call site.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional
+
+# Harakat, Quranic marks and superscript alef, plus tatweel
+DIACRITICS = '\u0610-\u061A\u064B-\u065F\u0670\u06D6-\u06ED'
+TATWEEL = '\u0640'
+
+# Sentence terminators (the Arabic comma and semicolon do not end a sentence)
+SENTENCE_TERMINATORS = '.!?؟…'
+
+_DIACRITICS_RE = re.compile(f'[{DIACRITICS}{TATWEEL}]')
+_ALEF_VARIANTS_RE = re.compile('[إأآٱ]')
+
+# A word: letters/digits with embedded diacritics, tatweel and inner hyphens/apostrophes
+_SCANNER_RE = re.compile(
+    rf"(?P<word>[^\W_](?:[^\W_]|[{DIACRITICS}{TATWEEL}]|['’\-](?=[^\W_]))*)"
+    rf"|(?P<end>[{re.escape(SENTENCE_TERMINATORS)}]+)"
+    rf"|(?P<break>\n[ \t\r\f\v]*(?:\n[ \t\r\f\v]*)*)"
+)
+
+
+def strip_diacritics(text: str) -> str:
+    """Remove diacritics and tatweel"""
+    return _DIACRITICS_RE.sub('', text)
+
+
+def normalize_arabic(text: str, unify_alef: bool = False) -> str:
+    """Normalize for comparison: strip diacritics/tatweel and lowercase"""
+    normalized = strip_diacritics(text).lower()
+    if unify_alef:
+        normalized = _ALEF_VARIANTS_RE.sub('ا', normalized)
+    return normalized
+
+
+@dataclass
+class Token:
+    """A word with its offsets and normalized form"""
+    text: str
+    normalized: str
+    start: int
+    end: int
+
+
+@dataclass
+class Span:
+    """A sentence or paragraph span with its token range"""
+    start: int
+    end: int
+    first_token: int
+    last_token: int  # exclusive
+
+    @property
+    def word_count(self) -> int:
+        return self.last_token - self.first_token
+
+
+@dataclass
+class TextStructure:
+    """Tokens, sentences and paragraphs of a text"""
+    text: str
+    tokens: List[Token] = field(default_factory=list)
+    sentences: List[Span] = field(default_factory=list)
+    paragraphs: List[Span] = field(default_factory=list)
+    has_terminal_punctuation: bool = False
+
+    @property
+    def word_count(self) -> int:
+        return len(self.tokens)
+
+    @property
+    def sentence_count(self) -> int:
+        return len(self.sentences)
+
+    @property
+    def paragraph_count(self) -> int:
+        return len(self.paragraphs)
+
+    @property
+    def avg_words_per_sentence(self) -> float:
+        return self.word_count / max(self.sentence_count, 1)
+
+    @property
+    def avg_word_length(self) -> float:
+        if not self.tokens:
+            return 0.0
+        return sum(len(token.normalized) for token in self.tokens) / len(self.tokens)
+
+    @property
+    def unique_word_count(self) -> int:
+        return len({token.normalized for token in self.tokens})
+
+    @property
+    def vocabulary_diversity(self) -> float:
+        return self.unique_word_count / self.word_count if self.tokens else 0.0
+
+    def sentence_text(self, sentence: Span) -> str:
+        return self.text[sentence.start:sentence.end]
+
+
+def analyze_structure(text: str) -> TextStructure:
+    """Split text into tokens, sentences and paragraphs in one pass"""
+    structure = TextStructure(text=text)
+    tokens = structure.tokens
+
+    sentence_start: Optional[int] = None
+    sentence_first = 0
+    paragraph_start: Optional[int] = None
+    paragraph_first = 0
+    last_end = 0
+
+    def close_sentence(end: int):
+        nonlocal sentence_start
+        if sentence_start is not None and len(tokens) > sentence_first:
+            structure.sentences.append(Span(sentence_start, end, sentence_first, len(tokens)))
+        sentence_start = None
+
+    def close_paragraph():
+        nonlocal paragraph_start
+        if paragraph_start is not None:
+            structure.paragraphs.append(Span(paragraph_start, last_end, paragraph_first, len(tokens)))
+        paragraph_start = None
+
+    for match in _SCANNER_RE.finditer(text):
+        kind = match.lastgroup
+        start, end = match.span()
+
+        if kind == 'word':
+            if sentence_start is None:
+                sentence_start, sentence_first = start, len(tokens)
+            if paragraph_start is None:
+                paragraph_start, paragraph_first = start, len(tokens)
+            word = match.group()
+            tokens.append(Token(word, normalize_arabic(word), start, end))
+            last_end = end
+
+        elif kind == 'end':
+            structure.has_terminal_punctuation = True
+            if sentence_start is not None:
+                last_end = end
+                close_sentence(end)
+
+        else:  # a line break ends both the sentence and the paragraph
+            close_sentence(last_end)
+            close_paragraph()
+
+    close_sentence(last_end)
+    close_paragraph()
+    return structure
+
+
+def count_words(text: str) -> int:
+    """Word count without building the full structure"""
+    return sum(1 for match in _SCANNER_RE.finditer(text) if match.lastgroup == 'word')
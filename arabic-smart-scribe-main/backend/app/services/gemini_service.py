@@ -5,9 +5,18 @@ import json
 import random
 import uuid
 from ..core.config import settings
+from .response_cache import response_cache, make_cache_key
+from .request_coalescing import llm_single_flight
+from .rate_limiter import llm_rate_limiter, Priority, estimate_tokens
+from .arabic_text import analyze_structure
 
 class GeminiService:
+    model_name = 'gemini-1.5-flash-latest'
+
     def __init__(self):
+        self.response_cache = response_cache
+        self.single_flight = llm_single_flight
+        self.rate_limiter = llm_rate_limiter
         if settings.gemini_api_key:
             genai.configure(api_key=settings.gemini_api_key)
         else:
@@ -61,12 +70,9 @@ class GeminiService:
             if not settings.gemini_api_key:
                 raise Exception("Gemini API Key is not configured.")
             
-            model = genai.GenerativeModel('gemini-1.5-flash-latest')
             prompt = prompts.get(tool_type, prompts["improve"])
             
-            response = await model.generate_content_async(prompt)
-            
-            edited_text = response.text.strip()
+            edited_text = await self._generate_text(prompt, priority=Priority.INTERACTIVE)
             
             suggestions = [
                 "تم تحسين بنية الجمل",
@@ -142,10 +148,9 @@ class GeminiService:
                     }"""
             user_prompt = f"قم بتحليل النص التالي تحليلاً شاملاً:\n\n{text}"
             
-            model = genai.GenerativeModel('gemini-1.5-flash-latest')
-            response = await model.generate_content_async(f"{system_prompt}\n\n{user_prompt}")
-            
-            analysis_result = response.text.strip()
+            analysis_result = await self._generate_text(
+                f"{system_prompt}\n\n{user_prompt}", priority=Priority.INTERACTIVE
+            )
             
             try:
                 return json.loads(analysis_result)
@@ -156,11 +161,58 @@ class GeminiService:
             print(f"Error during Gemini analysis: {e}")
             return self._generate_basic_analysis(text)
 
+    async def generate_content(
+        self,
+        prompt: str,
+        generation_config: Optional[Dict[str, Any]] = None,
+        priority: Priority = Priority.DEFAULT
+    ) -> str:
+        """Generate text for an arbitrary prompt"""
+        if not settings.gemini_api_key:
+            raise Exception("Gemini API Key is not configured.")
+        return await self._generate_text(prompt, generation_config, priority)
+
+    async def _generate_text(
+        self,
+        prompt: str,
+        generation_config: Optional[Dict[str, Any]] = None,
+        priority: Priority = Priority.DEFAULT
+    ) -> str:
+        """Call the model, serving identical requests from the response cache"""
+        cache_key = make_cache_key(self.model_name, prompt, generation_config)
+        cached = await self.response_cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        # Identical prompts that are already in flight share one upstream call
+        return await self.single_flight.do(
+            cache_key, lambda: self._call_model(cache_key, prompt, generation_config, priority)
+        )
+
+    async def _call_model(
+        self,
+        cache_key: str,
+        prompt: str,
+        generation_config: Optional[Dict[str, Any]],
+        priority: Priority
+    ) -> str:
+        """Single upstream call; the result is stored in the response cache"""
+        estimated = estimate_tokens(prompt)
+        async with self.rate_limiter.acquire(priority, estimated):
+            model = genai.GenerativeModel(self.model_name)
+            response = await model.generate_content_async(prompt, generation_config=generation_config)
+
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            self.rate_limiter.settle_tokens(estimated, getattr(usage, "total_token_count", 0))
+
+        text = response.text.strip()
+        await self.response_cache.set(cache_key, text)
+        return text
+
     def _generate_basic_analysis(self, text: str) -> Dict[str, Any]:
         """Generate basic analysis as fallback"""
-        words = text.split()
-        sentences = text.split('.')
-        paragraphs = text.split('\n\n')
+        structure = analyze_structure(text)
         
         return {
             "structure_analysis": {
@@ -197,11 +249,11 @@ class GeminiService:
                 "flow_problems": []
             },
             "detailed_metrics": {
-                "word_count": len(words),
-                "sentence_count": len([s for s in sentences if s.strip()]),
-                "paragraph_count": len([p for p in paragraphs if p.strip()]),
-                "average_sentence_length": len(words) / max(len([s for s in sentences if s.strip()]), 1),
-                "reading_time_minutes": max(1, len(words) // 200),
+                "word_count": structure.word_count,
+                "sentence_count": structure.sentence_count,
+                "paragraph_count": structure.paragraph_count,
+                "average_sentence_length": structure.avg_words_per_sentence,
+                "reading_time_minutes": max(1, structure.word_count // 200),
                 "complexity_level": "متوسط",
                 "grade_level": random.randint(6, 12),
                 "passive_voice_percentage": random.uniform(10, 30),
@@ -0,0 +1,205 @@
+"""Process-wide limiter for upstream LLM calls.
+
+Every model call acquires a slot from one shared limiter that combines:
+- a max-concurrency cap,
+- a requests-per-minute and a tokens-per-minute token bucket,
+- priority classes, so interactive editing is served before batch work.
+
+Waiters are kept in a priority heap and granted strictly in (priority, arrival)
+order. The limiter also records queue depth and wait times for monitoring.
+"""
+
+import asyncio
+import heapq
+import itertools
+import time
+from contextlib import asynccontextmanager
+from enum import IntEnum
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from ..core.config import settings
+
+
+class Priority(IntEnum):
+    """Lower value is served first"""
+    INTERACTIVE = 0
+    DEFAULT = 1
+    BATCH = 2
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate used to charge the tokens-per-minute bucket"""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """Continuous-refill token bucket expressed as a per-minute rate"""
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self.tokens = self.capacity
+        self._updated_at = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated_at) * self.rate_per_second)
+        self._updated_at = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until `amount` tokens are available (0 when available now)"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate_per_second
+
+    def consume(self, amount: float) -> None:
+        """Take tokens; may go negative to account for an underestimate"""
+        self._refill()
+        self.tokens -= min(amount, self.capacity)
+
+
+class _Waiter:
+    def __init__(self, future: asyncio.Future, tokens: int):
+        self.future = future
+        self.tokens = tokens
+
+
+class LLMRateLimiter:
+    """Concurrency + RPM/TPM limiter with priority scheduling"""
+
+    def __init__(self, max_concurrency: int = 8, requests_per_minute: int = 60, tokens_per_minute: int = 0):
+        self.max_concurrency = max_concurrency
+        self.request_bucket = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self.token_bucket = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+
+        self._active = 0
+        self._waiters: List[Tuple[int, int, _Waiter]] = []
+        self._sequence = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        self._granted: Dict[Priority, int] = {p: 0 for p in Priority}
+        self._wait_total: Dict[Priority, float] = {p: 0.0 for p in Priority}
+        self._wait_max: Dict[Priority, float] = {p: 0.0 for p in Priority}
+
+    @classmethod
+    def from_settings(cls, config=settings) -> "LLMRateLimiter":
+        return cls(
+            max_concurrency=config.llm_max_concurrency,
+            requests_per_minute=config.llm_requests_per_minute,
+            tokens_per_minute=config.llm_tokens_per_minute,
+        )
+
+    @asynccontextmanager
+    async def acquire(self, priority: Priority = Priority.DEFAULT, estimated_tokens: int = 1) -> AsyncIterator[None]:
+        """Hold one upstream slot for the duration of the block"""
+        started_at = time.monotonic()
+        loop = asyncio.get_running_loop()
+
+        if not self._waiters and self._blocked_for(estimated_tokens) is None:
+            self._grant(estimated_tokens)
+        else:
+            waiter = _Waiter(loop.create_future(), estimated_tokens)
+            heapq.heappush(self._waiters, (int(priority), next(self._sequence), waiter))
+            self._dispatch()
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if waiter.future.done() and not waiter.future.cancelled():
+                    # Granted just before the cancellation arrived
+                    self._release()
+                else:
+                    waiter.future.cancel()
+                    self._dispatch()
+                raise
+
+        waited = time.monotonic() - started_at
+        self._granted[priority] += 1
+        self._wait_total[priority] += waited
+        self._wait_max[priority] = max(self._wait_max[priority], waited)
+
+        try:
+            yield
+        finally:
+            self._release()
+
+    def settle_tokens(self, estimated_tokens: int, actual_tokens: int) -> None:
+        """Charge the difference once the real token usage is known"""
+        if self.token_bucket is not None and actual_tokens > estimated_tokens:
+            self.token_bucket.consume(actual_tokens - estimated_tokens)
+
+    def _blocked_for(self, tokens: int) -> Optional[float]:
+        """None when a call can start now, else seconds to wait (0 = wait for a slot)"""
+        if self._active >= self.max_concurrency:
+            return 0.0
+        wait = 0.0
+        if self.request_bucket is not None:
+            wait = max(wait, self.request_bucket.wait_time(1))
+        if self.token_bucket is not None:
+            wait = max(wait, self.token_bucket.wait_time(tokens))
+        return wait if wait > 0 else None
+
+    def _grant(self, tokens: int) -> None:
+        self._active += 1
+        if self.request_bucket is not None:
+            self.request_bucket.consume(1)
+        if self.token_bucket is not None:
+            self.token_bucket.consume(tokens)
+
+    def _release(self) -> None:
+        self._active -= 1
+        self._dispatch()
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._waiters:
+            _, _, waiter = self._waiters[0]
+            if waiter.future.done():
+                heapq.heappop(self._waiters)
+                continue
+
+            wait = self._blocked_for(waiter.tokens)
+            if wait is None:
+                heapq.heappop(self._waiters)
+                self._grant(waiter.tokens)
+                waiter.future.set_result(None)
+                continue
+
+            if wait > 0:
+                # Rate-limited rather than slot-limited: retry once tokens refill
+                loop = waiter.future.get_loop()
+                self._timer = loop.call_later(wait, self._dispatch)
+            break
+
+    def stats(self) -> Dict[str, Any]:
+        queued = {p.name.lower(): 0 for p in Priority}
+        for priority, _, waiter in self._waiters:
+            if not waiter.future.done():
+                queued[Priority(priority).name.lower()] += 1
+
+        wait_times = {}
+        for p in Priority:
+            count = self._granted[p]
+            wait_times[p.name.lower()] = {
+                "granted": count,
+                "avg_wait_seconds": self._wait_total[p] / count if count else 0.0,
+                "max_wait_seconds": self._wait_max[p],
+            }
+
+        return {
+            "active": self._active,
+            "max_concurrency": self.max_concurrency,
+            "queue_depth": sum(queued.values()),
+            "queued_by_priority": queued,
+            "wait_times": wait_times,
+            "available_requests": self.request_bucket.tokens if self.request_bucket else None,
+            "available_tokens": self.token_bucket.tokens if self.token_bucket else None,
+        }
+
+
+# Shared by every service that talks to the model
+llm_rate_limiter = LLMRateLimiter.from_settings()
@@ -0,0 +1,54 @@
+"""Single-flight coalescing for identical in-flight requests.
+
+Concurrent callers that share a key await one shared task instead of each
+starting their own upstream call. The task is shielded, so a caller that is
+cancelled (e.g. a client disconnect) does not cancel it for the others.
+"""
+
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Run at most one in-flight call per key and share its result"""
+
+    def __init__(self):
+        self._inflight: Dict[Tuple[asyncio.AbstractEventLoop, str], asyncio.Future] = {}
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, factory: Callable[[], Awaitable[T]]) -> T:
+        # Tasks belong to a loop, so keys are scoped per loop (Celery workers
+        # run each task in a fresh one).
+        inflight_key = (asyncio.get_running_loop(), key)
+        task = self._inflight.get(inflight_key)
+
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[inflight_key] = task
+            task.add_done_callback(lambda done: self._forget(inflight_key, done))
+            self.executed += 1
+        else:
+            self.coalesced += 1
+
+        return await asyncio.shield(task)
+
+    def _forget(self, inflight_key: Tuple[asyncio.AbstractEventLoop, str], task: asyncio.Future) -> None:
+        if self._inflight.get(inflight_key) is task:
+            del self._inflight[inflight_key]
+        if not task.cancelled():
+            # Mark the exception as retrieved when every waiter went away.
+            task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "executed": self.executed,
+            "coalesced": self.coalesced,
+        }
+
+
+# Shared by every GeminiService instance so coalescing works across services
+llm_single_flight = SingleFlight()
@@ -0,0 +1,212 @@
+"""Content-addressed cache for LLM responses.
+
+Responses are keyed by a SHA-256 of (model name, prompt, generation params), so
+an identical request returns the stored text instead of calling the model again.
+Two tiers are used: an in-process LRU bounded by entry count and total bytes,
+and an optional Redis tier shared between workers with a TTL and a capped index.
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from ..core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(
+    model_name: str, prompt: str, generation_config: Optional[Dict[str, Any]] = None
+) -> str:
+    """Build a stable hash for a model call"""
+    payload = json.dumps(
+        {"model": model_name, "prompt": prompt, "params": generation_config or {}},
+        sort_keys=True,
+        ensure_ascii=False,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LRUCacheTier:
+    """In-process LRU tier bounded by entry count and total size in bytes"""
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 32 * 1024 * 1024, ttl_seconds: int = 3600):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[str, float, int]]" = OrderedDict()
+        self._size_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at, _ = entry
+            if self.ttl_seconds and expires_at < time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        size = len(value.encode("utf-8"))
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, time.monotonic() + self.ttl_seconds, size)
+            self._size_bytes += size
+            while self._entries and (
+                len(self._entries) > self.max_entries or self._size_bytes > self.max_bytes
+            ):
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size_bytes = 0
+
+    def _remove(self, key: str) -> None:
+        _, _, size = self._entries.pop(key)
+        self._size_bytes -= size
+
+    @property
+    def size_bytes(self) -> int:
+        return self._size_bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisCacheTier:
+    """Shared Redis tier with a TTL per entry and a capped key index"""
+
+    def __init__(
+        self,
+        redis_url: str,
+        ttl_seconds: int = 3600,
+        max_entries: int = 10000,
+        max_value_bytes: int = 1024 * 1024,
+        prefix: str = "llm_cache",
+    ):
+        import redis.asyncio as aioredis
+
+        self._client = aioredis.from_url(redis_url, decode_responses=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_value_bytes = max_value_bytes
+        self.prefix = prefix
+        self._index_key = f"{prefix}:index"
+
+    async def get(self, key: str) -> Optional[str]:
+        try:
+            return await self._client.get(f"{self.prefix}:{key}")
+        except Exception as e:
+            logger.warning(f"Redis cache read failed: {e}")
+            return None
+
+    async def set(self, key: str, value: str) -> None:
+        if len(value.encode("utf-8")) > self.max_value_bytes:
+            return
+        try:
+            async with self._client.pipeline(transaction=False) as pipe:
+                pipe.setex(f"{self.prefix}:{key}", self.ttl_seconds, value)
+                pipe.zadd(self._index_key, {key: time.time()})
+                pipe.zcard(self._index_key)
+                results = await pipe.execute()
+            overflow = results[-1] - self.max_entries
+            if overflow > 0:
+                evicted = await self._client.zpopmin(self._index_key, overflow)
+                if evicted:
+                    await self._client.delete(*[f"{self.prefix}:{k}" for k, _ in evicted])
+        except Exception as e:
+            logger.warning(f"Redis cache write failed: {e}")
+
+
+class ResponseCache:
+    """Two-tier response cache with hit/miss counters"""
+
+    def __init__(self, memory_tier: Optional[LRUCacheTier] = None, redis_tier: Optional[RedisCacheTier] = None, enabled: bool = True):
+        self.memory_tier = memory_tier or LRUCacheTier()
+        self.redis_tier = redis_tier
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self.memory_hits = 0
+        self.redis_hits = 0
+
+    @classmethod
+    def from_settings(cls, config=settings) -> "ResponseCache":
+        memory_tier = LRUCacheTier(
+            max_entries=config.llm_cache_max_entries,
+            max_bytes=config.llm_cache_max_bytes,
+            ttl_seconds=config.llm_cache_ttl_seconds,
+        )
+        redis_tier = None
+        if config.llm_cache_redis_enabled:
+            try:
+                redis_tier = RedisCacheTier(
+                    config.redis_url,
+                    ttl_seconds=config.llm_cache_ttl_seconds,
+                    max_entries=config.llm_cache_redis_max_entries,
+                )
+            except ImportError as e:
+                logger.warning(f"Redis cache tier unavailable: {e}")
+        return cls(memory_tier, redis_tier, enabled=config.llm_cache_enabled)
+
+    async def get(self, key: str) -> Optional[str]:
+        if not self.enabled:
+            return None
+
+        value = self.memory_tier.get(key)
+        if value is not None:
+            self.hits += 1
+            self.memory_hits += 1
+            return value
+
+        if self.redis_tier is not None:
+            value = await self.redis_tier.get(key)
+            if value is not None:
+                self.memory_tier.set(key, value)
+                self.hits += 1
+                self.redis_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(self, key: str, value: str) -> None:
+        if not self.enabled:
+            return
+        self.memory_tier.set(key, value)
+        if self.redis_tier is not None:
+            await self.redis_tier.set(key, value)
+
+    def clear(self) -> None:
+        self.memory_tier.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "memory_hits": self.memory_hits,
+            "redis_hits": self.redis_hits,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(self.memory_tier),
+            "size_bytes": self.memory_tier.size_bytes,
+            "redis_enabled": self.redis_tier is not None,
+        }
+
+
+response_cache = ResponseCache.from_settings()
@@ -0,0 +1,166 @@
+"""Map-reduce helpers for long transcripts.
+
+Transcripts are split on sentence and timestamp boundaries into chunks that
+fit a token budget. Each chunk carries the tail of the previous chunk as
+read-only context (the overlap), so a chunk's own text never repeats and the
+cleaned chunks can simply be joined back together. Chunks are processed
+concurrently (the shared LLM rate limiter still applies) and their partial
+results are merged in a reduce step, so latency follows the longest chunk
+rather than the length of the whole video.
+"""
+
+import asyncio
+import re
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional
+
+from ..core.config import settings
+from .rate_limiter import estimate_tokens
+
+# Timestamps such as [00:15], (1:02:03), 00:12:34 or 0:05
+TIMESTAMP_RE = re.compile(r'[\[(]?\b\d{1,2}(?::\d{2}){1,2}\b[\])]?')
+# A sentence ends at a terminator; a line break or a timestamp also starts a new unit
+_UNIT_RE = re.compile(r'[^.!?؟…\n]*(?:[.!?؟…]+[ \t]*|\n+|$)')
+
+
+@dataclass
+class TranscriptChunk:
+    """One chunk of a transcript"""
+    index: int
+    text: str
+    context: str = ""
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.text)
+
+
+def _split_units(text: str) -> List[str]:
+    """Sentence-sized units, also broken before every timestamp"""
+    units = []
+    for piece in _split_at_timestamps(text):
+        for match in _UNIT_RE.finditer(piece):
+            unit = match.group()
+            if not unit:
+                continue
+            if units and not unit.strip():
+                # Whitespace stays attached to the previous unit so chunks join back losslessly
+                units[-1] += unit
+            else:
+                units.append(unit)
+    return units
+
+
+def _split_at_timestamps(text: str) -> Iterable[str]:
+    start = 0
+    for match in TIMESTAMP_RE.finditer(text):
+        if match.start() > start:
+            yield text[start:match.start()]
+        start = match.start()
+    yield text[start:]
+
+
+def _split_long_unit(unit: str, max_tokens: int) -> List[str]:
+    """Break a unit longer than the budget on word boundaries"""
+    parts, current = [], []
+    for word in unit.split(' '):
+        if current and estimate_tokens(' '.join(current + [word])) > max_tokens:
+            parts.append(' '.join(current) + ' ')
+            current = []
+        current.append(word)
+    if current:
+        parts.append(' '.join(current))
+    return parts
+
+
+def split_transcript(text: str, max_tokens: Optional[int] = None,
+                     overlap_tokens: Optional[int] = None) -> List[TranscriptChunk]:
+    """Split `text` into chunks of at most `max_tokens` with `overlap_tokens` of context"""
+    max_tokens = max_tokens or settings.transcript_chunk_tokens
+    overlap_tokens = settings.transcript_chunk_overlap_tokens if overlap_tokens is None else overlap_tokens
+
+    units: List[str] = []
+    for unit in _split_units(text):
+        if estimate_tokens(unit) > max_tokens:
+            units.extend(_split_long_unit(unit, max_tokens))
+        else:
+            units.append(unit)
+
+    chunks: List[TranscriptChunk] = []
+    current = ""
+    for unit in units:
+        # The budget is checked against the whole chunk: per-unit estimates round down and undercount
+        candidate = current + unit
+        if current and estimate_tokens(candidate) > max_tokens:
+            chunks.append(TranscriptChunk(index=len(chunks), text=current))
+            candidate = unit
+        current = candidate
+    if current or not chunks:
+        chunks.append(TranscriptChunk(index=len(chunks), text=current))
+
+    if overlap_tokens > 0:
+        for previous, chunk in zip(chunks, chunks[1:]):
+            chunk.context = _tail(previous.text, overlap_tokens)
+    return chunks
+
+
+def _tail(text: str, max_tokens: int) -> str:
+    """Trailing whole units of `text` that fit in `max_tokens`"""
+    tail: List[str] = []
+    tokens = 0
+    for unit in reversed(_split_units(text)):
+        unit_tokens = estimate_tokens(unit)
+        if tail and tokens + unit_tokens > max_tokens:
+            break
+        if unit_tokens > max_tokens:
+            break
+        tail.insert(0, unit)
+        tokens += unit_tokens
+    return ''.join(tail).strip()
+
+
+async def map_chunks(chunks: List[TranscriptChunk],
+                     process: Callable[[TranscriptChunk], Awaitable[Any]],
+                     on_progress: Optional[Callable[[int, int], None]] = None) -> List[Any]:
+    """Run `process` on every chunk concurrently; results keep chunk order"""
+    done = 0
+
+    async def run(chunk: TranscriptChunk) -> Any:
+        nonlocal done
+        result = await process(chunk)
+        done += 1
+        if on_progress:
+            on_progress(done, len(chunks))
+        return result
+
+    return await asyncio.gather(*(run(chunk) for chunk in chunks))
+
+
+def with_context(chunk: TranscriptChunk, body: str) -> str:
+    """Prefix a prompt section with the chunk's overlap context, when it has one"""
+    if not chunk.context:
+        return body
+    return (
+        "سياق من الجزء السابق (للاستمرارية فقط، لا تُعِد كتابته):\n"
+        f"{chunk.context}\n\n{body}"
+    )
+
+
+def merge_key_points(partials: List[Dict[str, Any]], max_items: int = 12) -> Dict[str, Any]:
+    """Reduce step: merge per-chunk key-point dicts, de-duplicating list items in order"""
+    merged: Dict[str, Any] = {}
+    seen: Dict[str, set] = {}
+    for partial in partials:
+        for key, value in partial.items():
+            if isinstance(value, list):
+                items = merged.setdefault(key, [])
+                keys = seen.setdefault(key, set())
+                for item in value:
+                    normalized = ' '.join(str(item).split())
+                    if normalized and normalized not in keys and len(items) < max_items:
+                        keys.add(normalized)
+                        items.append(item)
+            elif key not in merged and value:
+                # Scalars such as main_topic come from the first chunk that has them
+                merged[key] = value
+    return merged
@@ -0,0 +1,70 @@
+"""Chunked upload handling.
+
+Uploads are copied to their destination in fixed-size chunks while the
+SHA-256 digest and byte count are computed on the fly. The size limit is
+checked against the declared size before the first read and against the
+running total after every chunk, so an oversized upload is rejected as soon
+as it crosses the limit and peak memory per upload stays at one chunk.
+"""
+
+import asyncio
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+from fastapi import UploadFile
+
+from ..core.config import settings
+
+
+class UploadTooLargeError(ValueError):
+    """The upload exceeds the configured size limit"""
+
+
+@dataclass
+class StoredUpload:
+    """An upload written to disk"""
+    path: Path
+    size: int
+    sha256: str
+
+
+async def store_upload(upload: UploadFile, destination: Path,
+                       max_bytes: Optional[int] = None,
+                       chunk_size: Optional[int] = None) -> StoredUpload:
+    """Stream `upload` into `destination`, hashing and size-checking as it goes.
+
+    A partially written file is removed if the upload is rejected or fails.
+    """
+    max_bytes = settings.max_upload_bytes if max_bytes is None else max_bytes
+    chunk_size = chunk_size or settings.upload_chunk_size
+
+    declared_size = getattr(upload, "size", None)
+    if max_bytes and declared_size is not None and declared_size > max_bytes:
+        raise UploadTooLargeError(f"Upload of {declared_size} bytes exceeds the {max_bytes} byte limit")
+
+    digest = hashlib.sha256()
+    size = 0
+    loop = asyncio.get_running_loop()
+    try:
+        with open(destination, "wb") as buffer:
+            while True:
+                chunk = await upload.read(chunk_size)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if max_bytes and size > max_bytes:
+                    raise UploadTooLargeError(f"Upload exceeds the {max_bytes} byte limit")
+                digest.update(chunk)
+                # Disk writes run off the event loop, like UploadFile.read itself
+                await loop.run_in_executor(None, buffer.write, chunk)
+    except BaseException:
+        try:
+            os.remove(destination)
+        except OSError:
+            pass
+        raise
+
+    return StoredUpload(path=destination, size=size, sha256=digest.hexdigest())
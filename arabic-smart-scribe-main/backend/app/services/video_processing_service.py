@@ -4,6 +4,9 @@ from typing import Dict, Any, List, Optional
 import json
 import re
 from ..core.config import settings
+from .gemini_service import gemini_service
+from .rate_limiter import Priority
+from .transcript_chunking import map_chunks, merge_key_points, split_transcript, with_context
 
 class VideoProcessingService:
     def __init__(self):
@@ -13,12 +16,20 @@ class VideoProcessingService:
             print("Warning: GEMINI_API_KEY not configured")
 
     async def clean_transcript(self, raw_transcript: str) -> Dict[str, Any]:
-        """Step 1: Clean transcript and remove timestamps, filler words"""
+        """Step 1: Clean transcript and remove timestamps, filler words.
+
+        Long transcripts are split into chunks that are cleaned concurrently
+        and joined back in order.
+        """
         try:
             if not settings.gemini_api_key:
                 raise Exception("Gemini API Key is not configured.")
 
-            prompt = f"""قم بتنظيف النص التالي المستخرج من فيديو. اتبع هذه التعليمات:
+            chunks = split_transcript(raw_transcript)
+
+            async def clean_chunk(chunk) -> str:
+                source = with_context(chunk, "النص الخام:\n" + chunk.text)
+                prompt = f"""قم بتنظيف النص التالي المستخرج من فيديو. اتبع هذه التعليمات:
 
 1. أزل جميع الطوابع الزمنية (مثل: 00:12:34, [0:05])
 2. أزل الكلمات الحشو والتكرارات غير المفيدة (مثل: يعني، أه، إم، هذا...)
@@ -27,33 +38,39 @@ class VideoProcessingService:
 5. اربط الجمل المقطوعة لتكوين فقرات متماسكة
 6. احتفظ بالمعنى الأصلي والمعلومات المهمة
 
-النص الخام:
-{raw_transcript}
+{source}
 
 النص المنظف:"""
+                return (await gemini_service.generate_content(prompt)).strip()
+
+            cleaned_text = "\n\n".join(await map_chunks(chunks, clean_chunk))
+            original_words = len(raw_transcript.split())
 
-            model = genai.GenerativeModel('gemini-1.5-flash-latest')
-            response = await model.generate_content_async(prompt)
-            
-            cleaned_text = response.text.strip()
-            
             return {
                 "cleaned_text": cleaned_text,
-                "original_length": len(raw_transcript.split()),
+                "original_length": original_words,
                 "cleaned_length": len(cleaned_text.split()),
-                "reduction_percentage": ((len(raw_transcript.split()) - len(cleaned_text.split())) / len(raw_transcript.split())) * 100
+                "reduction_percentage": ((original_words - len(cleaned_text.split())) / original_words) * 100,
+                "chunks": len(chunks)
             }
             
         except Exception as e:
             raise Exception(f"خطأ في تنظيف النص: {str(e)}")
 
     async def extract_key_points(self, cleaned_text: str) -> Dict[str, Any]:
-        """Step 2: Extract and summarize key points from content"""
+        """Step 2: Extract and summarize key points from content.
+
+        Key points are extracted per chunk in parallel (map) and merged into a
+        single de-duplicated structure (reduce).
+        """
         try:
             if not settings.gemini_api_key:
                 raise Exception("Gemini API Key is not configured.")
 
-            prompt = f"""حلل النص التالي واستخرج النقاط الرئيسية بشكل منظم:
+            chunks = split_transcript(cleaned_text)
+
+            async def extract_chunk(chunk) -> Optional[Dict[str, Any]]:
+                prompt = f"""حلل النص التالي واستخرج النقاط الرئيسية بشكل منظم:
 
 1. الموضوع الرئيسي والهدف من المحتوى
 2. النقاط الأساسية والأفكار المحورية (5-8 نقاط)
@@ -74,25 +91,29 @@ class VideoProcessingService:
   "suggested_subtitles": ["عنوان 1", "عنوان 2", ...]
 }}
 
-النص: {cleaned_text}"""
+{with_context(chunk, f"النص: {chunk.text}")}"""
 
-            model = genai.GenerativeModel('gemini-1.5-flash-latest')
-            response = await model.generate_content_async(prompt)
-            
-            try:
-                result = json.loads(response.text.strip())
-                return result
-            except json.JSONDecodeError:
-                # Fallback if JSON parsing fails
-                return {
-                    "main_topic": "موضوع غير محدد",
-                    "key_points": ["نقطة رئيسية"],
-                    "supporting_details": ["تفاصيل داعمة"],
-                    "characters": [],
-                    "timeline": [],
-                    "main_messages": ["رسالة رئيسية"],
-                    "suggested_subtitles": ["عنوان فرعي"]
-                }
+                response_text = await gemini_service.generate_content(prompt)
+                try:
+                    result = json.loads(response_text)
+                except json.JSONDecodeError:
+                    return None
+                return result if isinstance(result, dict) else None
+
+            partials = [p for p in await map_chunks(chunks, extract_chunk) if p]
+            if partials:
+                return merge_key_points(partials)
+
+            # Fallback if JSON parsing fails
+            return {
+                "main_topic": "موضوع غير محدد",
+                "key_points": ["نقطة رئيسية"],
+                "supporting_details": ["تفاصيل داعمة"],
+                "characters": [],
+                "timeline": [],
+                "main_messages": ["رسالة رئيسية"],
+                "suggested_subtitles": ["عنوان فرعي"]
+            }
                 
         except Exception as e:
             raise Exception(f"خطأ في استخراج النقاط الرئيسية: {str(e)}")
@@ -147,11 +168,10 @@ class VideoProcessingService:
   "total_estimated_words": 15000
 }}"""
 
-            model = genai.GenerativeModel('gemini-1.5-flash-latest')
-            response = await model.generate_content_async(prompt)
+            response_text = await gemini_service.generate_content(prompt)
             
             try:
-                result = json.loads(response.text.strip())
+                result = json.loads(response_text)
                 return result
             except json.JSONDecodeError:
                 # Fallback outline
@@ -212,10 +232,7 @@ class VideoProcessingService:
 
 اكتب الفصل كاملاً:"""
 
-            model = genai.GenerativeModel('gemini-1.5-flash-latest')
-            response = await model.generate_content_async(prompt)
-            
-            chapter_text = response.text.strip()
+            chapter_text = await gemini_service.generate_content(prompt, priority=Priority.BATCH)
             word_count = len(chapter_text.split())
             
             return {
@@ -1,34 +1,38 @@
-from celery import Celery
+from celery import Celery, chain, chord, group
 from app.core.config import settings
 import redis
 import json
-from typing import Dict, Any, Optional
+from datetime import datetime
+from typing import Dict, Any, List, Optional
 import asyncio
 from app.services.gemini_service import GeminiService
-from app.services.youtube_service import YouTubeService
+from app.services.rate_limiter import Priority
+from app.services.transcript_chunking import map_chunks, split_transcript, with_context
 
 # Celery app configuration
 celery_app = Celery(
     "arabic_smart_scribe",
-    broker=settings.REDIS_URL,
-    backend=settings.REDIS_URL,
-    include=['app.tasks.video_tasks', 'app.tasks.shahid_tasks']
+    broker=settings.redis_url,
+    backend=settings.redis_url,
+    include=['app.tasks.video_tasks']
 )
 
 # Redis client for task state management
-redis_client = redis.from_url(settings.REDIS_URL)
+redis_client = redis.from_url(settings.redis_url)
 
 class TaskStateManager:
     """Manages task state and progress updates"""
     
     @staticmethod
-    def update_task_progress(task_id: str, step: str, progress: int, status: str, result: Optional[Any] = None, error: Optional[str] = None):
+    def update_task_progress(task_id: str, step: str, progress: int, status: str, result: Optional[Any] = None,
+                             error: Optional[str] = None, message: Optional[str] = None):
         """Update task progress in Redis"""
         task_data = {
             'task_id': task_id,
             'step': step,
             'progress': progress,
             'status': status,
+            'message': message,
             'result': result,
             'error': error,
             'timestamp': str(datetime.utcnow())
@@ -45,19 +49,16 @@ class TaskStateManager:
 
 @celery_app.task(bind=True)
 def extract_transcript_task(self, video_url: str):
-    """استخراج النص من فيديو يوتيوب مع تحديثات التقدم"""
+    """استخراج النص من فيديو يوتيوب مع تحديثات التقدم - Step 1"""
     try:
         # تحديث التقدم - بدء المهمة
         TaskStateManager.update_task_progress(
             self.request.id, 'transcript_extraction', 10, 'running', 
             message='بدء استخراج معرف الفيديو...'
         )
-    """Extract transcript from video - Step 1"""
-    try:
-        TaskStateManager.update_task_progress(
-            self.request.id, 'transcript_extraction', 10, 'running'
-        )
         
+        # Imported here so the module (and the other tasks) load even where the YouTube client is absent
+        from app.services.youtube_service import YouTubeService
         youtube_service = YouTubeService()
         
         # Extract video ID
@@ -95,9 +96,11 @@ def clean_transcript_task(self, transcript: str):
         )
         
         gemini_service = GeminiService()
+        chunks = split_transcript(transcript)
         
-        # Advanced cleaning prompt
-        cleaning_prompt = f"""
+        async def clean_chunk(chunk) -> str:
+            # Advanced cleaning prompt
+            cleaning_prompt = f"""
         قم بتنظيف وتنسيق النص التالي المستخرج من فيديو يوتيوب:
         
         المهام المطلوبة:
@@ -108,17 +111,20 @@ def clean_transcript_task(self, transcript: str):
         5. تجميع الأفكار المترابطة في فقرات
         6. الحفاظ على المعنى الأصلي والسياق
         
-        النص الأصلي:
-        {transcript}
+        {with_context(chunk, "النص الأصلي:")}
+        {chunk.text}
         
         أرجع النص المنظف فقط دون أي تعليقات إضافية.
         """
+            return (await gemini_service.generate_content(cleaning_prompt)).strip()
         
-        TaskStateManager.update_task_progress(
-            self.request.id, 'text_cleaning', 50, 'running'
-        )
+        def on_progress(done: int, total: int) -> None:
+            TaskStateManager.update_task_progress(
+                self.request.id, 'text_cleaning', 10 + int(85 * done / total), 'running'
+            )
         
-        cleaned_text = gemini_service.generate_content(cleaning_prompt)
+        # Chunks are cleaned concurrently and joined back in order
+        cleaned_text = "\n\n".join(asyncio.run(map_chunks(chunks, clean_chunk, on_progress)))
         
         TaskStateManager.update_task_progress(
             self.request.id, 'text_cleaning', 100, 'completed',
@@ -180,7 +186,7 @@ def generate_outline_task(self, cleaned_text: str):
             self.request.id, 'outline_generation', 70, 'running'
         )
         
-        outline_response = gemini_service.generate_content(outline_prompt)
+        outline_response = asyncio.run(gemini_service.generate_content(outline_prompt))
         
         # Parse JSON response
         try:
@@ -211,34 +217,9 @@ def generate_outline_task(self, cleaned_text: str):
         )
         raise
 
-@celery_app.task(bind=True)
-def write_chapters_task(self, outline: Dict[str, Any], cleaned_text: str):
-    """Write all book chapters - Step 4"""
-    try:
-        TaskStateManager.update_task_progress(
-            self.request.id, 'chapter_writing', 5, 'running'
-        )
-        
-        gemini_service = GeminiService()
-        chapters = []
-        total_chapters = len(outline.get('chapters', []))
-        
-        # Write introduction
-        introduction = outline.get('introduction', '')
-        chapters.append({
-            'type': 'introduction',
-            'title': 'مقدمة',
-            'content': introduction
-        })
-        
-        # Write each chapter
-        for i, chapter_outline in enumerate(outline.get('chapters', [])):
-            progress = int(10 + (i / total_chapters) * 80)
-            TaskStateManager.update_task_progress(
-                self.request.id, 'chapter_writing', progress, 'running'
-            )
-            
-            chapter_prompt = f"""
+def _chapter_prompt(chapter_outline: Dict[str, Any], reference_text: str) -> str:
+    """Prompt for writing one chapter of the book"""
+    return f"""
             اكتب الفصل التالي من الكتاب بناءً على المخطط والنص الأصلي:
             
             عنوان الفصل: {chapter_outline['title']}
@@ -253,49 +234,96 @@ def write_chapters_task(self, outline: Dict[str, Any], cleaned_text: str):
             5. خاتمة تربط بالفصل التالي
             
             النص الأصلي للمرجعية:
-            {cleaned_text[:2000]}...
+            {reference_text[:2000]}...
             
             اكتب المحتوى كاملاً دون عناوين فرعية إضافية.
             """
-            
-            chapter_content = gemini_service.generate_content(chapter_prompt)
-            
-            chapters.append({
-                'type': 'chapter',
-                'number': chapter_outline['number'],
-                'title': chapter_outline['title'],
-                'content': chapter_content
-            })
-        
-        # Write conclusion
-        conclusion = outline.get('conclusion', '')
+
+def _chapter_lanes(total_chapters: int) -> int:
+    """Number of chapters written in parallel.
+
+    Capped by chapter_writing_max_parallel and by the LLM concurrency and
+    requests-per-minute limits, so the fan-out never asks for more parallel
+    calls than the rate limiter would let through.
+    """
+    cap = settings.chapter_writing_max_parallel
+    for limit in (settings.llm_max_concurrency, settings.llm_requests_per_minute):
+        if limit > 0:
+            cap = min(cap, limit)
+    return max(1, min(cap, total_chapters))
+
+def _chapters_done_key(parent_task_id: str) -> str:
+    return f"task:{parent_task_id}:chapters_done"
+
+def _build_book(outline: Dict[str, Any], written_chapters: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Introduction, chapters in outline order, conclusion"""
+    chapters = [{
+        'type': 'introduction',
+        'title': 'مقدمة',
+        'content': outline.get('introduction', '')
+    }]
+    for written in sorted(written_chapters, key=lambda chapter: chapter['index']):
         chapters.append({
-            'type': 'conclusion',
-            'title': 'خاتمة',
-            'content': conclusion
+            'type': 'chapter',
+            'number': written['number'],
+            'title': written['title'],
+            'content': written['content']
         })
-        
+    chapters.append({
+        'type': 'conclusion',
+        'title': 'خاتمة',
+        'content': outline.get('conclusion', '')
+    })
+    return {
+        'title': outline.get('title', 'كتاب من فيديو'),
+        'chapters': chapters,
+        'total_chapters': len(chapters),
+        'word_count': sum(len(ch['content'].split()) for ch in chapters)
+    }
+
+def _chapter_lane(lane_chapters: List[tuple], reference_text: str, parent_task_id: str, total_chapters: int):
+    """Chain of chapter subtasks; each one receives the chapters written before it in the lane"""
+    signatures = []
+    for position, (index, chapter_outline) in enumerate(lane_chapters):
+        args = (index, chapter_outline, reference_text, parent_task_id, total_chapters)
+        if position == 0:
+            signatures.append(write_chapter_task.s([], *args))
+        else:
+            signatures.append(write_chapter_task.s(*args))
+    return chain(*signatures)
+
+@celery_app.task(bind=True)
+def write_chapters_task(self, outline: Dict[str, Any], cleaned_text: str):
+    """Write all book chapters - Step 4
+
+    Chapters fan out as a chord: the outline's chapters are dealt round-robin
+    into a capped number of lanes, each lane a chain of one subtask per
+    chapter, and assemble_book_task joins them in outline order. The task
+    replaces itself with the chord, so its result is still the assembled book.
+    """
+    try:
         TaskStateManager.update_task_progress(
-            self.request.id, 'chapter_writing', 100, 'completed',
-            result={
-                'book': {
-                    'title': outline.get('title', 'كتاب من فيديو'),
-                    'chapters': chapters,
-                    'total_chapters': len(chapters),
-                    'word_count': sum(len(ch['content'].split()) for ch in chapters)
-                }
-            }
+            self.request.id, 'chapter_writing', 5, 'running'
         )
         
-        return {
-            'book': {
-                'title': outline.get('title', 'كتاب من فيديو'),
-                'chapters': chapters,
-                'total_chapters': len(chapters),
-                'word_count': sum(len(ch['content'].split()) for ch in chapters)
-            },
-            'task_id': self.request.id
-        }
+        chapter_outlines = outline.get('chapters', [])
+        total_chapters = len(chapter_outlines)
+        redis_client.delete(_chapters_done_key(self.request.id))
+        
+        if not chapter_outlines:
+            return assemble_book_task([], outline, self.request.id)
+        
+        # Only the start of the source text is used by the prompt
+        reference_text = cleaned_text[:2000]
+        lanes = _chapter_lanes(total_chapters)
+        header = group(
+            _chapter_lane(
+                [(index, chapter_outlines[index]) for index in range(lane, total_chapters, lanes)],
+                reference_text, self.request.id, total_chapters
+            )
+            for lane in range(lanes)
+        )
+        workflow = chord(header, assemble_book_task.s(outline, self.request.id))
         
     except Exception as e:
         TaskStateManager.update_task_progress(
@@ -303,6 +331,59 @@ def write_chapters_task(self, outline: Dict[str, Any], cleaned_text: str):
             error=str(e)
         )
         raise
+    
+    return self.replace(workflow)
+
+@celery_app.task(bind=True)
+def write_chapter_task(self, written: List[Dict[str, Any]], index: int, chapter_outline: Dict[str, Any],
+                       reference_text: str, parent_task_id: str, total_chapters: int):
+    """Write one chapter and append it to its lane's results"""
+    try:
+        gemini_service = GeminiService()
+        chapter_content = asyncio.run(gemini_service.generate_content(
+            _chapter_prompt(chapter_outline, reference_text), priority=Priority.BATCH
+        ))
+        
+        # Progress counts finished chapters across all lanes
+        done_key = _chapters_done_key(parent_task_id)
+        completed = redis_client.incr(done_key)
+        redis_client.expire(done_key, 3600)
+        TaskStateManager.update_task_progress(
+            parent_task_id, 'chapter_writing', int(10 + (completed / total_chapters) * 80), 'running',
+            result={'chapters_completed': completed, 'total_chapters': total_chapters}
+        )
+        
+        return written + [{
+            'index': index,
+            'number': chapter_outline.get('number', index + 1),
+            'title': chapter_outline['title'],
+            'content': chapter_content
+        }]
+        
+    except Exception as e:
+        TaskStateManager.update_task_progress(
+            parent_task_id, 'chapter_writing', 0, 'error',
+            error=f"Chapter {index + 1}: {str(e)}"
+        )
+        raise
+
+@celery_app.task(bind=True)
+def assemble_book_task(self, lane_results: List[List[Dict[str, Any]]], outline: Dict[str, Any],
+                       parent_task_id: str):
+    """Chord callback: assemble the book in outline order"""
+    written_chapters = [chapter for lane in lane_results for chapter in lane]
+    book = _build_book(outline, written_chapters)
+    
+    TaskStateManager.update_task_progress(
+        parent_task_id, 'chapter_writing', 100, 'completed',
+        result={'book': book}
+    )
+    redis_client.delete(_chapters_done_key(parent_task_id))
+    
+    return {
+        'book': book,
+        'task_id': parent_task_id
+    }
 
 
 
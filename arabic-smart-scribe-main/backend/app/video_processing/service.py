@@ -1,19 +1,23 @@
 
-import asyncio
 from typing import Dict, Any
 from ..services.gemini_service import gemini_service
+from ..services.rate_limiter import Priority
+from ..services.transcript_chunking import map_chunks, split_transcript, with_context
 
 class VideoProcessingService:
     """Service for processing videos and converting them to books"""
     
     async def clean_transcript(self, raw_transcript: str) -> Dict[str, Any]:
-        """Clean transcript from timestamps and filler words"""
+        """Clean transcript from timestamps and filler words, chunk by chunk in parallel"""
         
-        cleaning_prompt = f"""
+        chunks = split_transcript(raw_transcript)
+
+        async def clean_chunk(chunk) -> str:
+            cleaning_prompt = f"""
         قم بتنظيف النص التالي من الطوابع الزمنية والكلمات الحشو والتكرارات غير المفيدة:
 
-        النص الخام:
-        {raw_transcript}
+        {with_context(chunk, "النص الخام:")}
+        {chunk.text}
 
         المطلوب:
         1. إزالة جميع الطوابع الزمنية (مثل [00:15], 0:30, إلخ)
@@ -24,14 +28,19 @@ class VideoProcessingService:
 
         أعد كتابة النص منظماً وواضحاً مع الحفاظ على جميع المعلومات المهمة.
         """
+            return await gemini_service.generate_content(cleaning_prompt)
         
         try:
-            cleaned_text = await gemini_service.generate_content(cleaning_prompt)
+            cleaned_parts = await map_chunks(chunks, clean_chunk)
+            cleaned_text = cleaned_parts[0] if len(cleaned_parts) == 1 else "\n\n".join(
+                part.strip() for part in cleaned_parts
+            )
             
             return {
                 "original_length": len(raw_transcript),
                 "cleaned_length": len(cleaned_text),
                 "cleaned_text": cleaned_text,
+                "chunks": len(chunks),
                 "status": "success"
             }
         except Exception as e:
@@ -41,13 +50,20 @@ class VideoProcessingService:
             }
     
     async def extract_key_points(self, cleaned_text: str) -> Dict[str, Any]:
-        """Extract and organize key points from cleaned text"""
+        """Extract and organize key points from cleaned text.
+
+        Each chunk is analysed in parallel; with more than one chunk the partial
+        analyses are merged by a final reduce prompt.
+        """
         
-        extraction_prompt = f"""
+        chunks = split_transcript(cleaned_text)
+
+        async def extract_chunk(chunk) -> str:
+            extraction_prompt = f"""
         من النص التالي، استخرج النقاط الرئيسية وصنفها:
 
-        النص:
-        {cleaned_text}
+        {with_context(chunk, "النص:")}
+        {chunk.text}
 
         المطلوب:
         1. استخرج 5-10 نقاط رئيسية من النص
@@ -58,14 +74,37 @@ class VideoProcessingService:
 
         أعط النتيجة في شكل منظم وواضح.
         """
+            return await gemini_service.generate_content(extraction_prompt)
         
         try:
-            key_points_analysis = await gemini_service.generate_content(extraction_prompt)
+            partials = await map_chunks(chunks, extract_chunk)
+            if len(partials) == 1:
+                key_points_analysis = partials[0]
+            else:
+                sections = "\n\n".join(
+                    f"--- الجزء {index + 1} ---\n{partial}" for index, partial in enumerate(partials)
+                )
+                reduce_prompt = f"""
+        فيما يلي تحليلات للنقاط الرئيسية لأجزاء متتالية من نص واحد طويل:
+
+        {sections}
+
+        المطلوب:
+        1. ادمج هذه التحليلات في قائمة واحدة من 5-10 نقاط رئيسية دون تكرار
+        2. صنف النقاط إلى مواضيع (مثل: مقدمة، تطوير، تحديات، حلول، خلاصة)
+        3. لكل نقطة، اكتب تلخيصاً مختصراً (2-3 جمل)
+        4. حدد الكلمات المفتاحية المهمة
+        5. اقترح عنواناً مناسباً للمحتوى كاملاً
+
+        أعط النتيجة في شكل منظم وواضح.
+        """
+                key_points_analysis = await gemini_service.generate_content(reduce_prompt)
             
             return {
                 "key_points": key_points_analysis,
                 "word_count": len(cleaned_text.split()),
                 "estimated_reading_time": len(cleaned_text.split()) // 200,  # تقدير وقت القراءة
+                "chunks": len(chunks),
                 "status": "success"
             }
         except Exception as e:
@@ -140,7 +179,7 @@ class VideoProcessingService:
         """
         
         try:
-            chapter_content = await gemini_service.generate_content(chapter_prompt)
+            chapter_content = await gemini_service.generate_content(chapter_prompt, priority=Priority.BATCH)
             
             return {
                 "chapter_number": chapter_info.get('chapter_number', 1),
@@ -196,9 +235,6 @@ class VideoProcessingService:
                 
                 if chapter_result["status"] == "success":
                     chapters.append(chapter_result)
-                
-                # إضافة تأخير بسيط لتجنب تجاوز حدود API
-                await asyncio.sleep(1)
             
             return {
                 "status": "success",
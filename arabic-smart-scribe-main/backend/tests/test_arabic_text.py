@@ -0,0 +1,21 @@
+from app.services.arabic_text import analyze_structure, count_words, normalize_arabic
+
+def test_normalize_strips_diacritics_and_tatweel():
+    """Diacritics and tatweel do not change the normalized form"""
+    assert normalize_arabic("جـــاءَ") == "جاء"
+    assert normalize_arabic("أحمد", unify_alef=True) == "احمد"
+
+def test_structure_splits_on_arabic_punctuation_with_offsets():
+    """The Arabic question mark ends a sentence; commas and line breaks are handled"""
+    text = "هل جاء الولد؟ نعم، جاء.\n\nسطر بلا نقطة"
+    structure = analyze_structure(text)
+
+    assert structure.word_count == 8 == count_words(text)
+    assert [structure.sentence_text(s) for s in structure.sentences] == [
+        "هل جاء الولد؟", "نعم، جاء.", "سطر بلا نقطة"
+    ]
+    assert structure.paragraph_count == 2
+    assert structure.has_terminal_punctuation
+
+    token = structure.tokens[2]
+    assert text[token.start:token.end] == "الولد"
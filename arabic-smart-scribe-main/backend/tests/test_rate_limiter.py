@@ -0,0 +1,57 @@
+import asyncio
+
+import pytest
+
+from app.services.rate_limiter import LLMRateLimiter, Priority, TokenBucket
+
+@pytest.mark.asyncio
+async def test_limiter_caps_concurrency():
+    """No more than max_concurrency calls run at once"""
+    limiter = LLMRateLimiter(max_concurrency=2, requests_per_minute=0)
+    running = 0
+    peak = 0
+
+    async def call():
+        nonlocal running, peak
+        async with limiter.acquire():
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01)
+            running -= 1
+
+    await asyncio.gather(*[call() for _ in range(6)])
+    assert peak == 2
+    assert limiter.stats()["active"] == 0
+
+@pytest.mark.asyncio
+async def test_interactive_requests_are_served_before_batch():
+    """Queued interactive calls jump ahead of queued batch calls"""
+    limiter = LLMRateLimiter(max_concurrency=1, requests_per_minute=0)
+    order = []
+    gate = asyncio.Event()
+
+    async def holder():
+        async with limiter.acquire():
+            await gate.wait()
+
+    async def call(name, priority):
+        async with limiter.acquire(priority):
+            order.append(name)
+
+    first = asyncio.create_task(holder())
+    await asyncio.sleep(0)
+    batch = [asyncio.create_task(call(f"batch{i}", Priority.BATCH)) for i in range(2)]
+    await asyncio.sleep(0)
+    interactive = asyncio.create_task(call("interactive", Priority.INTERACTIVE))
+    await asyncio.sleep(0)
+
+    assert limiter.stats()["queue_depth"] == 3
+    gate.set()
+    await asyncio.gather(first, interactive, *batch)
+    assert order == ["interactive", "batch0", "batch1"]
+
+def test_token_bucket_reports_wait_time():
+    """An empty bucket reports how long until it refills"""
+    bucket = TokenBucket(rate_per_minute=60)
+    bucket.consume(60)
+    assert bucket.wait_time(1) > 0
@@ -0,0 +1,22 @@
+import asyncio
+
+import pytest
+
+from app.services.request_coalescing import SingleFlight
+
+@pytest.mark.asyncio
+async def test_single_flight_coalesces_concurrent_calls():
+    """Concurrent identical calls share one upstream execution"""
+    flight = SingleFlight()
+    calls = 0
+
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "result"
+
+    results = await asyncio.gather(*[flight.do("same", upstream) for _ in range(5)])
+    assert results == ["result"] * 5
+    assert calls == 1
+    assert flight.stats()["coalesced"] == 4
@@ -0,0 +1,41 @@
+import pytest
+
+from app.services.response_cache import LRUCacheTier, ResponseCache, make_cache_key
+
+def test_cache_key_depends_on_model_prompt_and_params():
+    """The cache key changes with any part of the request"""
+    base = make_cache_key("model-a", "نص", {"temperature": 0.3})
+    assert base == make_cache_key("model-a", "نص", {"temperature": 0.3})
+    assert base != make_cache_key("model-b", "نص", {"temperature": 0.3})
+    assert base != make_cache_key("model-a", "نص آخر", {"temperature": 0.3})
+    assert base != make_cache_key("model-a", "نص", {"temperature": 0.7})
+
+def test_lru_tier_evicts_by_entries_and_bytes():
+    """Least recently used entries are evicted first"""
+    tier = LRUCacheTier(max_entries=2, max_bytes=1024)
+    tier.set("a", "1")
+    tier.set("b", "2")
+    tier.get("a")
+    tier.set("c", "3")
+    assert tier.get("b") is None
+    assert tier.get("a") == "1"
+
+    small = LRUCacheTier(max_entries=10, max_bytes=10)
+    small.set("a", "12345")
+    small.set("b", "67890")
+    small.set("c", "x")
+    assert small.get("a") is None
+    assert small.size_bytes <= 10
+
+@pytest.mark.asyncio
+async def test_response_cache_counts_hits_and_misses():
+    """Hit/miss counters reflect lookups"""
+    cache = ResponseCache(LRUCacheTier())
+    assert await cache.get("key") is None
+    await cache.set("key", "value")
+    assert await cache.get("key") == "value"
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
@@ -0,0 +1,55 @@
+import asyncio
+import random
+
+import pytest
+
+from app.services.transcript_chunking import map_chunks, merge_key_points, split_transcript
+
+def test_split_transcript_respects_boundaries_and_overlap():
+    """Chunks rejoin to the original text, start on unit boundaries and carry context"""
+    transcript = "".join(
+        f"[00:{i % 60:02d}] هذه الجملة رقم {i} من النص. وهذه جملة أخرى؟\n" for i in range(200)
+    )
+
+    chunks = split_transcript(transcript, max_tokens=150, overlap_tokens=30)
+
+    assert len(chunks) > 1
+    assert "".join(chunk.text for chunk in chunks) == transcript
+    assert chunks[0].context == ""
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.text.startswith(("[", "وهذه"))
+        assert chunk.context and previous.text.rstrip().endswith(chunk.context)
+
+def test_split_transcript_never_exceeds_the_budget():
+    """Many short units whose per-unit estimates round down still fit the budget"""
+    rng = random.Random(0)
+    words = ["كلمة", "في", "نص", "طويل", "جدا", "و", "من"]
+    transcript = " ".join(
+        rng.choice(words) + rng.choice(["", "", ".", "؟", "\n"]) for _ in range(5000)
+    )
+
+    chunks = split_transcript(transcript, max_tokens=200, overlap_tokens=20)
+
+    assert "".join(chunk.text for chunk in chunks) == transcript
+    assert max(chunk.tokens for chunk in chunks) <= 200
+
+@pytest.mark.asyncio
+async def test_map_chunks_keeps_order_and_merge_deduplicates():
+    """Chunks finishing out of order are returned in order; reduce drops duplicate points"""
+    chunks = split_transcript("أ. " * 40, max_tokens=10, overlap_tokens=0)
+    progress = []
+
+    async def process(chunk):
+        await asyncio.sleep(0.001 * (len(chunks) - chunk.index))
+        return chunk.index
+
+    results = await map_chunks(chunks, process, lambda done, total: progress.append((done, total)))
+
+    assert results == list(range(len(chunks)))
+    assert progress[-1] == (len(chunks), len(chunks))
+
+    merged = merge_key_points([
+        {"main_topic": "الأول", "key_points": ["نقطة 1", "نقطة 2"]},
+        {"main_topic": "الثاني", "key_points": ["نقطة  2", "نقطة 3"]},
+    ])
+    assert merged == {"main_topic": "الأول", "key_points": ["نقطة 1", "نقطة 2", "نقطة 3"]}
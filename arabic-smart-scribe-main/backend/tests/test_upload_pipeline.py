@@ -0,0 +1,31 @@
+import hashlib
+import io
+
+import pytest
+from fastapi import UploadFile
+
+from app.services.upload_pipeline import UploadTooLargeError, store_upload
+
+@pytest.mark.asyncio
+async def test_store_upload_hashes_while_streaming(tmp_path):
+    """The stored file, size and digest match the uploaded bytes"""
+    data = b"x" * 10_000 + "نص عربي".encode("utf-8")
+    destination = tmp_path / "source.bin"
+
+    stored = await store_upload(UploadFile(io.BytesIO(data), filename="a.bin"), destination,
+                                max_bytes=1_000_000, chunk_size=1024)
+
+    assert stored.size == len(data)
+    assert stored.sha256 == hashlib.sha256(data).hexdigest()
+    assert destination.read_bytes() == data
+
+@pytest.mark.asyncio
+async def test_store_upload_rejects_oversized_files(tmp_path):
+    """An upload crossing the limit is rejected and the partial file removed"""
+    destination = tmp_path / "big.bin"
+
+    with pytest.raises(UploadTooLargeError):
+        await store_upload(UploadFile(io.BytesIO(b"x" * 5000), filename="big.bin"), destination,
+                           max_bytes=4096, chunk_size=1024)
+
+    assert not destination.exists()
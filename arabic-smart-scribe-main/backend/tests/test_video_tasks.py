@@ -0,0 +1,62 @@
+import re
+from unittest.mock import AsyncMock, patch
+
+import pytest
+from celery.backends.cache import CacheBackend
+
+from app.tasks import video_tasks
+
+class InMemoryRedis:
+    """The handful of Redis commands the tasks use"""
+
+    def __init__(self):
+        self.data = {}
+
+    def setex(self, key, ttl, value):
+        self.data[key] = value
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    def expire(self, key, ttl):
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+@pytest.fixture
+def eager_celery(monkeypatch):
+    app = video_tasks.celery_app
+    monkeypatch.setattr(video_tasks, "redis_client", InMemoryRedis())
+    # Chord results are kept in process instead of the configured Redis backend
+    monkeypatch.setattr(app, "_backend_cache", CacheBackend(app=app, url="memory://"))
+    conf = app.conf
+    previous = conf.task_always_eager, conf.task_eager_propagates
+    conf.task_always_eager, conf.task_eager_propagates = True, True
+    yield
+    conf.task_always_eager, conf.task_eager_propagates = previous
+
+async def _write(prompt, **kwargs):
+    return "محتوى " + re.search(r"عنوان الفصل: (.+)", prompt).group(1).strip()
+
+def test_write_chapters_chord_returns_chapters_in_outline_order(eager_celery):
+    """Chapters dealt round-robin into lanes come back in outline order"""
+    outline = {
+        "title": "كتاب",
+        "introduction": "مقدمة",
+        "conclusion": "خاتمة",
+        "chapters": [{"number": i + 1, "title": f"فصل {i + 1}", "main_points": ["نقطة"]} for i in range(7)],
+    }
+
+    with patch("app.tasks.video_tasks.GeminiService.generate_content", new=AsyncMock(side_effect=_write)):
+        result = video_tasks.write_chapters_task.apply(args=(outline, "نص مرجعي")).get()
+
+    chapters = result["book"]["chapters"]
+    assert video_tasks._chapter_lanes(7) > 1
+    assert [c["type"] for c in chapters] == ["introduction"] + ["chapter"] * 7 + ["conclusion"]
+    assert [c["title"] for c in chapters[1:-1]] == [f"فصل {i + 1}" for i in range(7)]
+    assert [c["content"] for c in chapters[1:-1]] == [f"محتوى فصل {i + 1}" for i in range(7)]
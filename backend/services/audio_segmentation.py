@@ -0,0 +1,328 @@
+"""
+تقطيع الصوت عند فترات الصمت وتحويل المقاطع إلى نص بالتوازي
+- كشف الكلام بالطاقة: مستوى كل إطار (30 مللي ثانية) بوحدة dBFS مقارنةً بعتبة صمت
+- المقاطع محدودة الطول وتُقطع في منتصف أطول فترة صمت، وفترات الصمت الطويلة تُحذف
+- التقطيع تدريجي: يستقبل PCM على دفعات فيبدأ تحويل المقاطع الأولى قبل انتهاء القراءة
+- ffmpeg يفك ترميز الصوت (من ملف صوت أو فيديو) إلى PCM أحادي 16kHz عبر أنبوب،
+  دون ملف WAV وسيط على القرص
+- المقاطع توزَّع على مجمّع عمليات (نموذج واحد لكل عملية عاملة) وتُضم بالترتيب مع توقيتاتها
+"""
+
+import asyncio
+import collections
+import multiprocessing
+import os
+import shutil
+import subprocess
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+from transcription_engine import (
+    SAMPLE_RATE, TranscriptionResult, TranscriptSegment,
+    create_transcription_engine_from_env, get_transcription_engine, set_transcription_engine
+)
+
+# عينات 16 بت أحادية بمعدل SAMPLE_RATE
+SAMPLE_WIDTH = 2
+PCM_CHUNK_BYTES = SAMPLE_RATE * SAMPLE_WIDTH * 10  # عشر ثوانٍ
+
+
+@dataclass
+class AudioChunk:
+    """مقطع كلام جاهز للتحويل"""
+    index: int
+    start: float  # بالثواني من بداية التسجيل
+    samples: np.ndarray  # float32 في المجال [-1, 1]
+
+    @property
+    def duration(self) -> float:
+        return len(self.samples) / SAMPLE_RATE
+
+
+def frame_levels_db(frames: np.ndarray) -> np.ndarray:
+    """مستوى كل إطار بوحدة dBFS (مثل AudioSegment.dBFS لكن لكل الإطارات دفعة واحدة)"""
+    rms = np.sqrt(np.mean(frames.astype(np.float64) ** 2, axis=-1))
+    return 20 * np.log10(np.maximum(rms, 1.0) / 32768.0)
+
+
+class SpeechSegmenter:
+    """تقطيع تدريجي لعينات PCM إلى مقاطع كلام محدودة الطول"""
+
+    def __init__(self, frame_ms: int = 30, threshold_db: float = -40.0, min_silence_ms: int = 300,
+                 max_silence_ms: int = 2000, max_segment_seconds: float = 30.0, padding_ms: int = 150):
+        self.frame_len = SAMPLE_RATE * frame_ms // 1000
+        self.threshold_db = threshold_db
+        self.min_silence_frames = max(1, min_silence_ms // frame_ms)
+        self.max_silence_frames = max(self.min_silence_frames, max_silence_ms // frame_ms)
+        self.max_frames = max(2, int(max_segment_seconds * 1000) // frame_ms)
+        self.padding_frames = padding_ms // frame_ms
+
+        self._pending = np.empty(0, dtype=np.int16)  # بقية أقل من إطار
+        self._odd_byte = b''
+        self._frames: List[np.ndarray] = []
+        self._levels: List[float] = []
+        self._offset = 0  # رقم أول عينة في المقطع الحالي
+        self._silence_run = 0
+        self._count = 0
+
+    def feed(self, pcm: Union[bytes, np.ndarray]) -> List[AudioChunk]:
+        """إضافة عينات وإرجاع المقاطع التي اكتملت"""
+        if isinstance(pcm, (bytes, bytearray, memoryview)):
+            # قراءات الأنابيب قد تنتهي في منتصف عينة
+            pcm = self._odd_byte + bytes(pcm)
+            usable = len(pcm) - len(pcm) % SAMPLE_WIDTH
+            self._odd_byte = pcm[usable:]
+            samples = np.frombuffer(pcm[:usable], dtype='<i2')
+        else:
+            samples = pcm
+        data = np.concatenate([self._pending, samples]) if len(self._pending) else samples
+        whole = len(data) // self.frame_len
+        frames = data[:whole * self.frame_len].reshape(whole, self.frame_len)
+        self._pending = data[whole * self.frame_len:].copy()
+
+        chunks: List[AudioChunk] = []
+        for frame, level in zip(frames, frame_levels_db(frames)):
+            chunks.extend(self._push(frame, float(level)))
+        return chunks
+
+    def flush(self) -> List[AudioChunk]:
+        """إنهاء التسجيل وإرجاع المقطع الأخير"""
+        chunks: List[AudioChunk] = []
+        if len(self._pending):
+            chunks.extend(self._push(self._pending, float(frame_levels_db(self._pending))))
+            self._pending = np.empty(0, dtype=np.int16)
+        if self._frames:
+            chunks.extend(self._cut(len(self._frames)))
+        return chunks
+
+    def _push(self, frame: np.ndarray, level: float) -> List[AudioChunk]:
+        chunks: List[AudioChunk] = []
+        if level >= self.threshold_db:
+            if self._silence_run >= self.max_silence_frames:
+                # صمت طويل انتهى: إغلاق الكلام السابق وحذف الصمت عدا هامش قصير على الطرفين
+                silence_start = len(self._frames) - self._silence_run
+                chunks.extend(self._cut(silence_start + self.padding_frames))
+                self._drop(len(self._frames) - self.padding_frames)
+            self._silence_run = 0
+        else:
+            self._silence_run += 1
+
+        self._frames.append(frame)
+        self._levels.append(level)
+        if len(self._frames) >= self.max_frames:
+            chunks.extend(self._cut(self._best_cut()))
+        return chunks
+
+    def _best_cut(self) -> int:
+        """منتصف أطول فترة صمت في النصف الثاني من المقطع، وإلا أهدأ إطار فيه"""
+        half = len(self._levels) // 2
+        best_len, best_mid = 0, None
+        run = 0
+        for index in range(half, len(self._levels) + 1):
+            if index < len(self._levels) and self._levels[index] < self.threshold_db:
+                run += 1
+                continue
+            if run >= self.min_silence_frames and run > best_len:
+                best_len, best_mid = run, index - run // 2
+            run = 0
+        if best_mid is not None:
+            return best_mid
+        return half + int(np.argmin(self._levels[half:])) + 1
+
+    def _cut(self, at: int) -> List[AudioChunk]:
+        at = max(1, min(at, len(self._frames)))
+        frames, levels = self._frames[:at], self._levels[:at]
+        chunk = None
+        if any(level >= self.threshold_db for level in levels):
+            samples = np.concatenate(frames).astype(np.float32) / 32768.0
+            chunk = AudioChunk(index=self._count, start=self._offset / SAMPLE_RATE, samples=samples)
+            self._count += 1
+        self._discard(at)
+        return [chunk] if chunk is not None else []
+
+    def _drop(self, count: int) -> None:
+        if count > 0:
+            self._discard(min(count, len(self._frames)))
+
+    def _discard(self, count: int) -> None:
+        self._offset += sum(len(frame) for frame in self._frames[:count])
+        self._frames = self._frames[count:]
+        self._levels = self._levels[count:]
+        run = 0
+        for level in reversed(self._levels):
+            if level >= self.threshold_db:
+                break
+            run += 1
+        self._silence_run = run
+
+
+def iter_pcm_from_ffmpeg(media_path: str, chunk_bytes: int = PCM_CHUNK_BYTES) -> Iterator[bytes]:
+    """بث مسار الصوت من ملف صوت أو فيديو كـ PCM أحادي 16kHz عبر أنبوب ffmpeg"""
+    cmd = [
+        'ffmpeg', '-nostdin', '-hide_banner', '-loglevel', 'error',
+        '-i', media_path, '-vn', '-ac', '1', '-ar', str(SAMPLE_RATE),
+        '-f', 's16le', '-acodec', 'pcm_s16le', 'pipe:1'
+    ]
+    process = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE, bufsize=chunk_bytes)
+
+    # تفريغ stderr في خيط منفصل حتى لا يمتلئ الأنبوب ويتوقف ffmpeg
+    errors: collections.deque = collections.deque(maxlen=20)
+    drain = threading.Thread(target=lambda: errors.extend(process.stderr), daemon=True)
+    drain.start()
+
+    try:
+        while True:
+            chunk = process.stdout.read(chunk_bytes)
+            if not chunk:
+                break
+            yield chunk
+        if process.wait() != 0:
+            drain.join(timeout=1)
+            message = b''.join(errors).decode('utf-8', 'replace').strip()
+            raise RuntimeError(f"فشل ffmpeg في استخراج الصوت: {message or process.returncode}")
+    finally:
+        if process.poll() is None:
+            # المستهلك توقف مبكراً (خطأ في التحويل مثلاً)
+            process.kill()
+            process.wait()
+        process.stdout.close()
+
+
+def iter_pcm_from_file(audio_path: str, chunk_bytes: int = PCM_CHUNK_BYTES) -> Iterator[bytes]:
+    """فك ترميز ملف صوتي إلى PCM أحادي 16kHz على دفعات (أنبوب ffmpeg، أو pydub إن لم يتوفر)"""
+    if shutil.which('ffmpeg'):
+        yield from iter_pcm_from_ffmpeg(audio_path, chunk_bytes)
+        return
+
+    from pydub import AudioSegment
+
+    audio = AudioSegment.from_file(audio_path)
+    audio = audio.set_frame_rate(SAMPLE_RATE).set_channels(1).set_sample_width(SAMPLE_WIDTH)
+    data = audio.raw_data
+    for start in range(0, len(data), chunk_bytes):
+        yield data[start:start + chunk_bytes]
+
+
+def _init_worker(cpu_threads: int) -> None:
+    # الأنوية تُقسم بين العمليات العاملة بدلاً من أن يطلبها كل نموذج كلها؛
+    # محرك جديد بعدد الخيوط المقسوم بدلاً من أي محرك موروث من العملية الأم
+    set_transcription_engine(create_transcription_engine_from_env(cpu_threads=cpu_threads))
+
+
+def _transcribe_chunk(samples: np.ndarray, start: float,
+                      language: Optional[str]) -> Tuple[List[Tuple[float, float, str]], Optional[str]]:
+    """تحويل مقطع داخل عملية عاملة (النموذج يُحمَّل مرة واحدة لكل عملية)"""
+    result = get_transcription_engine().transcribe(samples, language=language)
+    return [(start + s.start, start + s.end, s.text) for s in result.segments], result.backend
+
+
+class SegmentedTranscriber:
+    """تقطيع الصوت ثم تحويل المقاطع على مجمّع عمليات مع الحفاظ على الترتيب"""
+
+    def __init__(self, max_workers: Optional[int] = None, **segmenter_options):
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) // 2))
+        self.segmenter_options = segmenter_options
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                cpu_threads = max(1, (os.cpu_count() or 2) // self.max_workers)
+                # spawn: لا تُنسخ خيوط الخادم ولا النموذج المحمّل في العملية الأم إلى العمال
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers,
+                                                 mp_context=multiprocessing.get_context('spawn'),
+                                                 initializer=_init_worker, initargs=(cpu_threads,))
+            return self._pool
+
+    def _reset_pool(self) -> None:
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def segmenter(self) -> SpeechSegmenter:
+        return SpeechSegmenter(**self.segmenter_options)
+
+    def transcribe_pcm(self, pcm_chunks: Iterable[bytes], language: Optional[str] = "ar") -> TranscriptionResult:
+        """تحويل PCM أحادي 16kHz يصل على دفعات؛ المقاطع تُرسل للعمال فور اكتمالها
+
+        لا يتجاوز عدد المقاطع المرسلة غير المجموعة ضعف عدد العمال، فإن بلغه جُمعت
+        أقدم نتيجة أولاً (بالترتيب) قبل إرسال المزيد حتى لا تتراكم عينات الملف كله في الذاكرة.
+        """
+        segmenter = self.segmenter()
+        pool = self._get_pool() if self.max_workers >= 2 else None
+        max_in_flight = 2 * self.max_workers
+        pending: Deque[Union[Future, AudioChunk]] = collections.deque()
+        result = TranscriptionResult(language=language)
+
+        def collect(limit: int) -> None:
+            while len(pending) > limit:
+                item = pending.popleft()
+                if isinstance(item, AudioChunk):
+                    segments, backend = _transcribe_chunk(item.samples, item.start, language)
+                else:
+                    segments, backend = item.result()
+                result.segments.extend(TranscriptSegment(*segment) for segment in segments)
+                result.backend = result.backend or backend
+
+        def submit(chunks: List[AudioChunk]) -> None:
+            nonlocal pool
+            for chunk in chunks:
+                if pool is not None:
+                    collect(max_in_flight - 1)
+                    try:
+                        pending.append(pool.submit(_transcribe_chunk, chunk.samples, chunk.start, language))
+                        continue
+                    except (BrokenProcessPool, OSError, RuntimeError):
+                        # بيئة لا تسمح بإنشاء عمليات: تحويل تسلسلي لما تبقى
+                        self._reset_pool()
+                        pool = None
+                pending.append(chunk)
+                collect(0)
+
+        try:
+            for pcm in pcm_chunks:
+                submit(segmenter.feed(pcm))
+            submit(segmenter.flush())
+            collect(0)
+            return result
+        except BrokenProcessPool:
+            self._reset_pool()
+            raise
+        finally:
+            for item in pending:
+                if isinstance(item, Future):
+                    item.cancel()
+
+    def transcribe_file(self, audio_path: str, language: Optional[str] = "ar") -> TranscriptionResult:
+        """تحويل ملف صوت أو فيديو؛ الصوت يُقرأ من الأنبوب ويُقطَّع أثناء فك الترميز"""
+        return self.transcribe_pcm(iter_pcm_from_file(audio_path), language)
+
+    async def transcribe_file_async(self, audio_path: str, language: Optional[str] = "ar") -> TranscriptionResult:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.transcribe_file, audio_path, language)
+
+
+_transcriber: Optional[SegmentedTranscriber] = None
+_transcriber_lock = threading.Lock()
+
+
+def get_segmented_transcriber() -> SegmentedTranscriber:
+    """محوّل مشترك على مستوى العملية (مجمّع عمليات واحد)"""
+    global _transcriber
+    with _transcriber_lock:
+        if _transcriber is None:
+            _transcriber = SegmentedTranscriber(
+                max_workers=int(os.getenv('AUDIO_TRANSCRIPTION_WORKERS', 0)) or None,
+                threshold_db=float(os.getenv('AUDIO_VAD_THRESHOLD_DB', -40)),
+                min_silence_ms=int(os.getenv('AUDIO_VAD_MIN_SILENCE_MS', 300)),
+                max_segment_seconds=float(os.getenv('AUDIO_MAX_SEGMENT_SECONDS', 30))
+            )
+        return _transcriber
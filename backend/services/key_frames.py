@@ -0,0 +1,155 @@
+"""
+استخراج الإطارات الرئيسية من الفيديو في مرور تسلسلي واحد
+- لا قفز عشوائي (cap.set) في الفيديو المضغوط: الإطارات تُقرأ بالترتيب، وغير المختارة
+  تُتجاوز بـ grab دون تحويلها إلى صورة
+- تُؤخذ عينة بمعدل منخفض (إطاران في الثانية افتراضياً) ويُقاس تغير المشهد بفرق
+  مدرج الألوان (HSV) عن العينة السابقة
+- يُحتفظ بأعلى K إطارات تغيراً بشرط اختلافها عن بعضها، وتُحفظ مصغرات JPEG مضغوطة
+"""
+
+import heapq
+import os
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+
+@dataclass(order=True)
+class KeyFrame:
+    """إطار مرشح؛ الترتيب حسب درجة تغير المشهد"""
+    score: float
+    timestamp: float = field(compare=False)
+    frame_number: int = field(compare=False)
+    histogram: np.ndarray = field(compare=False, repr=False)
+    scene_change: bool = field(default=False, compare=False)
+    thumbnail: Optional[np.ndarray] = field(default=None, compare=False, repr=False)
+    path: Optional[str] = field(default=None, compare=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "path": self.path,
+            "timestamp": round(self.timestamp, 2),
+            "frame_number": self.frame_number,
+            "score": round(self.score, 3),
+            "scene_change": self.scene_change
+        }
+
+
+def frame_histogram(frame: np.ndarray) -> np.ndarray:
+    """مدرج HSV مطبَّع لنسخة مصغرة من الإطار"""
+    small = cv2.resize(frame, (160, max(1, frame.shape[0] * 160 // frame.shape[1])),
+                       interpolation=cv2.INTER_AREA)
+    hsv = cv2.cvtColor(small, cv2.COLOR_BGR2HSV)
+    histogram = cv2.calcHist([hsv], [0, 1, 2], None, [16, 4, 4], [0, 180, 0, 256, 0, 256])
+    return cv2.normalize(histogram, histogram).flatten()
+
+
+def histogram_distance(a: np.ndarray, b: np.ndarray) -> float:
+    """مسافة Bhattacharyya بين مدرجين (0 متطابقان، 1 مختلفان تماماً)"""
+    return float(cv2.compareHist(a, b, cv2.HISTCMP_BHATTACHARYYA))
+
+
+def make_thumbnail(frame: np.ndarray, width: int) -> np.ndarray:
+    if frame.shape[1] <= width:
+        return frame.copy()
+    height = max(1, frame.shape[0] * width // frame.shape[1])
+    return cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+
+
+class KeyFrameExtractor:
+    """اختيار الإطارات الرئيسية بكشف تغير المشهد في مرور واحد"""
+
+    def __init__(self, max_frames: int = 10, sample_fps: float = 2.0, scene_threshold: float = 0.35,
+                 min_distinct: float = 0.2, min_gap_seconds: float = 1.0,
+                 thumbnail_width: int = 480, jpeg_quality: int = 80):
+        self.max_frames = max_frames
+        self.sample_fps = sample_fps
+        self.scene_threshold = scene_threshold
+        self.min_distinct = min_distinct
+        self.min_gap_seconds = min_gap_seconds
+        self.thumbnail_width = thumbnail_width
+        self.jpeg_quality = jpeg_quality
+
+    def select(self, video_path: str) -> List[KeyFrame]:
+        """قراءة الفيديو مرة واحدة وإرجاع أفضل الإطارات مرتبة زمنياً (دون كتابتها)"""
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError(f"تعذر فتح الفيديو: {video_path}")
+
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        step = max(1, int(round(fps / self.sample_fps)))
+        kept: List[KeyFrame] = []  # كومة صغرى بحجم K حسب الدرجة
+        previous: Optional[np.ndarray] = None
+        frame_number = -1
+
+        try:
+            while True:
+                # grab يتقدم دون تحويل الإطار؛ retrieve فقط لإطارات العينة
+                if not cap.grab():
+                    break
+                frame_number += 1
+                if frame_number % step:
+                    continue
+                ok, frame = cap.retrieve()
+                if not ok:
+                    continue
+
+                histogram = frame_histogram(frame)
+                # أول إطار يمثل المشهد الأول دائماً
+                score = 1.0 if previous is None else histogram_distance(previous, histogram)
+                previous = histogram
+
+                if len(kept) >= self.max_frames and score <= kept[0].score:
+                    continue
+                candidate = KeyFrame(score=score, timestamp=frame_number / fps,
+                                     frame_number=frame_number, histogram=histogram,
+                                     scene_change=score >= self.scene_threshold)
+                if self._admit(kept, candidate):
+                    candidate.thumbnail = make_thumbnail(frame, self.thumbnail_width)
+        finally:
+            cap.release()
+
+        return sorted(kept, key=lambda key_frame: key_frame.frame_number)
+
+    def _admit(self, kept: List[KeyFrame], candidate: KeyFrame) -> bool:
+        """إضافة المرشح إن كان مختلفاً عن المحفوظ، أو استبدال نظيره الأضعف"""
+        for index, other in enumerate(kept):
+            similar = histogram_distance(other.histogram, candidate.histogram) < self.min_distinct
+            close = abs(other.timestamp - candidate.timestamp) < self.min_gap_seconds
+            if similar or close:
+                if candidate.score <= other.score:
+                    return False
+                kept[index] = candidate
+                heapq.heapify(kept)
+                return True
+        if len(kept) < self.max_frames:
+            heapq.heappush(kept, candidate)
+        else:
+            heapq.heapreplace(kept, candidate)
+        return True
+
+    def extract(self, video_path: str, output_dir: str) -> List[KeyFrame]:
+        """اختيار الإطارات وحفظها مصغرات JPEG في output_dir"""
+        os.makedirs(output_dir, exist_ok=True)
+        frames = self.select(video_path)
+        params = [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality]
+        for key_frame in frames:
+            path = os.path.join(output_dir, f"frame_{key_frame.frame_number}_{uuid.uuid4().hex[:8]}.jpg")
+            if cv2.imwrite(path, key_frame.thumbnail, params):
+                key_frame.path = path
+            key_frame.thumbnail = None
+        return [key_frame for key_frame in frames if key_frame.path]
+
+
+def create_key_frame_extractor_from_env() -> KeyFrameExtractor:
+    """إنشاء المستخرج من متغيرات البيئة"""
+    return KeyFrameExtractor(
+        max_frames=int(os.getenv('KEY_FRAMES_MAX', 10)),
+        sample_fps=float(os.getenv('KEY_FRAMES_SAMPLE_FPS', 2)),
+        scene_threshold=float(os.getenv('KEY_FRAMES_SCENE_THRESHOLD', 0.35)),
+        thumbnail_width=int(os.getenv('KEY_FRAMES_THUMBNAIL_WIDTH', 480)),
+        jpeg_quality=int(os.getenv('KEY_FRAMES_JPEG_QUALITY', 80))
+    )
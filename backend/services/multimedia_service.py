@@ -10,22 +10,24 @@ import aiofiles
 from pathlib import Path
 
 # مكتبات التحليل
-import whisper  # لتحويل الصوت إلى نص
-import cv2  # لمعالجة الفيديو
 from PIL import Image
 import pytesseract  # لـ OCR
-import PyPDF2  # لاستخراج نص PDF
 from geopy.geocoders import Nominatim  # لتحويل الأماكن لإحداثيات
 import requests
 from pydub import AudioSegment  # لمعالجة الصوت
 
+from pdf_ingestion import get_pdf_ingestion_engine  # استخراج PDF المتوازي
+from transcription_engine import TranscriptionResult  # نتيجة التحويل (النموذج يُحمَّل في عمليات التقطيع)
+from audio_segmentation import get_segmented_transcriber  # تقطيع الصوت عند الصمت وتحويل المقاطع بالتوازي
+from key_frames import create_key_frame_extractor_from_env  # الإطارات الرئيسية بكشف تغير المشهد
+
 class MultimediaAnalysisService:
     """خدمة التحليل متعدد الوسائط"""
     
     def __init__(self):
-        self.whisper_model = None  # سيتم تحميله عند الحاجة
         self.storage_path = Path("data/multimedia")
         self.storage_path.mkdir(parents=True, exist_ok=True)
+        self.key_frame_extractor = create_key_frame_extractor_from_env()
     
     async def analyze_video_source(self, source_id: str, file_path: str) -> Dict[str, Any]:
         """تحليل مصدر الفيديو"""
@@ -37,16 +39,16 @@ class MultimediaAnalysisService:
         }
         
         try:
-            # استخراج الصوت من الفيديو
-            audio_path = await self._extract_audio_from_video(file_path)
-            
-            # تحويل الصوت إلى نص
-            transcript = await self._transcribe_audio(audio_path)
+            # تحويل صوت الفيديو إلى نص: ffmpeg يبث الصوت عبر أنبوب دون ملف WAV وسيط
+            transcription = await self._transcribe_segmented(file_path)
+            transcript = transcription.text
             results["extracted_data"]["transcript"] = transcript
+            results["extracted_data"]["transcript_segments"] = [s.to_dict() for s in transcription.segments]
             
             # استخراج إطارات رئيسية للتحليل البصري
             key_frames = await self._extract_key_frames(file_path)
             results["extracted_data"]["key_frames_count"] = len(key_frames)
+            results["extracted_data"]["key_frames"] = key_frames
             
             # تحليل النص المستخرج باستخدام المحرك الموجود
             text_analysis = await self._analyze_text_content(transcript)
@@ -68,9 +70,11 @@ class MultimediaAnalysisService:
         }
         
         try:
-            # تحويل الصوت إلى نص
-            transcript = await self._transcribe_audio(file_path)
+            # تحويل الصوت إلى نص (مقاطع متوازية مع توقيتاتها)
+            transcription = await self._transcribe_segmented(file_path)
+            transcript = transcription.text
             results["extracted_data"]["transcript"] = transcript
+            results["extracted_data"]["transcript_segments"] = [s.to_dict() for s in transcription.segments]
             
             # تحليل النص
             text_analysis = await self._analyze_text_content(transcript)
@@ -160,54 +164,17 @@ class MultimediaAnalysisService:
             return {"error": f"فشل في ربط المصادر: {str(e)}"}
     
     # الدوال المساعدة
-    async def _extract_audio_from_video(self, video_path: str) -> str:
-        """استخراج الصوت من الفيديو"""
-        audio_path = video_path.replace('.mp4', '_audio.wav').replace('.avi', '_audio.wav')
-        
-        # استخدام ffmpeg (يتطلب تثبيته على النظام)
-        import subprocess
-        cmd = [
-            'ffmpeg', '-i', video_path, 
-            '-ab', '160k', '-ac', '2', '-ar', '44100', 
-            '-vn', audio_path, '-y'
-        ]
-        
-        process = await asyncio.create_subprocess_exec(
-            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
-        )
-        await process.communicate()
-        
-        return audio_path
+    async def _transcribe_segmented(self, audio_path: str) -> TranscriptionResult:
+        """تقطيع الصوت (من ملف صوت أو فيديو) عند فترات الصمت وتحويل المقاطع على مجمّع عمليات"""
+        return await get_segmented_transcriber().transcribe_file_async(audio_path, language="ar")
     
-    async def _transcribe_audio(self, audio_path: str) -> str:
-        """تحويل الصوت إلى نص باستخدام Whisper"""
-        if self.whisper_model is None:
-            self.whisper_model = whisper.load_model("base")
-        
-        result = self.whisper_model.transcribe(audio_path, language="ar")
-        return result["text"]
-    
-    async def _extract_key_frames(self, video_path: str) -> List[str]:
-        """استخراج إطارات رئيسية من الفيديو"""
-        cap = cv2.VideoCapture(video_path)
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        
-        # استخراج 10 إطارات موزعة على طول الفيديو
-        frames_to_extract = min(10, frame_count // 10)
-        frame_paths = []
-        
-        for i in range(frames_to_extract):
-            frame_number = (frame_count // frames_to_extract) * i
-            cap.set(cv2.CAP_PROP_POS_FRAMES, frame_number)
-            ret, frame = cap.read()
-            
-            if ret:
-                frame_path = self.storage_path / f"frame_{i}_{uuid.uuid4().hex[:8]}.jpg"
-                cv2.imwrite(str(frame_path), frame)
-                frame_paths.append(str(frame_path))
-        
-        cap.release()
-        return frame_paths
+    async def _extract_key_frames(self, video_path: str) -> List[Dict[str, Any]]:
+        """استخراج إطارات رئيسية من الفيديو (مرور تسلسلي واحد مع كشف تغير المشهد)"""
+        loop = asyncio.get_running_loop()
+        key_frames = await loop.run_in_executor(
+            None, self.key_frame_extractor.extract, video_path, str(self.storage_path)
+        )
+        return [key_frame.to_dict() for key_frame in key_frames]
     
     async def _analyze_text_content(self, text: str) -> Dict[str, Any]:
         """تحليل النص باستخدام المحرك الموجود"""
@@ -216,13 +183,9 @@ class MultimediaAnalysisService:
         return analyze_narrative_architecture(text)
     
     async def _extract_text_from_pdf(self, pdf_path: str) -> str:
-        """استخراج النص من PDF"""
-        text = ""
-        with open(pdf_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-        return text
+        """استخراج النص من PDF (صفحات موزعة على مجمّع عمليات دون حجب حلقة الأحداث)"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, get_pdf_ingestion_engine().extract_text, pdf_path)
     
     async def _extract_text_from_image(self, image_path: str) -> str:
         """استخراج النص من الصورة باستخدام OCR"""
@@ -0,0 +1,207 @@
+"""
+محرك تحويل الصوت إلى نص
+- النموذج يُحمَّل مرة واحدة لكل عملية ويُعاد استخدامه بين الطلبات ونسخ الخدمة
+- الاستدلال يعمل على منفذ مخصص فلا يحجب حلقة الأحداث
+- خيار CTranslate2 (faster-whisper) بأوزان int8 مع فك ترميز المقاطع على دفعات،
+  وهو أسرع بعدة مرات على المعالج من Whisper الأصلي بدقة float32
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+try:
+    from faster_whisper import WhisperModel
+    FASTER_WHISPER_AVAILABLE = True
+    try:
+        from faster_whisper import BatchedInferencePipeline
+    except ImportError:  # إصدارات أقدم من 1.0 دون فك ترميز على دفعات
+        BatchedInferencePipeline = None
+except ImportError:
+    FASTER_WHISPER_AVAILABLE = False
+    BatchedInferencePipeline = None
+
+try:
+    import whisper
+    WHISPER_AVAILABLE = True
+except ImportError:
+    WHISPER_AVAILABLE = False
+
+BACKEND_FASTER_WHISPER = "faster_whisper"
+BACKEND_WHISPER = "whisper"
+
+# معدل العينات الذي يتوقعه Whisper للمصفوفات الصوتية
+SAMPLE_RATE = 16000
+
+# مصدر صوتي: مسار ملف أو مصفوفة float32 أحادية بمعدل 16kHz
+AudioSource = Union[str, os.PathLike, Any]
+
+
+@dataclass
+class TranscriptSegment:
+    """مقطع من النص مع توقيته بالثواني"""
+    start: float
+    end: float
+    text: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"start": round(self.start, 2), "end": round(self.end, 2), "text": self.text}
+
+
+@dataclass
+class TranscriptionResult:
+    """نتيجة التحويل"""
+    segments: List[TranscriptSegment] = field(default_factory=list)
+    language: Optional[str] = None
+    backend: Optional[str] = None
+
+    @property
+    def text(self) -> str:
+        return " ".join(segment.text for segment in self.segments if segment.text)
+
+
+# نماذج محمّلة في هذه العملية، بمفتاح (الخلفية، النموذج، الجهاز، نوع الحساب، عدد الخيوط)
+_models: Dict[Tuple[str, str, str, str, int], Any] = {}
+_models_lock = threading.Lock()
+
+
+def _load_model(backend: str, model_name: str, device: str, compute_type: str, cpu_threads: int) -> Any:
+    key = (backend, model_name, device, compute_type, cpu_threads)
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            if backend == BACKEND_FASTER_WHISPER:
+                model = WhisperModel(model_name, device=device, compute_type=compute_type,
+                                     cpu_threads=cpu_threads)
+                if BatchedInferencePipeline is not None:
+                    model = BatchedInferencePipeline(model=model)
+            else:
+                if cpu_threads > 0:
+                    # Whisper الأصلي يعمل على PyTorch الذي يأخذ كل الأنوية افتراضياً
+                    import torch
+                    torch.set_num_threads(cpu_threads)
+                model = whisper.load_model(model_name, device=device)
+            _models[key] = model
+        return model
+
+
+def resolve_backend(requested: str = "auto") -> str:
+    """اختيار الخلفية المتاحة (faster-whisper أولاً عند auto)"""
+    if requested in ("auto", BACKEND_FASTER_WHISPER) and FASTER_WHISPER_AVAILABLE:
+        return BACKEND_FASTER_WHISPER
+    if requested in ("auto", BACKEND_WHISPER) and WHISPER_AVAILABLE:
+        return BACKEND_WHISPER
+    if requested == BACKEND_FASTER_WHISPER and WHISPER_AVAILABLE:
+        # الخلفية المطلوبة غير مثبتة: العودة إلى Whisper الأصلي
+        return BACKEND_WHISPER
+    raise RuntimeError("لا توجد مكتبة لتحويل الصوت إلى نص (faster-whisper أو openai-whisper)")
+
+
+class TranscriptionEngine:
+    """تحويل الصوت إلى نص بنموذج مشترك على مستوى العملية"""
+
+    def __init__(self, backend: str = "auto", model_name: str = "base", device: str = "cpu",
+                 compute_type: str = "int8", batch_size: int = 8, cpu_threads: int = 0,
+                 max_workers: int = 1):
+        self.backend = backend
+        self.model_name = model_name
+        self.device = device
+        self.compute_type = compute_type
+        self.batch_size = batch_size
+        self.cpu_threads = cpu_threads
+        self.max_workers = max_workers
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        # عامل واحد افتراضياً: النموذج يستعمل كل أنوية المعالج داخل الاستدلال نفسه
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="transcription")
+            return self._executor
+
+    def model(self) -> Tuple[str, Any]:
+        """(الخلفية، النموذج) مع التحميل عند أول استعمال"""
+        backend = resolve_backend(self.backend)
+        return backend, _load_model(backend, self.model_name, self.device, self.compute_type,
+                                    self.cpu_threads)
+
+    def transcribe(self, audio: AudioSource, language: Optional[str] = "ar") -> TranscriptionResult:
+        """تحويل متزامن (للعمليات العاملة ومهام الخلفية)"""
+        if isinstance(audio, os.PathLike):
+            audio = os.fspath(audio)
+        backend, model = self.model()
+
+        if backend == BACKEND_FASTER_WHISPER:
+            options: Dict[str, Any] = {"language": language}
+            if BatchedInferencePipeline is not None:
+                options["batch_size"] = self.batch_size
+            else:
+                options["beam_size"] = 1
+            segments, info = model.transcribe(audio, **options)
+            return TranscriptionResult(
+                segments=[TranscriptSegment(s.start, s.end, s.text.strip()) for s in segments],
+                language=getattr(info, "language", language),
+                backend=backend
+            )
+
+        result = model.transcribe(audio, language=language, fp16=self.device != "cpu")
+        return TranscriptionResult(
+            segments=[TranscriptSegment(s["start"], s["end"], s["text"].strip())
+                      for s in result.get("segments", [])],
+            language=result.get("language", language),
+            backend=backend
+        )
+
+    async def transcribe_async(self, audio: AudioSource, language: Optional[str] = "ar") -> TranscriptionResult:
+        """تحويل على المنفذ المخصص دون حجب حلقة الأحداث"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._get_executor(), self.transcribe, audio, language)
+
+    def stats(self) -> Dict[str, Any]:
+        with _models_lock:
+            loaded = [f"{backend}:{name}:{compute_type}" for backend, name, _, compute_type, _ in _models]
+        return {
+            "backend": self.backend,
+            "model": self.model_name,
+            "compute_type": self.compute_type,
+            "batch_size": self.batch_size,
+            "loaded_models": loaded
+        }
+
+
+def create_transcription_engine_from_env(cpu_threads: Optional[int] = None) -> TranscriptionEngine:
+    """إنشاء المحرك من متغيرات البيئة (cpu_threads يتجاوز WHISPER_CPU_THREADS)"""
+    return TranscriptionEngine(
+        backend=os.getenv('TRANSCRIPTION_BACKEND', 'auto'),
+        model_name=os.getenv('WHISPER_MODEL', 'base'),
+        device=os.getenv('WHISPER_DEVICE', 'cpu'),
+        compute_type=os.getenv('WHISPER_COMPUTE_TYPE', 'int8'),
+        batch_size=int(os.getenv('WHISPER_BATCH_SIZE', 8)),
+        cpu_threads=int(os.getenv('WHISPER_CPU_THREADS', 0)) if cpu_threads is None else cpu_threads,
+        max_workers=int(os.getenv('TRANSCRIPTION_WORKERS', 1))
+    )
+
+
+_engine: Optional[TranscriptionEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_transcription_engine() -> TranscriptionEngine:
+    """محرك مشترك على مستوى العملية"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = create_transcription_engine_from_env()
+        return _engine
+
+
+def set_transcription_engine(engine: TranscriptionEngine) -> None:
+    """استبدال محرك العملية (مثلاً في عملية عاملة بعدد خيوط أقل)"""
+    global _engine
+    with _engine_lock:
+        _engine = engine
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# الخدمات تُستورد بأسمائها المباشرة كما في مهام الخلفية
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "services"))
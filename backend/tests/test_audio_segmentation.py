@@ -0,0 +1,201 @@
+import os
+import shutil
+import subprocess
+import sys
+import threading
+import wave
+from concurrent.futures import Future
+
+import numpy as np
+import pytest
+
+import audio_segmentation
+import transcription_engine
+from audio_segmentation import (
+    SAMPLE_RATE, SegmentedTranscriber, SpeechSegmenter, _init_worker, iter_pcm_from_ffmpeg
+)
+
+def tone(seconds, amplitude=8000):
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * 440 * t)).astype(np.int16)
+
+def silence(seconds):
+    return np.zeros(int(seconds * SAMPLE_RATE), dtype=np.int16)
+
+def segment(pcm, **options):
+    segmenter = SpeechSegmenter(**options)
+    return segmenter.feed(pcm) + segmenter.flush()
+
+def test_long_silence_splits_speech_and_is_dropped():
+    """Long pauses are dropped except for padding; chunks keep their recording timestamps"""
+    pcm = np.concatenate([silence(3), tone(2), silence(5), tone(1)])
+
+    chunks = segment(pcm)
+
+    assert [chunk.index for chunk in chunks] == [0, 1]
+    assert abs(chunks[0].start - (3 - 0.15)) < 0.05
+    assert abs(chunks[0].duration - 2.3) < 0.05
+    assert abs(chunks[1].start - (10 - 0.15)) < 0.05
+    assert abs(chunks[1].duration - 1.15) < 0.05
+
+def test_segments_are_bounded_and_cut_in_silence():
+    """Continuous speech is cut inside its short pauses, never past the maximum length"""
+    pcm = np.concatenate([np.concatenate([tone(4), silence(0.5)]) for _ in range(20)])
+
+    chunks = segment(pcm, max_segment_seconds=10)
+
+    assert len(chunks) > 1
+    assert all(chunk.duration <= 10 for chunk in chunks)
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert abs(previous.start + previous.duration - chunk.start) < 1e-6
+        # every cut falls inside a pause, so chunks start with silence
+        assert np.abs(chunk.samples[:SAMPLE_RATE // 10]).max() < 1e-3
+
+def test_bytes_split_mid_sample_match_whole_feed():
+    """Pipe reads ending inside a sample give the same chunks as one array"""
+    pcm = np.concatenate([tone(1.3), silence(3), tone(0.7, amplitude=12000)])
+    data = pcm.astype('<i2').tobytes()
+
+    segmenter = SpeechSegmenter()
+    chunks = []
+    for offset in range(0, len(data), 4097):
+        chunks.extend(segmenter.feed(data[offset:offset + 4097]))
+    chunks.extend(segmenter.flush())
+    expected = segment(pcm)
+
+    assert len(chunks) == len(expected) == 2
+    for chunk, other in zip(chunks, expected):
+        assert chunk.start == other.start
+        assert np.array_equal(chunk.samples, other.samples)
+
+def test_silence_only_yields_nothing():
+    assert segment(silence(5)) == []
+
+def test_worker_initializer_builds_its_own_engine(monkeypatch):
+    """Workers replace any engine inherited from the parent with a divided thread count"""
+    monkeypatch.setenv("WHISPER_CPU_THREADS", "0")
+    monkeypatch.setattr(transcription_engine, "_engine", transcription_engine.TranscriptionEngine())
+    inherited = transcription_engine.get_transcription_engine()
+
+    _init_worker(3)
+
+    engine = audio_segmentation.get_transcription_engine()
+    assert engine is not inherited
+    assert engine.cpu_threads == 3
+
+class LazyFuture(Future):
+    """Runs its call only when the result is collected"""
+
+    def __init__(self, pool, fn, args):
+        super().__init__()
+        self.pool, self.fn, self.args = pool, fn, args
+
+    def result(self, timeout=None):
+        if not self.done():
+            self.pool.in_flight -= 1
+            self.set_result(self.fn(*self.args))
+        return super().result(timeout)
+
+class RecordingPool:
+    def __init__(self):
+        self.in_flight = 0
+        self.peak = 0
+
+    def submit(self, fn, *args):
+        self.in_flight += 1
+        self.peak = max(self.peak, self.in_flight)
+        return LazyFuture(self, fn, args)
+
+def test_in_flight_chunks_are_bounded_and_results_stay_ordered(monkeypatch):
+    """At most 2 * max_workers chunks wait on the pool; the oldest is collected first"""
+    monkeypatch.setattr(audio_segmentation, "_transcribe_chunk",
+                        lambda samples, start, language: ([(start, start + 1, f"{start:.2f}")], "fake"))
+    transcriber = SegmentedTranscriber(max_workers=2)
+    pool = transcriber._pool = RecordingPool()
+    pcm = np.concatenate([np.concatenate([tone(0.5), silence(2)]) for _ in range(12)])
+    data = pcm.astype("<i2").tobytes()
+
+    result = transcriber.transcribe_pcm(data[offset:offset + 16000] for offset in range(0, len(data), 16000))
+
+    assert len(result.segments) == 12
+    assert pool.peak == 4
+    assert pool.in_flight == 0
+    starts = [segment.start for segment in result.segments]
+    assert starts == sorted(starts)
+    assert [segment.text for segment in result.segments] == [f"{start:.2f}" for start in starts]
+    assert result.backend == "fake"
+
+requires_ffmpeg = pytest.mark.skipif(shutil.which("ffmpeg") is None, reason="ffmpeg is not installed")
+
+def write_wav(path, pcm):
+    with wave.open(str(path), "wb") as handle:
+        handle.setnchannels(1)
+        handle.setsampwidth(2)
+        handle.setframerate(SAMPLE_RATE)
+        handle.writeframes(pcm.astype("<i2").tobytes())
+
+def record_processes(monkeypatch):
+    processes = []
+    popen = subprocess.Popen
+
+    def recording_popen(*args, **kwargs):
+        processes.append(popen(*args, **kwargs))
+        return processes[-1]
+
+    monkeypatch.setattr(audio_segmentation.subprocess, "Popen", recording_popen)
+    return processes
+
+@requires_ffmpeg
+def test_ffmpeg_pipe_decodes_pcm(tmp_path):
+    pcm = np.concatenate([tone(1.5), silence(0.5)])
+    write_wav(tmp_path / "speech.wav", pcm)
+
+    data = b"".join(iter_pcm_from_ffmpeg(str(tmp_path / "speech.wav"), chunk_bytes=4096))
+
+    assert np.array_equal(np.frombuffer(data, dtype="<i2"), pcm)
+
+@requires_ffmpeg
+def test_ffmpeg_failure_raises_with_its_stderr(tmp_path):
+    (tmp_path / "broken.wav").write_bytes(b"not audio at all" * 64)
+
+    with pytest.raises(RuntimeError, match="ffmpeg"):
+        b"".join(iter_pcm_from_ffmpeg(str(tmp_path / "broken.wav")))
+
+@requires_ffmpeg
+def test_ffmpeg_is_killed_when_the_consumer_stops(tmp_path, monkeypatch):
+    write_wav(tmp_path / "long.wav", tone(120))
+    processes = record_processes(monkeypatch)
+
+    chunks = iter_pcm_from_ffmpeg(str(tmp_path / "long.wav"), chunk_bytes=4096)
+    assert len(next(chunks)) == 4096
+    chunks.close()
+
+    assert processes[0].returncode is not None
+    assert processes[0].stdout.closed
+
+def test_noisy_stderr_is_drained_while_reading(tmp_path, monkeypatch):
+    """A child writing far more than a pipe buffer to stderr must not stall stdout"""
+    script = tmp_path / "ffmpeg"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        "sys.stderr.write('warning: odd frame\\n' * 20000)\n"
+        "sys.stderr.flush()\n"
+        "sys.stdout.buffer.write(b'\\x01\\x00' * 50000)\n"
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{tmp_path}{os.pathsep}{os.environ['PATH']}")
+    outcome = {}
+
+    def consume():
+        try:
+            outcome["data"] = b"".join(iter_pcm_from_ffmpeg("input.wav"))
+        except RuntimeError as error:
+            outcome["error"] = error
+
+    consumer = threading.Thread(target=consume, daemon=True)
+    consumer.start()
+    consumer.join(timeout=10)
+
+    assert not consumer.is_alive()
+    assert outcome["data"] == b"\x01\x00" * 50000
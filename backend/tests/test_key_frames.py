@@ -0,0 +1,67 @@
+import cv2
+import numpy as np
+
+from key_frames import KeyFrame, KeyFrameExtractor, frame_histogram
+
+FPS = 10
+COLOURS = [(0, 0, 255), (0, 255, 0), (255, 0, 0)]  # BGR: red, green, blue
+
+def solid(colour, size=(120, 160)):
+    frame = np.zeros(size + (3,), dtype=np.uint8)
+    frame[:] = colour
+    return frame
+
+def write_video(path, scenes):
+    """Concatenated solid-colour scenes of (colour, seconds)"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), FPS, (160, 120))
+    assert writer.isOpened()
+    for colour, seconds in scenes:
+        for _ in range(int(seconds * FPS)):
+            writer.write(solid(colour))
+    writer.release()
+    return str(path)
+
+def candidate(colour, timestamp, score):
+    return KeyFrame(score=score, timestamp=timestamp, frame_number=int(timestamp * FPS),
+                    histogram=frame_histogram(solid(colour)))
+
+def test_one_frame_per_scene_in_time_order(tmp_path):
+    video = write_video(tmp_path / "scenes.avi", [(colour, 2) for colour in COLOURS])
+
+    frames = KeyFrameExtractor(max_frames=10).select(video)
+
+    assert [frame.frame_number for frame in frames] == [0, 2 * FPS, 4 * FPS]
+    assert [frame.scene_change for frame in frames] == [True, True, True]
+    for frame, colour in zip(frames, COLOURS):
+        assert np.abs(frame.thumbnail[60, 80].astype(int) - colour).max() < 10  # JPEG-coded video
+
+def test_max_frames_keeps_the_strongest_changes(tmp_path):
+    video = write_video(tmp_path / "scenes.avi", [(COLOURS[0], 2), (COLOURS[1], 2), (COLOURS[0], 2), (COLOURS[2], 2)])
+
+    frames = KeyFrameExtractor(max_frames=2, min_distinct=0.0).select(video)
+
+    assert len(frames) == 2
+    assert frames[0].frame_number < frames[1].frame_number
+
+def test_close_candidates_keep_only_the_stronger():
+    extractor = KeyFrameExtractor(min_gap_seconds=1.0)
+    kept = []
+    weak, strong = candidate(COLOURS[0], 3.0, 0.5), candidate(COLOURS[1], 3.5, 0.9)
+
+    assert extractor._admit(kept, weak)
+    assert extractor._admit(kept, strong)
+    assert kept == [strong]
+    assert not extractor._admit(kept, candidate(COLOURS[2], 4.0, 0.6))
+    assert kept == [strong]
+
+def test_similar_candidates_far_apart_keep_only_the_stronger():
+    extractor = KeyFrameExtractor(min_distinct=0.2, min_gap_seconds=1.0)
+    kept = []
+    first, repeat = candidate(COLOURS[0], 1.0, 0.4), candidate(COLOURS[0], 30.0, 0.8)
+    other = candidate(COLOURS[2], 60.0, 0.3)
+
+    assert extractor._admit(kept, first)
+    assert extractor._admit(kept, other)
+    assert extractor._admit(kept, repeat)
+    assert sorted(kept, key=lambda frame: frame.timestamp) == [repeat, other]
+    assert not extractor._admit(kept, candidate(COLOURS[0], 90.0, 0.5))
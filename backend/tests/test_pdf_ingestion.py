@@ -0,0 +1,90 @@
+import os
+
+import pytest
+
+import pdf_ingestion
+from pdf_ingestion import PDFIngestionEngine
+
+def make_pdf(page_count):
+    """Minimal PDF whose page N reads "Page N" """
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None,
+               b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for number in range(1, page_count + 1):
+        content = f"BT /F1 12 Tf 72 720 Td (Page {number}) Tj ET".encode()
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+        objects.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objects))
+        kids.append(b"%d 0 R" % len(objects))
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (b" ".join(kids), page_count)
+
+    data = b"%PDF-1.4\n"
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(data))
+        data += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(data)
+    data += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    data += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    data += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return data
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_ingestion.tempfile, "tempdir", str(tmp_path))
+    return tmp_path
+
+def test_pool_extraction_keeps_page_order_and_spools_bytes(spool_dir):
+    """Bytes go to workers as a temp file path that is removed afterwards"""
+    engine = PDFIngestionEngine(max_workers=2, pages_per_shard=2, min_pages_for_pool=4)
+    progress = []
+    try:
+        extraction = engine.extract(make_pdf(7), lambda page, done, total: progress.append((done, total)))
+    finally:
+        engine._reset_pool()
+
+    assert [text.strip() for text in extraction.page_texts] == [f"Page {n}" for n in range(1, 8)]
+    assert extraction.parallel
+    assert extraction.page_errors == {}
+    assert sorted(progress) == [(done, 7) for done in range(1, 8)]
+    assert os.listdir(spool_dir) == []
+
+def test_parallel_flag_reports_the_fallback(spool_dir, monkeypatch):
+    """A pool that cannot start falls back in-process and says so"""
+    engine = PDFIngestionEngine(max_workers=2, pages_per_shard=2, min_pages_for_pool=4)
+
+    def no_processes():
+        raise OSError("no fork here")
+
+    monkeypatch.setattr(engine, "_get_pool", no_processes)
+    extraction = engine.extract(make_pdf(5))
+
+    assert extraction.pages_count == 5
+    assert extraction.text.split() == ["Page", "1", "Page", "2", "Page", "3", "Page", "4", "Page", "5"]
+    assert not extraction.parallel
+    assert os.listdir(spool_dir) == []
+
+def test_small_files_stay_in_process(monkeypatch):
+    engine = PDFIngestionEngine(max_workers=4, min_pages_for_pool=24)
+    monkeypatch.setattr(engine, "_get_pool", lambda: pytest.fail("small files should not use the pool"))
+
+    extraction = engine.extract(make_pdf(3))
+
+    assert extraction.pages_count == 3
+    assert not extraction.parallel
+
+def test_flask_backend_copies_match_this_module():
+    """The Flask servers carry the same module under their own import roots"""
+    repo = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    copies = [os.path.join(repo, app, name, "backend", "pdf_ingestion.py")
+              for app in ("agent_studio", "dancing_ui") if os.path.isdir(os.path.join(repo, app))
+              for name in os.listdir(os.path.join(repo, app))]
+    copies = [path for path in copies if os.path.isfile(path)]
+    if not copies:
+        pytest.skip("Flask backends are not in this checkout")
+
+    with open(pdf_ingestion.__file__, "rb") as handle:
+        source = handle.read()
+    for path in copies:
+        with open(path, "rb") as handle:
+            assert handle.read() == source, path
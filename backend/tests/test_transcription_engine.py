@@ -0,0 +1,85 @@
+import asyncio
+import threading
+import types
+
+import pytest
+
+import transcription_engine
+from transcription_engine import (
+    BACKEND_FASTER_WHISPER, BACKEND_WHISPER, TranscriptionEngine, resolve_backend
+)
+
+class FakeWhisperModel:
+    loads = []
+
+    def __init__(self, model_name, device, compute_type, cpu_threads):
+        FakeWhisperModel.loads.append((model_name, device, compute_type, cpu_threads))
+        self.threads = []
+
+    def transcribe(self, audio, **options):
+        self.threads.append(threading.current_thread().name)
+        segment = types.SimpleNamespace(start=0.0, end=1.5, text=f" {audio} ")
+        return iter([segment]), types.SimpleNamespace(language=options["language"])
+
+@pytest.fixture
+def fake_backends(monkeypatch):
+    """faster-whisper and openai-whisper stand-ins with a fresh model cache"""
+    FakeWhisperModel.loads = []
+    whisper_loads = []
+    fake_whisper = types.SimpleNamespace(
+        load_model=lambda name, device: whisper_loads.append((name, device)) or types.SimpleNamespace(
+            transcribe=lambda audio, language, fp16: {
+                "segments": [{"start": 0.0, "end": 2.0, "text": " نص "}], "language": language
+            }
+        )
+    )
+    monkeypatch.setattr(transcription_engine, "_models", {})
+    monkeypatch.setattr(transcription_engine, "WhisperModel", FakeWhisperModel, raising=False)
+    monkeypatch.setattr(transcription_engine, "BatchedInferencePipeline", None)
+    monkeypatch.setattr(transcription_engine, "whisper", fake_whisper, raising=False)
+    monkeypatch.setattr(transcription_engine, "FASTER_WHISPER_AVAILABLE", True)
+    monkeypatch.setattr(transcription_engine, "WHISPER_AVAILABLE", True)
+    return whisper_loads
+
+def test_models_are_loaded_once_per_configuration(fake_backends):
+    engine = TranscriptionEngine(model_name="small", cpu_threads=2)
+    other_engine = TranscriptionEngine(model_name="small", cpu_threads=2)
+
+    assert engine.model()[1] is other_engine.model()[1]
+    assert engine.transcribe("a.wav").text == "a.wav"
+    assert FakeWhisperModel.loads == [("small", "cpu", "int8", 2)]
+
+    # every part of the key selects its own model
+    TranscriptionEngine(model_name="small", cpu_threads=4).model()
+    TranscriptionEngine(model_name="small", compute_type="float32", cpu_threads=2).model()
+    TranscriptionEngine(model_name="base", cpu_threads=2).model()
+    assert len(FakeWhisperModel.loads) == 4
+    assert len(engine.stats()["loaded_models"]) == 4
+
+def test_faster_whisper_falls_back_to_openai_whisper(fake_backends, monkeypatch):
+    assert resolve_backend("auto") == BACKEND_FASTER_WHISPER
+    monkeypatch.setattr(transcription_engine, "FASTER_WHISPER_AVAILABLE", False)
+
+    assert resolve_backend("auto") == BACKEND_WHISPER
+    assert resolve_backend(BACKEND_FASTER_WHISPER) == BACKEND_WHISPER
+    result = TranscriptionEngine(backend=BACKEND_FASTER_WHISPER, model_name="tiny").transcribe("a.wav")
+    assert (result.backend, result.text) == (BACKEND_WHISPER, "نص")
+    assert fake_backends == [("tiny", "cpu")]
+
+    monkeypatch.setattr(transcription_engine, "WHISPER_AVAILABLE", False)
+    with pytest.raises(RuntimeError):
+        resolve_backend("auto")
+
+def test_transcribe_async_runs_on_the_dedicated_executor(fake_backends):
+    engine = TranscriptionEngine()
+
+    async def transcribe_twice():
+        return await asyncio.gather(engine.transcribe_async("a.wav"), engine.transcribe_async("b.wav"))
+
+    results = asyncio.run(transcribe_twice())
+
+    assert [result.text for result in results] == ["a.wav", "b.wav"]
+    model = engine.model()[1]
+    assert len(model.threads) == 2
+    assert all(name.startswith("transcription") for name in model.threads)
+    assert engine._get_executor() is engine._get_executor()
@@ -0,0 +1,116 @@
+"""
+ذاكرة مؤقتة لنتائج تحليل النص داخل العملية
+المحرر يرسل النص نفسه مرات عديدة أثناء الكتابة، فتُحفظ النتائج بمفتاح
+من بصمة النص ومعاملات التحليل، مع حذف الأقدم استخداماً عند تجاوز حد الذاكرة.
+المستدعي يحدد بـ cacheable النتائج التي لا تُحفظ (كالنتائج الاحتياطية عند فشل التحليل).
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+
+def analysis_cache_key(kind: str, text: str, params: Optional[Dict[str, Any]] = None) -> str:
+    """بصمة النص ومعاملات التحليل
+
+    يُستخدم النص كما هو دون تطبيع يغيّر طوله، لأن نتائج مثل مواضع المشاكل
+    مرتبطة بمواضع الأحرف في النص الأصلي.
+    """
+    payload = json.dumps(params or {}, sort_keys=True, ensure_ascii=False, default=str)
+    digest = hashlib.sha256()
+    digest.update(kind.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(payload.encode('utf-8'))
+    digest.update(b'\0')
+    digest.update(text.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class AnalysisCache:
+    """LRU بحد لعدد العناصر وحد للحجم بالبايت، مع إحصائيات الإصابة"""
+
+    def __init__(self, max_entries: int = 256, max_bytes: int = 16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()  # key -> (value, size)
+        self._size_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._by_kind: Dict[str, Dict[str, int]] = {}
+
+    def get_or_compute(self, kind: str, text: str, params: Optional[Dict[str, Any]],
+                       compute: Callable[[], Any],
+                       cacheable: Optional[Callable[[Any], bool]] = None) -> Any:
+        """إرجاع النتيجة المحفوظة أو حسابها وحفظها (ما لم يرفضها cacheable)"""
+        key = analysis_cache_key(kind, text, params)
+        kind_stats = self._kind_stats(kind)
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                kind_stats["hits"] += 1
+                # نسخة مستقلة حتى لا يعدّل المستدعي القيمة المحفوظة
+                return copy.deepcopy(entry[0])
+            self.misses += 1
+            kind_stats["misses"] += 1
+
+        value = compute()
+        if cacheable is None or cacheable(value):
+            self._store(key, value)
+        return value
+
+    def _store(self, key: str, value: Any) -> None:
+        size = len(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'))
+        if size > self.max_bytes:
+            return
+
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size_bytes -= previous[1]
+            self._entries[key] = (copy.deepcopy(value), size)
+            self._size_bytes += size
+
+            while self._entries and (len(self._entries) > self.max_entries or self._size_bytes > self.max_bytes):
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._size_bytes -= evicted_size
+                self.evictions += 1
+
+    def _kind_stats(self, kind: str) -> Dict[str, int]:
+        with self._lock:
+            return self._by_kind.setdefault(kind, {"hits": 0, "misses": 0})
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size_bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size_bytes": self._size_bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "by_kind": copy.deepcopy(self._by_kind)
+            }
+
+
+# ذاكرة مشتركة بين مسارات المحرر الذكي ومقاييس النص
+analysis_cache = AnalysisCache(
+    max_entries=int(os.getenv('ANALYSIS_CACHE_MAX_ENTRIES', 256)),
+    max_bytes=int(os.getenv('ANALYSIS_CACHE_MAX_BYTES', 16 * 1024 * 1024))
+)
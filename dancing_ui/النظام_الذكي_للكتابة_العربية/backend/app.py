@@ -8,10 +8,8 @@ from flask import Flask, request, jsonify, send_file, Response, stream_with_cont
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
-import io
 import json
 import time
-import asyncio
 import threading
 from typing import Dict, Any, List, Optional, Generator
 from datetime import datetime, timedelta
@@ -22,13 +20,28 @@ from database import (
     get_all_projects, delete_project, update_project_stage
 )
 from llm_service import (
-    call_llm, get_best_model_for_task, validate_api_keys,
+    call_llm as _call_llm_direct, get_best_model_for_task, validate_api_keys,
     create_novel_analysis_prompt, create_idea_generation_prompt,
     create_blueprint_prompt, create_chapter_generation_prompt,
     create_text_refinement_prompt, create_consistency_check_prompt,
     create_suggestions_prompt, create_final_report_prompt
 )
 from adaptive_learning_service import get_adaptive_service
+from request_coalescing import SingleFlight, prompt_fingerprint
+from async_bridge import run_async
+from arabic_text import TextStructure, analyze_structure
+from text_issues import detect_text_issues
+from analysis_cache import analysis_cache
+from incremental_analysis import incremental_store, DocumentOutOfSyncError
+from lexicon_matcher import LexiconMatcher
+from piece_table import document_store, EditConflictError
+from batch_metrics import compute_batch_metrics, readability_score, style_score, complexity_level
+from pdf_ingestion import PDFExtraction, PDF_READER_AVAILABLE, get_pdf_ingestion_engine
+from extraction_cache import extraction_cache, content_digest
+from upload_pipeline import spool_upload, SpooledUpload, UploadTooLargeError
+from novel_export import EXPORT_FORMATS, NovelExport, stream_export
+from export_jobs import create_export_job_manager_from_env
+from execution_registry import ExecutorBusyError, STATUS_COMPLETED
 from database import (
     save_workflow_design, get_workflow_design, get_user_workflow_designs,
     delete_workflow_design, increment_workflow_usage
@@ -62,6 +75,12 @@ load_dotenv()
 # إنشاء تطبيق Flask
 app = Flask(__name__)
 
+# حد حجم الرفع: يرفض Flask الطلب بـ 413 من ترويسة Content-Length قبل قراءة الملف
+UPLOAD_MAX_BYTES = int(os.getenv('UPLOAD_MAX_BYTES', 100 * 1024 * 1024))
+# الملفات الأكبر من هذا الحد تُنسخ إلى ملف مؤقت بدلاً من الذاكرة
+UPLOAD_MEMORY_LIMIT = int(os.getenv('UPLOAD_MEMORY_LIMIT', 4 * 1024 * 1024))
+app.config['MAX_CONTENT_LENGTH'] = UPLOAD_MAX_BYTES
+
 # تفعيل CORS لجميع المسارات (مهم للتطوير)
 CORS(app, origins=["http://localhost:5173", "http://localhost:3000"])
 
@@ -81,6 +100,14 @@ try:
 except ImportError as e:
     print(f"⚠️ تحذير: لم يتم تحميل APIs ذاكرة السرد الحيّة: {e}")
 
+# دمج استدعاءات النموذج المتطابقة الجارية (مثل إعادة إرسال الرفع من الواجهة)
+llm_single_flight = SingleFlight()
+
+def call_llm(messages, **kwargs) -> Dict[str, Any]:
+    """استدعاء النموذج مع مشاركة نتيجة الطلبات المتطابقة المتزامنة"""
+    key = prompt_fingerprint(messages, kwargs)
+    return llm_single_flight.do(key, lambda: _call_llm_direct(messages, **kwargs))
+
 # خدمة التعلم التكيفي
 adaptive_service = get_adaptive_service()
 
@@ -103,48 +130,44 @@ except ImportError:
     PDF_SERVICE_AVAILABLE = False
 
 # معالجة قراءة الملفات
+def _is_binary_document(file) -> bool:
+    """ملفات PDF و DOCX التي يستحق استخراج نصها الحفظ"""
+    return (file.mimetype in ('application/pdf',
+                              'application/vnd.openxmlformats-officedocument.wordprocessingml.document')
+            or file.filename.endswith(('.pdf', '.docx')))
+
 def read_file_content(file) -> tuple[str, str]:
-    """قراءة محتوى الملف بناءً على نوعه - محسن مع دعم PDF متقدم"""
+    """قراءة محتوى الملف بناءً على نوعه مع إعادة النص المستخرج سابقاً لنفس المحتوى
+
+    ملفات PDF و DOCX تُنسخ على دفعات (مع حساب البصمة والتحقق من الحجم أثناء النسخ)
+    وتُعطى للمحللات كمقبض ملف أو مسار بدلاً من نسخ كاملة في الذاكرة.
+    """
     try:
         file_type = file.mimetype
-        file_content = ""
         
         if file_type == 'text/plain' or file.filename.endswith('.txt'):
             file_content = file.read().decode('utf-8')
             
-        elif file_type == 'application/pdf' or file.filename.endswith('.pdf'):
-            # استخدام خدمة PDF المتقدمة
-            if PDF_SERVICE_AVAILABLE:
-                try:
-                    pdf_service = get_pdf_service()
-                    pdf_data = file.read()
-                    
-                    # استخراج النص باستخدام الخدمة المتقدمة
-                    extracted_text, error_message = pdf_service.extract_text_only(pdf_data)
-                    
-                    if error_message:
-                        return "", f"خطأ في قراءة ملف PDF: {error_message}"
-                    
-                    file_content = extracted_text
-                    
-                except Exception as e:
-                    # العودة للطريقة القديمة كـ fallback
-                    return _fallback_pdf_read(file, str(e))
-            else:
-                # استخدام الطريقة القديمة
-                return _fallback_pdf_read(file, "خدمة PDF المتقدمة غير متاحة")
+        elif _is_binary_document(file):
+            with spool_upload(file.stream, max_bytes=UPLOAD_MAX_BYTES,
+                              memory_limit=UPLOAD_MEMORY_LIMIT,
+                              declared_size=file.content_length or None) as upload:
+                cached = extraction_cache.get(upload.digest, 'text')
+                if cached is not None:
+                    return cached['text'], ""
                 
-        elif (file_type == 'application/vnd.openxmlformats-officedocument.wordprocessingml.document' 
-              or file.filename.endswith('.docx')):
-            try:
-                import mammoth
-                # إعادة قراءة الملف للـ DOCX (في حال تم قراءته من قبل للـ PDF)
-                file.seek(0)
-                document_bytes = io.BytesIO(file.read())
-                result = mammoth.extract_raw_text(document_bytes)
-                file_content = result.value
-            except Exception as e:
-                return "", f"خطأ في قراءة ملف DOCX: {str(e)}"
+                file_content, error = _extract_document_text(file, upload)
+                if error:
+                    return "", error
+                
+                if file_content.strip():
+                    try:
+                        extraction_cache.put(upload.digest, 'text', {
+                            "text": file_content,
+                            "metadata": {"filename": file.filename, "size": upload.size}
+                        })
+                    except OSError as e:
+                        print(f"⚠️ تعذر حفظ النص المستخرج: {e}")
         else:
             return "", f"صيغة الملف غير مدعومة: {file_type}"
         
@@ -153,21 +176,47 @@ def read_file_content(file) -> tuple[str, str]:
             
         return file_content, ""
         
+    except UploadTooLargeError as e:
+        return "", str(e)
     except Exception as e:
         return "", f"خطأ في قراءة الملف: {str(e)}"
 
-def _fallback_pdf_read(file, initial_error: str) -> tuple[str, str]:
-    """طريقة احتياطية لقراءة PDF باستخدام PyPDF2"""
-    try:
-        # إعادة تعيين موضع القراءة
-        file.seek(0)
-        
-        from PyPDF2 import PdfReader
-        reader = PdfReader(io.BytesIO(file.read()))
+def _extract_document_text(file, upload: SpooledUpload) -> tuple[str, str]:
+    """استخراج نص PDF أو DOCX من الملف المنسوخ - محسن مع دعم PDF متقدم"""
+    if file.mimetype == 'application/pdf' or file.filename.endswith('.pdf'):
+        # استخدام خدمة PDF المتقدمة
+        if PDF_SERVICE_AVAILABLE:
+            try:
+                pdf_service = get_pdf_service()
+                
+                # استخراج النص باستخدام الخدمة المتقدمة (تقبل البيانات فقط)
+                extracted_text, error_message = pdf_service.extract_text_only(upload.read_bytes())
+                
+                if error_message:
+                    return "", f"خطأ في قراءة ملف PDF: {error_message}"
+                
+                return extracted_text, ""
+                
+            except Exception as e:
+                # العودة للطريقة القديمة كـ fallback
+                return _fallback_pdf_read(upload, str(e))
         
-        file_content = ""
-        for page in reader.pages:
-            file_content += page.extract_text() + "\n"
+        # استخدام الطريقة القديمة
+        return _fallback_pdf_read(upload, "خدمة PDF المتقدمة غير متاحة")
+    
+    try:
+        import mammoth
+        with upload.open() as document:
+            result = mammoth.extract_raw_text(document)
+        return result.value, ""
+    except Exception as e:
+        return "", f"خطأ في قراءة ملف DOCX: {str(e)}"
+
+def _fallback_pdf_read(upload: SpooledUpload, initial_error: str) -> tuple[str, str]:
+    """طريقة احتياطية لقراءة PDF بمحرك الاستخراج المتوازي"""
+    try:
+        # الملفات الكبيرة تُمرَّر بمسارها فتفتحها العمليات العاملة دون نسخ بياناتها
+        file_content = get_pdf_ingestion_engine().extract_text(upload.source())
         
         if not file_content.strip():
             return "", f"فشل في استخراج النص. {initial_error}"
@@ -467,33 +516,42 @@ def build_blueprint():
             "error": f"خطأ في بناء المخطط: {str(e)}"
         }), 500
 
+def _prepare_chapter_generation(data: Dict[str, Any]) -> tuple[Optional[List[Dict[str, str]]], int]:
+    """بناء رسائل توليد الفصل وحد الطول المطلوب (مشترك بين المسار العادي والبث)"""
+    chapter_blueprint = data.get('chapter_blueprint')
+    novel_style_profile = data.get('novel_style_profile', {})
+    previous_chapter_summary = data.get('previous_chapter_summary', '')
+    
+    if not chapter_blueprint:
+        return None, 0
+    
+    # الحصول على معرف المستخدم للتخصيص الذكي
+    user_id = get_user_id_from_request(request)
+    
+    # إنشاء prompt محسن لتوليد الفصل مع تفعيل أسلوب الجطلاوي
+    prompt_messages = create_chapter_generation_prompt(
+        chapter_blueprint, 
+        novel_style_profile, 
+        previous_chapter_summary,
+        jattlaoui_style_enabled=True,  # تفعيل الأسلوب الجطلاوي المطور
+        user_id=user_id  # للتخصيص الذكي
+    )
+    
+    word_target = chapter_blueprint.get('wordTarget', 3000)
+    print(f"✍️ بدء كتابة الفصل {chapter_blueprint.get('number', '؟')}...")
+    
+    return prompt_messages, word_target
+
 @app.route('/api/generate-chapter', methods=['POST'])
 def generate_chapter():
     """المرحلة 4: توليد فصل من الرواية"""
     try:
         data = request.json
-        chapter_blueprint = data.get('chapter_blueprint')
-        novel_style_profile = data.get('novel_style_profile', {})
-        previous_chapter_summary = data.get('previous_chapter_summary', '')
+        prompt_messages, word_target = _prepare_chapter_generation(data)
         
-        if not chapter_blueprint:
+        if prompt_messages is None:
             return jsonify({"error": "مخطط الفصل مفقود"}), 400
         
-        # الحصول على معرف المستخدم للتخصيص الذكي
-        user_id = get_user_id_from_request(request)
-        
-        # إنشاء prompt محسن لتوليد الفصل مع تفعيل أسلوب الجطلاوي
-        prompt_messages = create_chapter_generation_prompt(
-            chapter_blueprint, 
-            novel_style_profile, 
-            previous_chapter_summary,
-            jattlaoui_style_enabled=True,  # تفعيل الأسلوب الجطلاوي المطور
-            user_id=user_id  # للتخصيص الذكي
-        )
-        
-        word_target = chapter_blueprint.get('wordTarget', 3000)
-        
-        print(f"✍️ بدء كتابة الفصل {chapter_blueprint.get('number', '؟')}...")
         chapter_result = call_llm(
             prompt_messages,
             model=get_best_model_for_task("creative"),
@@ -525,6 +583,58 @@ def generate_chapter():
             "error": f"خطأ في توليد الفصل: {str(e)}"
         }), 500
 
+# ================== البث المباشر للفصل (Server-Sent Events) ==================
+
+# البث الحقيقي رمزاً برمز: stream_llm من llm_service إن وُجدت، وإلا واجهة البث المتوافقة مع OpenAI
+from llm_streaming import chapter_stream_events, format_sse, stream_model_for, streaming_configured
+try:
+    from llm_service import stream_llm  # نفس مزود call_llm وأسماء نماذجه
+    LLM_STREAMING_AVAILABLE = True
+    LLM_STREAM_MAPS_MODELS = False
+except ImportError:
+    from llm_streaming import stream_llm
+    LLM_STREAMING_AVAILABLE = streaming_configured()
+    LLM_STREAM_MAPS_MODELS = True
+
+def iter_llm_tokens(messages, model: Optional[str] = None, **kwargs) -> Generator[str, None, None]:
+    """إرجاع أجزاء النص فور وصولها من النموذج"""
+    stream_model = stream_model_for(model) if LLM_STREAM_MAPS_MODELS else model
+    if LLM_STREAMING_AVAILABLE and (stream_model is not None or not LLM_STREAM_MAPS_MODELS):
+        yield from stream_llm(messages, model=stream_model, **kwargs)
+        return
+    
+    # بدون دعم البث، أو نموذج المهمة لا مقابل له لدى مزود البث: استدعاء عادي وإرسال الناتج كجزء واحد
+    result = call_llm(messages, model=model, json_output=False, **kwargs)
+    if "error" in result:
+        raise RuntimeError(result.get("error"))
+    yield result.get("content", "")
+
+@app.route('/api/generate-chapter/stream', methods=['POST'])
+def generate_chapter_stream():
+    """المرحلة 4 (بث مباشر): إرسال نص الفصل أولاً بأول ثم النتيجة النهائية"""
+    data = request.json or {}
+    prompt_messages, word_target = _prepare_chapter_generation(data)
+    
+    if prompt_messages is None:
+        return jsonify({"error": "مخطط الفصل مفقود"}), 400
+    
+    def generate():
+        yield from chapter_stream_events(iter_llm_tokens(
+            prompt_messages,
+            model=get_best_model_for_task("creative"),
+            max_tokens=word_target + 1000,
+            temperature=0.7
+        ))
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'  # منع nginx من تجميع الاستجابة
+        }
+    )
+
 @app.route('/api/refine-text', methods=['POST'])
 def refine_text():
     """المرحلة 5: تنقيح النص التفاعلي"""
@@ -670,189 +780,116 @@ def generate_final_report():
             "error": f"خطأ في إنشاء التقرير النهائي: {str(e)}"
         }), 500
 
+# مهام التصدير في الخلفية ومخزن ملفاتها
+export_jobs = create_export_job_manager_from_env()
+
+def _parse_export_request(data: Dict[str, Any]) -> tuple:
+    """(التصدير، الصيغة، رسالة الخطأ) من جسم طلب التصدير"""
+    chapters_content = data.get('chapters_content', [])
+    export_format = data.get('format', 'txt')
+    
+    if not chapters_content:
+        return None, export_format, "محتوى الفصول مفقود"
+    
+    if export_format not in EXPORT_FORMATS:
+        return None, export_format, f"صيغة التصدير غير مدعومة: {export_format}"
+    
+    export = NovelExport(
+        chapters=chapters_content,
+        metadata=data.get('metadata', {}),
+        include_analysis=data.get('include_analysis', False),
+        quality_report=data.get('quality_report', {})
+    )
+    return export, export_format, None
+
+def _export_job_response(job: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "job_id": job["job_id"],
+        "status": job["status"],
+        "format": job["format"],
+        "cached": job["cached"],
+        "size": job["size"],
+        "error": job["error"],
+        "status_url": f"/api/export-novel/jobs/{job['job_id']}",
+        "download_url": f"/api/export-novel/jobs/{job['job_id']}/download"
+    }
+
 @app.route('/api/export-novel', methods=['POST'])
 def export_novel():
     """تصدير الرواية بصيغ مختلفة"""
     try:
-        data = request.json
-        chapters_content = data.get('chapters_content', [])
-        export_format = data.get('format', 'txt')
-        metadata = data.get('metadata', {})
-        include_analysis = data.get('include_analysis', False)
-        quality_report = data.get('quality_report', {})
-        
-        if not chapters_content:
-            return jsonify({"error": "محتوى الفصول مفقود"}), 400
-        
-        # بناء النص الكامل
-        full_text = ""
-        
-        # إضافة المعلومات الأساسية
-        if metadata:
-            full_text += f"عنوان الرواية: {metadata.get('title', 'غير محدد')}\n"
-            full_text += f"الوصف: {metadata.get('description', 'غير محدد')}\n"
-            full_text += f"تاريخ الإنشاء: {metadata.get('created_at', 'غير محدد')}\n"
-            full_text += f"عدد الفصول: {len(chapters_content)}\n"
-            full_text += "\n" + "="*50 + "\n\n"
-        
-        # إضافة الفصول
-        for i, chapter in enumerate(chapters_content, 1):
-            full_text += f"الفصل {i}\n"
-            full_text += "-" * 20 + "\n\n"
-            
-            if isinstance(chapter, dict):
-                full_text += chapter.get('content', str(chapter))
-            else:
-                full_text += str(chapter)
-            
-            full_text += "\n\n"
+        export, export_format, error = _parse_export_request(request.json)
+        if error:
+            return jsonify({"error": error}), 400
         
-        # إضافة تقرير الجودة إذا كان مطلوباً
-        if include_analysis and quality_report:
-            full_text += "\n" + "="*50 + "\n"
-            full_text += "تقرير الجودة والتحليل\n"
-            full_text += "="*50 + "\n\n"
-            
-            if "overall_quality" in quality_report:
-                full_text += f"الجودة الإجمالية: {quality_report['overall_quality']}%\n\n"
-            
-            if "strengths" in quality_report:
-                full_text += "نقاط القوة:\n"
-                for strength in quality_report['strengths']:
-                    full_text += f"• {strength}\n"
-                full_text += "\n"
-            
-            if "improvements" in quality_report:
-                full_text += "نقاط التحسين:\n"
-                for improvement in quality_report['improvements']:
-                    full_text += f"• {improvement}\n"
-                full_text += "\n"
+        # TXT و JSON تُولَّد أثناء الإرسال، و DOCX و EPUB تُكتب فصلاً فصلاً في ملف مؤقت
+        chunks = stream_export(export, export_format)
         
-        # إنشاء الملف وإرساله للتحميل
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        if export_format == 'txt':
-            # إنشاء ملف نصي مؤقت
-            filename = f"novel_{timestamp}.txt"
-            file_buffer = io.BytesIO()
-            file_buffer.write(full_text.encode('utf-8'))
-            file_buffer.seek(0)
-            
-            return send_file(
-                file_buffer,
-                as_attachment=True,
-                download_name=filename,
-                mimetype='text/plain; charset=utf-8'
-            )
-        
-        elif export_format == 'docx':
-            try:
-                from docx import Document
-                from docx.shared import Inches
-                
-                # إنشاء مستند Word
-                doc = Document()
-                
-                # إضافة العنوان
-                if metadata and 'title' in metadata:
-                    title = doc.add_heading(metadata['title'], 0)
-                    title.alignment = 2  # مركز
-                
-                # إضافة معلومات الكتاب
-                if metadata:
-                    info_para = doc.add_paragraph()
-                    if 'author' in metadata:
-                        info_para.add_run(f"المؤلف: {metadata['author']}\n").bold = True
-                    if 'description' in metadata:
-                        info_para.add_run(f"الوصف: {metadata['description']}\n")
-                    if 'total_words' in metadata:
-                        info_para.add_run(f"عدد الكلمات: {metadata['total_words']:,}\n")
-                    if 'chapters' in metadata:
-                        info_para.add_run(f"عدد الفصول: {metadata['chapters']}\n")
-                
-                # إضافة خط فاصل
-                doc.add_paragraph("=" * 50)
-                doc.add_page_break()
-                
-                # إضافة الفصول
-                for i, chapter in enumerate(chapters_content, 1):
-                    chapter_heading = doc.add_heading(f"الفصل {i}", level=1)
-                    chapter_heading.alignment = 1  # يسار
-                    
-                    # إضافة محتوى الفصل
-                    chapter_para = doc.add_paragraph(chapter)
-                    chapter_para.alignment = 3  # ضبط
-                    
-                    # فاصل بين الفصول
-                    if i < len(chapters_content):
-                        doc.add_page_break()
-                
-                # إضافة تقرير الجودة إذا كان مطلوباً
-                if include_analysis and quality_report:
-                    doc.add_page_break()
-                    analysis_heading = doc.add_heading("تقرير الجودة والتحليل", level=1)
-                    analysis_heading.alignment = 1
-                    
-                    if "overall_quality" in quality_report:
-                        doc.add_paragraph(f"الجودة الإجمالية: {quality_report['overall_quality']}%")
-                    
-                    if "strengths" in quality_report:
-                        strengths_para = doc.add_paragraph()
-                        strengths_para.add_run("نقاط القوة:\n").bold = True
-                        for strength in quality_report['strengths']:
-                            strengths_para.add_run(f"• {strength}\n")
-                    
-                    if "improvements" in quality_report:
-                        improvements_para = doc.add_paragraph()
-                        improvements_para.add_run("نقاط التحسين:\n").bold = True
-                        for improvement in quality_report['improvements']:
-                            improvements_para.add_run(f"• {improvement}\n")
-                
-                # حفظ المستند في buffer
-                filename = f"novel_{timestamp}.docx"
-                file_buffer = io.BytesIO()
-                doc.save(file_buffer)
-                file_buffer.seek(0)
-                
-                return send_file(
-                    file_buffer,
-                    as_attachment=True,
-                    download_name=filename,
-                    mimetype='application/vnd.openxmlformats-officedocument.wordprocessingml.document'
-                )
-                
-            except ImportError:
-                return jsonify({"error": "مكتبة python-docx غير متاحة"}), 500
-        
-        elif export_format == 'json':
-            export_data = {
-                "metadata": metadata,
-                "chapters": chapters_content,
-                "quality_report": quality_report if include_analysis else None,
-                "export_date": datetime.now().isoformat(),
-                "total_words": sum(len(str(chapter).split()) for chapter in chapters_content)
-            }
-            
-            filename = f"novel_{timestamp}.json"
-            file_buffer = io.BytesIO()
-            file_buffer.write(json.dumps(export_data, ensure_ascii=False, indent=2).encode('utf-8'))
-            file_buffer.seek(0)
-            
-            return send_file(
-                file_buffer,
-                as_attachment=True,
-                download_name=filename,
-                mimetype='application/json; charset=utf-8'
-            )
-        
-        else:
-            return jsonify({"error": f"صيغة التصدير غير مدعومة: {export_format}"}), 400
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        filename = f"novel_{timestamp}.{extension}"
+        
+        # بدون Content-Length فتُرسل الاستجابة على دفعات (chunked)
+        return Response(
+            chunks,
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+        )
         
     except Exception as e:
         return jsonify({
             "error": f"خطأ في تصدير الرواية: {str(e)}"
         }), 500
 
+@app.route('/api/export-novel/jobs', methods=['POST'])
+def submit_export_job():
+    """بدء تصدير في الخلفية؛ الطلب المطابق لتصدير سابق يعيد ملفه مباشرة"""
+    try:
+        export, export_format, error = _parse_export_request(request.json)
+        if error:
+            return jsonify({"error": error}), 400
+        
+        try:
+            job = export_jobs.submit(export, export_format)
+        except ExecutorBusyError as e:
+            return jsonify({"error": str(e)}), 503
+        
+        status_code = 200 if job["status"] == STATUS_COMPLETED else 202
+        return jsonify(_export_job_response(job)), status_code
+        
+    except Exception as e:
+        return jsonify({"error": f"خطأ في بدء التصدير: {str(e)}"}), 500
+
+@app.route('/api/export-novel/jobs/<job_id>', methods=['GET'])
+def get_export_job(job_id):
+    """حالة مهمة التصدير"""
+    job = export_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "مهمة التصدير غير موجودة أو انتهت صلاحيتها"}), 404
+    return jsonify(_export_job_response(job))
+
+@app.route('/api/export-novel/jobs/<job_id>/download', methods=['GET'])
+def download_export_job(job_id):
+    """تحميل ملف مهمة التصدير المكتملة"""
+    job = export_jobs.get(job_id)
+    if job is None:
+        return jsonify({"error": "مهمة التصدير غير موجودة أو انتهت صلاحيتها"}), 404
+    if job["status"] != STATUS_COMPLETED:
+        return jsonify({"error": "التصدير لم يكتمل بعد", "status": job["status"]}), 409
+    
+    path = export_jobs.artifact_path(job_id)
+    if path is None:
+        return jsonify({"error": "انتهت صلاحية ملف التصدير"}), 410
+    
+    mimetype, extension = EXPORT_FORMATS[job["format"]]
+    return send_file(
+        path,
+        as_attachment=True,
+        download_name=f"novel_{job['key'][:12]}.{extension}",
+        mimetype=mimetype
+    )
+
 # ================== مسارات إضافية ==================
 
 @app.route('/api/models', methods=['GET'])
@@ -909,14 +946,39 @@ from workflow_engine import (
     WorkflowEngine, WorkflowDefinition, WorkflowNode, NodeType, 
     ExecutionStatus, WorkflowTemplates, NodeFactory
 )
-import asyncio
-from threading import Thread
+from execution_registry import (
+    create_workflow_executor_from_env, STATUS_FAILED, STATUS_CANCELLED
+)
+from workflow_scheduler import (
+    execute_workflow_parallel, build_dependencies, topological_order, WorkflowCycleError
+)
 import uuid
 import time
 
 # إنشاء محرك سير العمل
 workflow_engine = WorkflowEngine()
-active_workflow_executions = {}
+
+# منفّذ محدود وسجل تنفيذات بصلاحية زمنية بدلاً من خيط وقاموس دائم لكل تنفيذ
+workflow_executor = create_workflow_executor_from_env()
+workflow_executions = workflow_executor.registry
+
+# الحد الافتراضي لعدد العقد المتزامنة داخل سير العمل الواحد
+WORKFLOW_MAX_PARALLEL_NODES = int(os.getenv('WORKFLOW_MAX_PARALLEL_NODES', 3))
+
+def _progress_snapshot(progress) -> Dict[str, Any]:
+    """نسخة قابلة للتخزين من حالة التقدم"""
+    return {
+        "total_nodes": progress.total_nodes,
+        "completed_nodes": progress.completed_nodes,
+        "failed_nodes": progress.failed_nodes,
+        "current_node": progress.current_node,
+        "progress_percentage": progress.progress_percentage,
+        "status": progress.status,
+        "logs": list(progress.logs[-10:]) if progress.logs else [],  # آخر 10 سجلات
+        "running_nodes": list(getattr(progress, 'running_nodes', [])),
+        "node_timings": dict(getattr(progress, 'node_timings', {})),
+        "critical_path": list(getattr(progress, 'critical_path', []))
+    }
 
 @app.route('/api/workflows/templates', methods=['GET'])
 def get_workflow_templates():
@@ -1044,46 +1106,33 @@ def run_workflow():
         # إنشاء معرف فريد للتنفيذ
         execution_id = f"exec_{int(time.time())}_{str(uuid.uuid4())[:8]}"
         
-        # بدء التنفيذ في خيط منفصل لتجنب تعليق الواجهة
-        def run_workflow_async():
-            try:
-                loop = asyncio.new_event_loop()
-                asyncio.set_event_loop(loop)
-                
-                def progress_callback(progress):
-                    active_workflow_executions[execution_id] = {
-                        "progress": progress,
-                        "last_update": datetime.now()
-                    }
-                
-                result = loop.run_until_complete(
-                    workflow_engine.execute_workflow(
-                        workflow, 
-                        initial_data, 
-                        progress_callback,
-                        user_id=user_id
-                    )
-                )
-                
-                # حفظ النتيجة النهائية
-                active_workflow_executions[execution_id] = {
-                    "result": result,
-                    "completed": True,
-                    "last_update": datetime.now()
-                }
-                
-            except Exception as e:
-                print(f"خطأ في تنفيذ سير العمل: {str(e)}")
-                active_workflow_executions[execution_id] = {
-                    "error": str(e),
-                    "failed": True,
-                    "last_update": datetime.now()
-                }
+        # رفض السير الذي يحتوي على اعتماديات دائرية قبل إضافته للطابور
+        try:
+            topological_order(workflow.nodes, build_dependencies(workflow.nodes))
+        except WorkflowCycleError as e:
+            return jsonify({"error": str(e)}), 400
+        
+        # حد التزامن لهذا السير (قابل للتعديل من بيانات السير الوصفية)
+        max_parallel_nodes = int((workflow.metadata or {}).get('max_parallel_nodes', WORKFLOW_MAX_PARALLEL_NODES))
         
-        # بدء التنفيذ
-        thread = Thread(target=run_workflow_async)
-        thread.daemon = True
-        thread.start()
+        # إضافة التنفيذ إلى طابور المنفّذ لتجنب تعليق الواجهة
+        def progress_callback(progress):
+            workflow_executions.update_progress(execution_id, _progress_snapshot(progress))
+        
+        try:
+            workflow_executor.submit(
+                execution_id,
+                lambda: execute_workflow_parallel(
+                    workflow_engine,
+                    workflow, 
+                    initial_data, 
+                    progress_callback,
+                    max_concurrency=max_parallel_nodes,
+                    user_id=user_id
+                )
+            )
+        except ExecutorBusyError as e:
+            return jsonify({"error": str(e)}), 503
         
         return jsonify({
             "success": True,
@@ -1099,52 +1148,45 @@ def run_workflow():
 def get_workflow_progress(execution_id):
     """الحصول على حالة تقدم سير العمل"""
     try:
-        if execution_id not in active_workflow_executions:
+        execution_data = workflow_executions.get(execution_id)
+        if execution_data is None:
             return jsonify({"error": "معرف التنفيذ غير موجود"}), 404
         
-        execution_data = active_workflow_executions[execution_id]
+        status = execution_data["status"]
         
         # التحقق من انتهاء التنفيذ
-        if "result" in execution_data:
+        if status == STATUS_COMPLETED:
             return jsonify({
                 "success": True,
                 "completed": True,
-                "result": execution_data["result"]
+                "result": execution_data.get("result")
             })
         
-        elif "error" in execution_data:
+        elif status == STATUS_FAILED:
             return jsonify({
                 "success": False,
                 "failed": True,
-                "error": execution_data["error"]
+                "error": execution_data.get("error")
+            })
+        
+        elif status == STATUS_CANCELLED:
+            return jsonify({
+                "success": False,
+                "cancelled": True,
+                "message": "تم إلغاء تنفيذ سير العمل"
             })
         
         else:
-            # التنفيذ قيد التقدم
+            # التنفيذ قيد التقدم أو في الطابور
             progress = execution_data.get("progress")
-            if progress:
-                return jsonify({
-                    "success": True,
-                    "running": True,
-                    "progress": {
-                        "total_nodes": progress.total_nodes,
-                        "completed_nodes": progress.completed_nodes,
-                        "failed_nodes": progress.failed_nodes,
-                        "current_node": progress.current_node,
-                        "progress_percentage": progress.progress_percentage,
-                        "status": progress.status,
-                        "logs": progress.logs[-10:] if progress.logs else []  # آخر 10 سجلات
-                    }
-                })
-            else:
-                return jsonify({
-                    "success": True,
-                    "running": True,
-                    "progress": {
-                        "status": "initializing",
-                        "progress_percentage": 0
-                    }
-                })
+            return jsonify({
+                "success": True,
+                "running": True,
+                "progress": progress or {
+                    "status": "initializing" if status == "running" else status,
+                    "progress_percentage": 0
+                }
+            })
         
     except Exception as e:
         return jsonify({"error": f"خطأ في جلب حالة التقدم: {str(e)}"}), 500
@@ -1153,18 +1195,22 @@ def get_workflow_progress(execution_id):
 def cancel_workflow(execution_id):
     """إلغاء تنفيذ سير العمل"""
     try:
-        if execution_id in active_workflow_executions:
-            active_workflow_executions[execution_id] = {
-                "cancelled": True,
-                "last_update": datetime.now()
-            }
-            return jsonify({
-                "success": True,
-                "message": "تم إلغاء تنفيذ سير العمل"
-            })
-        else:
+        execution_data = workflow_executions.get(execution_id)
+        if execution_data is None:
             return jsonify({"error": "معرف التنفيذ غير موجود"}), 404
         
+        if not workflow_executor.cancel(execution_id):
+            return jsonify({
+                "success": False,
+                "message": "انتهى تنفيذ سير العمل بالفعل",
+                "status": execution_data["status"]
+            }), 409
+        
+        return jsonify({
+            "success": True,
+            "message": "تم إلغاء تنفيذ سير العمل"
+        })
+        
     except Exception as e:
         return jsonify({"error": f"خطأ في إلغاء سير العمل: {str(e)}"}), 500
 
@@ -2471,8 +2517,22 @@ def analyze_text_content():
                 'error': 'النص فارغ'
             }), 400
         
-        # تحليل النص
-        analysis = perform_text_analysis(text, user_profile, analysis_type)
+        # تحليل النص (أو إرجاعه من الذاكرة المؤقتة إن لم يتغير)
+        analysis = analysis_cache.get_or_compute(
+            'analysis', text,
+            {'user_profile': user_profile, 'analysis_type': analysis_type},
+            lambda: perform_text_analysis(text, user_profile, analysis_type),
+            cacheable=lambda result: 'error' not in result
+        )
+        
+        if 'error' in analysis:
+            # فشل التحليل: القيم الافتراضية تُرسل دون أن تُعدّ نتيجة ناجحة
+            error = analysis.pop('error')
+            return jsonify({
+                'success': False,
+                'error': f"خطأ في تحليل النص: {error}",
+                'analysis': analysis
+            }), 500
         
         return jsonify({
             'success': True,
@@ -2526,6 +2586,11 @@ def apply_smart_suggestion():
         selection = data.get('selection', {})
         suggestion = data.get('suggestion', {})
         user_profile = data.get('user_profile', {})
+        document_id = data.get('document_id')
+        
+        # مستند محفوظ في الخادم: التعديل بالمواضع وإرجاع النطاق المتغير فقط
+        if document_id and selection and suggestion:
+            return apply_suggestion_to_document(document_id, data, selection, suggestion, user_profile)
         
         if not original_text or not selection or not suggestion:
             return jsonify({
@@ -2551,6 +2616,124 @@ def apply_smart_suggestion():
             'error': f"خطأ في تطبيق الاقتراح: {str(e)}"
         }), 500
 
+def apply_suggestion_to_document(document_id: str, data: dict, selection: dict,
+                                 suggestion: dict, user_profile: dict):
+    """تطبيق اقتراح على مستند محفوظ بجدول القطع"""
+    document = document_store.get(document_id)
+    if document is None:
+        if not data.get('original_text'):
+            return jsonify({
+                'success': False,
+                'error': 'المستند غير موجود، أرسل النص الأصلي'
+            }), 404
+        document = document_store.load(document_id, data['original_text'])
+    
+    try:
+        start = int(selection.get('start', 0))
+        end = int(selection.get('end', start + len(selection.get('text', ''))))
+        document, selected_text, spans = document_store.transform_range(
+            document_id, start, end,
+            lambda text: transform_selection(text, suggestion.get('type', ''), user_profile),
+            data.get('base_version')
+        )
+        modified_selection = spans[0]['text']
+    except EditConflictError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e),
+            'version': document.version
+        }), 409
+    
+    return jsonify({
+        'success': True,
+        'document_id': document_id,
+        'version': document.version,
+        'length': len(document),
+        'modification': modified_selection,
+        'changed_spans': spans,
+        'applied_changes': {
+            'original': selected_text,
+            'modified': modified_selection,
+            'type': suggestion.get('type', '')
+        }
+    })
+
+@app.route('/api/smart-editor/documents', methods=['POST'])
+def open_editor_document():
+    """تحميل نص المستند في الخادم لتطبيق التعديلات عليه بالمواضع"""
+    try:
+        data = request.get_json() or {}
+        text = data.get('text', '')
+        document_id = data.get('document_id') or str(uuid.uuid4())
+        
+        document = document_store.load(document_id, text)
+        
+        return jsonify({
+            'success': True,
+            'document_id': document_id,
+            'version': document.version,
+            'length': len(document)
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f"خطأ في تحميل المستند: {str(e)}"
+        }), 500
+
+@app.route('/api/smart-editor/documents/<document_id>', methods=['GET'])
+def get_editor_document(document_id):
+    """الحصول على نص المستند أو جزء منه"""
+    document = document_store.get(document_id)
+    if document is None:
+        return jsonify({'success': False, 'error': 'المستند غير موجود'}), 404
+    
+    try:
+        start = request.args.get('start', 0, type=int)
+        end = request.args.get('end', len(document), type=int)
+        return jsonify({
+            'success': True,
+            'document_id': document_id,
+            'version': document.version,
+            'length': len(document),
+            'start': start,
+            'end': end,
+            'text': document.get_text(start, end)
+        })
+    except EditConflictError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/api/smart-editor/documents/<document_id>/edits', methods=['POST'])
+def apply_editor_edits(document_id):
+    """تطبيق دفعة تعديلات بالمواضع وإرجاع النطاقات المتغيرة فقط"""
+    try:
+        data = request.get_json() or {}
+        edits = data.get('edits', [])
+        
+        if not edits:
+            return jsonify({'success': False, 'error': 'لا توجد تعديلات'}), 400
+        
+        try:
+            document, spans = document_store.apply_edits(document_id, edits, data.get('base_version'))
+        except KeyError:
+            return jsonify({'success': False, 'error': 'المستند غير موجود'}), 404
+        except EditConflictError as e:
+            return jsonify({'success': False, 'error': str(e)}), 409
+        
+        return jsonify({
+            'success': True,
+            'document_id': document_id,
+            'version': document.version,
+            'length': len(document),
+            'changed_spans': spans
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f"خطأ في تطبيق التعديلات: {str(e)}"
+        }), 500
+
 @app.route('/api/smart-editor/highlight-issues', methods=['POST'])
 def highlight_text_issues():
     """تحديد وإبراز مشاكل النص للتغذية المرئية"""
@@ -2566,7 +2749,10 @@ def highlight_text_issues():
             }), 400
         
         # تحديد المشاكل
-        issues = detect_text_issues(text, issue_types)
+        issues = analysis_cache.get_or_compute(
+            'issues', text, None,
+            lambda: detect_text_issues(text, issue_types)
+        )
         
         return jsonify({
             'success': True,
@@ -2588,33 +2774,106 @@ def highlight_text_issues():
             'error': f"خطأ في تحديد المشاكل: {str(e)}"
         }), 500
 
+@app.route('/api/smart-editor/analyze-incremental', methods=['POST'])
+def analyze_text_incremental():
+    """تحليل تزايدي: إعادة تحليل الفقرات المتغيرة فقط ودمجها في مجاميع المستند"""
+    try:
+        data = request.get_json() or {}
+        document_id = data.get('document_id')
+        text = data.get('text')
+        changes = data.get('changes', [])
+        user_profile = data.get('user_profile', {})
+        
+        if not document_id:
+            return jsonify({
+                'success': False,
+                'error': 'معرف المستند مفقود'
+            }), 400
+        
+        if text is not None:
+            # تحميل المستند كاملاً (أول مرة أو بعد فقدان التزامن)
+            document = incremental_store.load(document_id, text)
+            changed = {}
+        else:
+            try:
+                applied = incremental_store.apply_changes(
+                    document_id, changes, data.get('base_version')
+                )
+            except DocumentOutOfSyncError:
+                return jsonify({
+                    'success': False,
+                    'resync_required': True,
+                    'error': 'المستند غير متزامن، أرسل النص كاملاً'
+                }), 409
+            except (KeyError, TypeError, ValueError) as e:
+                return jsonify({
+                    'success': False,
+                    'resync_required': True,
+                    'error': f"تغييرات غير صالحة: {str(e)}"
+                }), 400
+            document, changed = applied['document'], applied['changed']
+        
+        totals = document.totals
+        return jsonify({
+            'success': True,
+            'document_id': document_id,
+            'version': document.version,
+            'statistics': {
+                'wordCount': totals.word_count,
+                'sentenceCount': max(totals.sentence_count, 1),
+                'paragraphCount': max(totals.paragraph_count, 1),
+                'readabilityScore': calculate_readability_score('', totals),
+                'complexityLevel': determine_complexity_level('', totals.word_count, totals),
+                'styleScore': calculate_style_score('', user_profile, totals),
+                'longSentences': totals.long_sentences
+            },
+            'repeated_words': totals.top_repeated_words(),
+            'changed_paragraphs': {
+                str(index): metrics.to_dict() for index, metrics in sorted(changed.items())
+            }
+        })
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'error': f"خطأ في التحليل التزايدي: {str(e)}"
+        }), 500
+
+@app.route('/api/smart-editor/cache-stats', methods=['GET'])
+def get_analysis_cache_stats():
+    """إحصائيات الذاكرة المؤقتة لنتائج التحليل"""
+    return jsonify({
+        'success': True,
+        'cache': analysis_cache.stats(),
+        'incremental_documents': incremental_store.stats(),
+        'extraction_cache': extraction_cache.stats()
+    })
+
 def perform_text_analysis(text: str, user_profile: dict, analysis_type: str) -> dict:
     """تحليل شامل للنص"""
     try:
-        # إحصائيات أساسية
-        words = text.split()
-        sentences = text.count('.') + text.count('!') + text.count('?')
-        paragraphs = len([p for p in text.split('\n') if p.strip()])
+        # تقسيم النص مرة واحدة لكل التحليلات
+        structure = analyze_structure(text)
         
         # تحليل المشاكل
-        issues = detect_text_issues(text)
+        issues = detect_text_issues(text, structure=structure)
         
         # حساب النقاط
-        word_count = len(words)
-        readability_score = calculate_readability_score(text)
+        word_count = structure.word_count
+        readability_score = calculate_readability_score(text, structure)
         sentiment_score = calculate_sentiment_score(text)
-        style_score = calculate_style_score(text, user_profile)
+        style_score = calculate_style_score(text, user_profile, structure)
         overall_score = (readability_score + sentiment_score + style_score) / 3
         
         # تحديد مستوى التعقيد
-        complexity_level = determine_complexity_level(text, word_count)
+        complexity_level = determine_complexity_level(text, word_count, structure)
         
         return {
             'issues': issues,
             'statistics': {
                 'wordCount': word_count,
-                'sentenceCount': max(sentences, 1),
-                'paragraphCount': max(paragraphs, 1),
+                'sentenceCount': max(structure.sentence_count, 1),
+                'paragraphCount': max(structure.paragraph_count, 1),
                 'readabilityScore': readability_score,
                 'complexityLevel': complexity_level,
                 'sentimentScore': sentiment_score,
@@ -2626,7 +2885,9 @@ def perform_text_analysis(text: str, user_profile: dict, analysis_type: str) ->
         
     except Exception as e:
         print(f"خطأ في تحليل النص: {e}")
+        # مفتاح error يمنع حفظ هذه القيم الافتراضية ويجعل الطلب فاشلاً
         return {
+            'error': str(e),
             'issues': [],
             'statistics': {
                 'wordCount': 0,
@@ -2641,77 +2902,6 @@ def perform_text_analysis(text: str, user_profile: dict, analysis_type: str) ->
             'overallScore': 0.5
         }
 
-def detect_text_issues(text: str, issue_types: list = None) -> list:
-    """اكتشاف مشاكل النص"""
-    issues = []
-    words = text.split()
-    
-    try:
-        # اكتشاف التكرار
-        word_counts = {}
-        for i, word in enumerate(words):
-            word_clean = word.strip('.,!?؛:').lower()
-            if len(word_clean) > 3:  # تجاهل الكلمات القصيرة
-                if word_clean in word_counts:
-                    word_counts[word_clean].append(i)
-                else:
-                    word_counts[word_clean] = [i]
-        
-        # إضافة مشاكل التكرار
-        for word, positions in word_counts.items():
-            if len(positions) > 3:  # تكرار أكثر من 3 مرات
-                for pos in positions[3:]:  # بدءاً من المرة الرابعة
-                    start_pos = sum(len(words[j]) + 1 for j in range(pos))
-                    end_pos = start_pos + len(words[pos])
-                    
-                    issues.append({
-                        'id': f"rep_{pos}",
-                        'type': 'repetition',
-                        'severity': 'medium',
-                        'start': start_pos,
-                        'end': end_pos,
-                        'text': words[pos],
-                        'message': f"كلمة '{word}' مكررة كثيراً",
-                        'suggestion': f"حاول استخدام مرادف لـ '{word}'"
-                    })
-        
-        # اكتشاف الجمل الطويلة جداً
-        sentences = text.split('.')
-        current_pos = 0
-        for i, sentence in enumerate(sentences):
-            sentence = sentence.strip()
-            if len(sentence.split()) > 25:  # جملة طويلة جداً
-                issues.append({
-                    'id': f"long_{i}",
-                    'type': 'unclear',
-                    'severity': 'medium',
-                    'start': current_pos,
-                    'end': current_pos + len(sentence),
-                    'text': sentence[:50] + "...",
-                    'message': "جملة طويلة قد تكون صعبة الفهم",
-                    'suggestion': "قسم الجملة إلى جمل أقصر"
-                })
-            current_pos += len(sentence) + 1
-        
-        # اكتشاف علامات الترقيم المفقودة
-        if not any(char in text for char in '.!?'):
-            issues.append({
-                'id': "punct_1",
-                'type': 'grammar',
-                'severity': 'high',
-                'start': 0,
-                'end': len(text),
-                'text': text[:50] + "...",
-                'message': "لا توجد علامات ترقيم في النص",
-                'suggestion': "أضف نقاط وعلامات ترقيم مناسبة"
-            })
-        
-        return issues[:10]  # إرجاع أول 10 مشاكل فقط
-        
-    except Exception as e:
-        print(f"خطأ في اكتشاف مشاكل النص: {e}")
-        return []
-
 def generate_smart_suggestions(selected_text: str, full_text: str, 
                              selection_context: dict, user_profile: dict) -> list:
     """توليد اقتراحات ذكية للنص المحدد"""
@@ -2789,36 +2979,46 @@ def generate_smart_suggestions(selected_text: str, full_text: str,
         print(f"خطأ في توليد الاقتراحات: {e}")
         return []
 
+def transform_selection(selected_text: str, suggestion_type: str, user_profile: dict) -> str:
+    """تحويل النص المحدد بحسب نوع الاقتراح"""
+    # محاكاة تطبيق الاقتراحات (في التطبيق الحقيقي ستكون هناك معالجة متقدمة)
+    if suggestion_type == 'improve':
+        return improve_text_style(selected_text, user_profile)
+    elif suggestion_type == 'expand':
+        return expand_text_content(selected_text, user_profile)
+    elif suggestion_type == 'summarize':
+        return summarize_text_content(selected_text)
+    elif suggestion_type == 'rephrase':
+        return rephrase_text_content(selected_text, user_profile)
+    elif suggestion_type == 'enhance':
+        return enhance_vocabulary(selected_text, user_profile)
+    return selected_text
+
+def locate_selection(text: str, selected_text: str, start: Optional[int]) -> tuple:
+    """تحديد موضع النص المحدد: بالمواضع المرسلة إن طابقت، وإلا أقرب ظهور لها"""
+    if start is not None and text[start:start + len(selected_text)] == selected_text:
+        return start, start + len(selected_text)
+    
+    anchor = start or 0
+    before = text.rfind(selected_text, 0, anchor + len(selected_text))
+    after = text.find(selected_text, anchor)
+    candidates = [pos for pos in (before, after) if pos != -1]
+    if not candidates:
+        raise ValueError("النص المحدد غير موجود في النص الأصلي")
+    found = min(candidates, key=lambda pos: abs(pos - anchor))
+    return found, found + len(selected_text)
+
 def apply_suggestion_to_text(original_text: str, selection: dict, 
                            suggestion: dict, user_profile: dict) -> dict:
-    """تطبيق اقتراح على النص"""
+    """تطبيق اقتراح على النص في موضع التحديد"""
     try:
         selected_text = selection.get('text', '')
         suggestion_type = suggestion.get('type', '')
+        modified_selection = transform_selection(selected_text, suggestion_type, user_profile)
         
-        # محاكاة تطبيق الاقتراحات (في التطبيق الحقيقي ستكون هناك معالجة متقدمة)
-        if suggestion_type == 'improve':
-            modified_selection = improve_text_style(selected_text, user_profile)
-        elif suggestion_type == 'expand':
-            modified_selection = expand_text_content(selected_text, user_profile)
-        elif suggestion_type == 'summarize':
-            modified_selection = summarize_text_content(selected_text)
-        elif suggestion_type == 'rephrase':
-            modified_selection = rephrase_text_content(selected_text, user_profile)
-        elif suggestion_type == 'enhance':
-            modified_selection = enhance_vocabulary(selected_text, user_profile)
-        else:
-            modified_selection = selected_text
-        
-        # استبدال النص في النص الأصلي
-        start_pos = selection.get('start', 0)
-        end_pos = selection.get('end', len(selected_text))
-        
-        modified_text = (
-            original_text[:original_text.find(selected_text)] + 
-            modified_selection + 
-            original_text[original_text.find(selected_text) + len(selected_text):]
-        )
+        # استبدال النص في موضعه (وليس أول ظهور له)
+        start_pos, end_pos = locate_selection(original_text, selected_text, selection.get('start'))
+        modified_text = original_text[:start_pos] + modified_selection + original_text[end_pos:]
         
         return {
             'modified_text': modified_text,
@@ -2826,7 +3026,9 @@ def apply_suggestion_to_text(original_text: str, selection: dict,
             'changes': {
                 'original': selected_text,
                 'modified': modified_selection,
-                'type': suggestion_type
+                'type': suggestion_type,
+                'start': start_pos,
+                'end': end_pos
             }
         }
         
@@ -2838,37 +3040,47 @@ def apply_suggestion_to_text(original_text: str, selection: dict,
             'changes': {}
         }
 
+# معاجم الأسلوب والمشاعر، تُجمَّع مرة واحدة عند التحميل وتُطبَّق في مرور واحد على النص
+STYLE_IMPROVEMENTS = LexiconMatcher({
+    'كان': 'بدا',
+    'قال': 'صرح',
+    'ذهب': 'توجه',
+    'جميل': 'رائع',
+    'كبير': 'عظيم'
+})
+
+CONTENT_EXPANSIONS = LexiconMatcher({
+    'الليل': 'الليل البهيم',
+    'النجوم': 'النجوم المتلألئة في السماء',
+    'الذكريات': 'الذكريات العزيزة والغالية'
+})
+
+REPHRASINGS = LexiconMatcher({
+    'في ظلال': 'تحت ظلال',
+    'يتأمل': 'يراقب',
+    'المتلألئة': 'البراقة'
+})
+
+VOCABULARY_ENHANCEMENTS = LexiconMatcher({
+    'جلس': 'استقر',
+    'باردة': 'عليلة',
+    'يداعب': 'يلامس'
+})
+
+SENTIMENT_LEXICON = LexiconMatcher({
+    **{word: 'positive' for word in ['جميل', 'رائع', 'ممتاز', 'سعيد', 'فرح', 'حب']},
+    **{word: 'negative' for word in ['سيء', 'حزين', 'ألم', 'صعب', 'مشكلة']}
+})
+
 def improve_text_style(text: str, user_profile: dict) -> str:
     """تحسين أسلوب النص"""
     # محاكاة تحسين الأسلوب
-    improvements = {
-        'كان': 'بدا',
-        'قال': 'صرح',
-        'ذهب': 'توجه',
-        'جميل': 'رائع',
-        'كبير': 'عظيم'
-    }
-    
-    improved_text = text
-    for old, new in improvements.items():
-        improved_text = improved_text.replace(old, new)
-    
-    return improved_text
+    return STYLE_IMPROVEMENTS.replace(text)
 
 def expand_text_content(text: str, user_profile: dict) -> str:
     """توسيع محتوى النص"""
     # محاكاة توسيع النص
-    expansions = {
-        'الليل': 'الليل البهيم',
-        'النجوم': 'النجوم المتلألئة في السماء',
-        'الذكريات': 'الذكريات العزيزة والغالية'
-    }
-    
-    expanded_text = text
-    for word, expansion in expansions.items():
-        expanded_text = expanded_text.replace(word, expansion)
-    
-    return expanded_text
+    return CONTENT_EXPANSIONS.replace(text)
 
 def summarize_text_content(text: str) -> str:
     """تلخيص محتوى النص"""
@@ -2881,91 +3093,59 @@ def summarize_text_content(text: str) -> str:
 def rephrase_text_content(text: str, user_profile: dict) -> str:
     """إعادة صياغة النص"""
     # محاكاة إعادة الصياغة
-    rephrasings = {
-        'في ظلال': 'تحت ظلال',
-        'يتأمل': 'يراقب',
-        'المتلألئة': 'البراقة'
-    }
-    
-    rephrased_text = text
-    for old, new in rephrasings.items():
-        rephrased_text = rephrased_text.replace(old, new)
-    
-    return rephrased_text
+    return REPHRASINGS.replace(text)
 
 def enhance_vocabulary(text: str, user_profile: dict) -> str:
     """تعزيز المفردات"""
     # محاكاة تعزيز المفردات
-    enhancements = {
-        'جلس': 'استقر',
-        'باردة': 'عليلة',
-        'يداعب': 'يلامس'
-    }
-    
-    enhanced_text = text
-    for simple, advanced in enhancements.items():
-        enhanced_text = enhanced_text.replace(simple, advanced)
-    
-    return enhanced_text
+    return VOCABULARY_ENHANCEMENTS.replace(text)
 
-def calculate_readability_score(text: str) -> float:
+def calculate_readability_score(text: str, structure: TextStructure = None) -> float:
     """حساب نقاط سهولة القراءة"""
-    words = text.split()
-    sentences = max(text.count('.') + text.count('!') + text.count('?'), 1)
+    structure = structure or analyze_structure(text)
     
     # صيغة مبسطة لحساب سهولة القراءة
-    avg_words_per_sentence = len(words) / sentences
-    avg_word_length = sum(len(word) for word in words) / len(words) if words else 0
+    avg_words_per_sentence = structure.avg_words_per_sentence
+    avg_word_length = structure.avg_word_length
     
     # كلما قلت الكلمات في الجملة وقل طول الكلمات، زادت سهولة القراءة
-    readability = max(0, min(1, 1 - (avg_words_per_sentence / 30) - (avg_word_length / 15)))
-    
-    return readability
+    return readability_score(avg_words_per_sentence, avg_word_length)
 
 def calculate_sentiment_score(text: str) -> float:
     """حساب النقاط العاطفية"""
-    # كلمات إيجابية وسلبية بسيطة
-    positive_words = ['جميل', 'رائع', 'ممتاز', 'سعيد', 'فرح', 'حب']
-    negative_words = ['سيء', 'حزين', 'ألم', 'صعب', 'مشكلة']
-    
-    words = text.lower().split()
-    positive_count = sum(1 for word in words if any(pos in word for pos in positive_words))
-    negative_count = sum(1 for word in words if any(neg in word for neg in negative_words))
+    # تصنيف كل كلمة بحسب مدخلات المعجم التي تحتويها
+    positive_count = 0
+    negative_count = 0
+    for word in text.lower().split():
+        categories = SENTIMENT_LEXICON.categories(word)
+        positive_count += 'positive' in categories
+        negative_count += 'negative' in categories
     
     if positive_count + negative_count == 0:
         return 0.5  # محايد
     
     return positive_count / (positive_count + negative_count)
 
-def calculate_style_score(text: str, user_profile: dict) -> float:
+def calculate_style_score(text: str, user_profile: dict, structure: TextStructure = None) -> float:
     """حساب نقاط الأسلوب"""
     # تقييم بسيط للأسلوب
-    words = text.split()
+    structure = structure or analyze_structure(text)
     
     # تنوع المفردات
-    unique_words = len(set(word.lower().strip('.,!?') for word in words))
-    vocabulary_diversity = unique_words / len(words) if words else 0
+    vocabulary_diversity = structure.vocabulary_diversity
     
     # طول الجمل
-    sentences = max(text.count('.') + text.count('!') + text.count('?'), 1)
-    avg_sentence_length = len(words) / sentences
+    avg_sentence_length = structure.avg_words_per_sentence
     
     # نقاط الأسلوب (متوسط بسيط)
-    style_score = (vocabulary_diversity + min(avg_sentence_length / 20, 1)) / 2
-    
-    return min(1, max(0, style_score))
+    return style_score(vocabulary_diversity, avg_sentence_length)
 
-def determine_complexity_level(text: str, word_count: int) -> str:
+def determine_complexity_level(text: str, word_count: int, structure: TextStructure = None) -> str:
     """تحديد مستوى تعقيد النص"""
-    sentences = max(text.count('.') + text.count('!') + text.count('?'), 1)
-    avg_words_per_sentence = word_count / sentences
+    structure = structure or analyze_structure(text)
+    avg_words_per_sentence = word_count / max(structure.sentence_count, 1)
     
-    if avg_words_per_sentence > 20:
-        return 'متقدم'
-    elif avg_words_per_sentence > 12:
-        return 'متوسط'
-    else:
-        return 'بسيط'
+    return complexity_level(avg_words_per_sentence)
 
 def generate_improvement_suggestions(text: str, issues: list) -> list:
     """توليد اقتراحات التحسين العامة"""
@@ -3718,9 +3898,12 @@ def get_pdf_info():
         # قراءة بيانات الملف
         pdf_data = file.read()
         
-        # الحصول على معلومات PDF
+        # الحصول على معلومات PDF (أو من الذاكرة إن سبق تحليل نفس الملف)
         pdf_service = get_pdf_service()
-        pdf_info = pdf_service.get_pdf_info(pdf_data)
+        pdf_info = extraction_cache.get_or_extract(
+            pdf_data, 'pdf_info',
+            lambda: {"metadata": pdf_service.get_pdf_info(pdf_data)}
+        )["metadata"]
         
         return jsonify({
             "success": True,
@@ -3732,11 +3915,113 @@ def get_pdf_info():
         print(f"خطأ في تحليل معلومات PDF: {str(e)}")
         return jsonify({"error": f"خطأ في معالجة الملف: {str(e)}"}), 500
 
+def _parallel_pdf_response(extraction: PDFExtraction, file_size: int, processing_time: float) -> Dict[str, Any]:
+    """نتيجة محرك الاستخراج المتوازي بنفس شكل استجابة الاستخراج المتقدم"""
+    text = extraction.text
+    return {
+        "success": bool(text.strip()),
+        "text": text,
+        "metadata": {
+            "title": None,
+            "author": None,
+            "subject": None,
+            "pages_count": extraction.pages_count,
+            "has_arabic_text": any('\u0600' <= char <= '\u06FF' for char in text),
+            "file_size": file_size,
+            "is_encrypted": False
+        },
+        "pages_count": extraction.pages_count,
+        "tables_count": 0,
+        "images_count": 0,
+        "extraction_method": "parallel" if extraction.parallel else "pypdf",
+        "processing_time": processing_time,
+        "error_message": "; ".join(
+            f"صفحة {page}: {error}" for page, error in extraction.page_errors.items()
+        ) or None
+    }
+
+def _extract_pdf_parallel(pdf_data: bytes, stream: bool):
+    """استخراج PDF بمحرك الصفحات المتوازي، مع بث تقدم كل صفحة عند الطلب"""
+    engine = get_pdf_ingestion_engine()
+    started_at = time.time()
+    digest = content_digest(pdf_data)
+    cached = extraction_cache.get(digest, 'pdf_pages')
+    
+    def cached_pages():
+        page_errors = cached["metadata"]["page_errors"]
+        for index, text in enumerate(cached["page_texts"]):
+            yield index, text, page_errors.get(str(index + 1))
+    
+    def finish(extraction: PDFExtraction) -> Dict[str, Any]:
+        if cached is not None:
+            extraction.parallel = cached["metadata"]["parallel"]
+        else:
+            extraction_cache.put(digest, 'pdf_pages', {
+                "page_texts": extraction.page_texts,
+                "metadata": {"page_errors": extraction.page_errors, "parallel": extraction.parallel}
+            })
+        response_data = _parallel_pdf_response(extraction, len(pdf_data), time.time() - started_at)
+        response_data["cached"] = cached is not None
+        return response_data
+    
+    def collect(pages, extraction: PDFExtraction):
+        for index, text, error in pages:
+            extraction.page_texts.append(text)
+            if error:
+                extraction.page_errors[index + 1] = error
+            yield index, text, error
+    
+    if not stream:
+        extraction = PDFExtraction()
+        pages = cached_pages() if cached is not None else engine.iter_pages(pdf_data, extraction=extraction)
+        for _ in collect(pages, extraction):
+            pass
+        return jsonify(finish(extraction))
+    
+    def generate():
+        extraction = PDFExtraction()
+        progress = {"done": 0, "total": len(cached["page_texts"]) if cached is not None else 0}
+        
+        def on_progress(page_number, done, total):
+            progress["done"] = done
+            progress["total"] = total
+        
+        pages = cached_pages() if cached is not None else engine.iter_pages(pdf_data, on_progress, extraction)
+        try:
+            # الصفحات تصل بالترتيب، و done يعكس كل الصفحات المنجزة في العمليات العاملة
+            for index, text, error in collect(pages, extraction):
+                if cached is not None:
+                    progress["done"] = index + 1
+                yield format_sse({
+                    "page": index + 1,
+                    "text": text,
+                    "error": error,
+                    "done": progress["done"],
+                    "total": progress["total"]
+                }, event="page")
+            
+            yield format_sse(finish(extraction), event="done")
+        except Exception as e:
+            yield format_sse({"error": f"خطأ في معالجة الملف: {str(e)}"}, event="error")
+    
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        }
+    )
+
 @app.route('/api/pdf/extract-advanced', methods=['POST'])
 def extract_pdf_advanced():
     """استخراج متقدم لمحتوى PDF مع جداول وصور"""
     try:
-        if not PDF_SERVICE_AVAILABLE:
+        extraction_method = request.form.get('method', 'auto')
+        # المحرك المتوازي عند طلبه صراحة أو عند غياب الخدمة المتقدمة
+        use_parallel = extraction_method == 'parallel' or not PDF_SERVICE_AVAILABLE
+        
+        if use_parallel and not PDF_READER_AVAILABLE:
             return jsonify({
                 "error": "خدمة معالجة PDF المتقدمة غير متاحة",
                 "fallback_available": True
@@ -3756,11 +4041,14 @@ def extract_pdf_advanced():
         # قراءة المعاملات
         extract_tables = request.form.get('extract_tables', 'true').lower() == 'true'
         extract_images = request.form.get('extract_images', 'false').lower() == 'true'
-        extraction_method = request.form.get('method', 'auto')
         
         # قراءة بيانات الملف
         pdf_data = file.read()
         
+        if use_parallel:
+            stream = request.form.get('stream', 'false').lower() == 'true'
+            return _extract_pdf_parallel(pdf_data, stream)
+        
         # الاستخراج المتقدم
         pdf_service = get_pdf_service()
         
@@ -3770,6 +4058,13 @@ def extract_pdf_advanced():
         except ValueError:
             method = ExtractionMethod.AUTO
         
+        # نفس الملف بنفس الخيارات: إعادة النتيجة المحفوظة دون تحليل
+        cache_kind = f"pdf_advanced_{method.value}_{int(extract_tables)}{int(extract_images)}"
+        digest = content_digest(pdf_data)
+        cached = extraction_cache.get(digest, cache_kind)
+        if cached is not None:
+            return jsonify(dict(cached["metadata"], text=cached["text"], cached=True))
+        
         result = pdf_service.extract_pdf_content(
             pdf_data, 
             method=method,
@@ -3824,6 +4119,13 @@ def extract_pdf_advanced():
                 for img in result.images[:10]  # أول 10 صور فقط
             ]
         
+        if result.success:
+            extraction_cache.put(digest, cache_kind, {
+                "text": result.text,
+                "page_texts": list(result.page_texts),
+                "metadata": {key: value for key, value in response_data.items() if key != "text"}
+            })
+        
         return jsonify(response_data)
         
     except Exception as e:
@@ -3950,12 +4252,9 @@ def analyze_text_comprehensive():
             return jsonify({"error": "النص قصير جداً للتحليل"}), 400
         
         # تشغيل التحليل الشامل
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        analysis_result = loop.run_until_complete(
+        analysis_result = run_async(
             text_processor.analyze_text_comprehensive(text)
         )
-        loop.close()
         
         return jsonify({
             "success": True,
@@ -3986,12 +4285,9 @@ def adjust_text_length():
             return jsonify({"error": "الطول المطلوب يجب أن يكون أكبر من صفر"}), 400
         
         # تعديل طول النص
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        adjustment_result = loop.run_until_complete(
+        adjustment_result = run_async(
             text_processor.adjust_text_length(text, target_length, operation)
         )
-        loop.close()
         
         return jsonify({
             "success": True,
@@ -4018,12 +4314,9 @@ def generate_text_suggestions():
             return jsonify({"error": "النص قصير جداً لتوليد الاقتراحات"}), 400
         
         # توليد الاقتراحات
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        suggestions = loop.run_until_complete(
+        suggestions = run_async(
             text_processor.generate_text_suggestions(text, suggestion_type)
         )
-        loop.close()
         
         return jsonify({
             "success": True,
@@ -4049,12 +4342,9 @@ def check_text_quality():
             return jsonify({"error": "النص قصير جداً للفحص"}), 400
         
         # تشغيل فحص الجودة
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        quality_analysis = loop.run_until_complete(
+        quality_analysis = run_async(
             text_processor._analyze_text_quality(text)
         )
-        loop.close()
         
         # فحص المشاكل الأساسية
         issues = text_processor._detect_text_issues(text)
@@ -4086,11 +4376,14 @@ def get_text_metrics():
             return jsonify({"error": "النص مفقود"}), 400
         
         # حساب المقاييس
-        metrics = text_processor._calculate_text_metrics(text)
+        metrics = analysis_cache.get_or_compute(
+            'metrics', text, None,
+            lambda: dict(text_processor._calculate_text_metrics(text).__dict__)
+        )
         
         return jsonify({
             "success": True,
-            "metrics": metrics.__dict__
+            "metrics": metrics
         })
         
     except Exception as e:
@@ -4098,6 +4391,49 @@ def get_text_metrics():
             "error": f"خطأ في حساب مقاييس النص: {str(e)}"
         }), 500
 
+# الحد الأقصى لعدد النصوص في طلب المقاييس الجماعي
+TEXT_BATCH_MAX_ITEMS = int(os.getenv('TEXT_BATCH_MAX_ITEMS', 500))
+
+@app.route('/api/text/batch-metrics', methods=['POST'])
+def get_batch_text_metrics():
+    """مقاييس عدة نصوص (مثل فصول المخطوطة) في طلب واحد"""
+    try:
+        data = request.json or {}
+        items = data.get('items')
+        if items is None:
+            texts = data.get('texts', [])
+            items = [{'id': index, 'text': text} for index, text in enumerate(texts)] if isinstance(texts, list) else texts
+        
+        if not items:
+            return jsonify({"error": "لم يتم تقديم نصوص"}), 400
+        
+        if not isinstance(items, list) or not all(
+                isinstance(item, dict) and isinstance(item.get('text'), str) for item in items):
+            return jsonify({"error": "يجب أن تكون items قائمة عناصر لكل منها نص text"}), 400
+        
+        if len(items) > TEXT_BATCH_MAX_ITEMS:
+            return jsonify({
+                "error": f"عدد النصوص يتجاوز الحد الأقصى ({TEXT_BATCH_MAX_ITEMS})"
+            }), 413
+        
+        texts = [item['text'] for item in items]
+        batch = compute_batch_metrics(texts)
+        
+        for item, result in zip(items, batch['results']):
+            result['id'] = item.get('id')
+        
+        return jsonify({
+            "success": True,
+            "metrics": batch['results'],
+            "summary": batch['summary'],
+            "vectorized": batch['vectorized']
+        })
+        
+    except Exception as e:
+        return jsonify({
+            "error": f"خطأ في حساب مقاييس النصوص: {str(e)}"
+        }), 500
+
 @app.route('/api/text/style-analysis', methods=['POST'])
 def analyze_writing_style():
     """تحليل أسلوب الكتابة والنبرة"""
@@ -4241,12 +4577,9 @@ def modify_text_length():
         )
         
         # تشغيل التعديل
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        modification_result = loop.run_until_complete(
+        modification_result = run_async(
             text_processor.modify_text_length(request_obj)
         )
-        loop.close()
         
         # تحويل النتيجة لصيغة JSON
         result_data = {
@@ -4450,12 +4783,9 @@ def process_witness_content():
         }.get(content_type, WitnessContentType.TEXT_DOCUMENT)
         
         # تشغيل المعالجة
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        witness_analysis = loop.run_until_complete(
+        witness_analysis = run_async(
             text_processor.process_witness_content(content, content_type_enum, source_url)
         )
-        loop.close()
         
         # تحويل النتيجة لصيغة JSON
         result_data = {
@@ -4499,14 +4829,11 @@ def upload_transcript():
         if file.filename == '':
             return jsonify({"error": "لم يتم اختيار ملف"}), 400
         
-        # قراءة محتوى الملف
+        # قراءة محتوى الملف (utf-8-sig يقبل الملفات مع BOM وبدونه)
         try:
-            content = file.read().decode('utf-8')
+            content = file.read().decode('utf-8-sig')
         except UnicodeDecodeError:
-            try:
-                content = file.read().decode('utf-8-sig')  # للملفات مع BOM
-            except:
-                return jsonify({"error": "تعذر قراءة الملف. تأكد أنه ملف نصي بترميز UTF-8"}), 400
+            return jsonify({"error": "تعذر قراءة الملف. تأكد أنه ملف نصي بترميز UTF-8"}), 400
         
         if not content or len(content.strip()) < 20:
             return jsonify({"error": "محتوى الملف قصير جداً أو فارغ"}), 400
@@ -4530,12 +4857,9 @@ def upload_transcript():
                 'TEXT_DOCUMENT': WitnessContentType.TEXT_DOCUMENT
             }.get(content_type, WitnessContentType.TEXT_DOCUMENT)
             
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            witness_analysis = loop.run_until_complete(
+            witness_analysis = run_async(
                 text_processor.process_witness_content(content, content_type_enum)
             )
-            loop.close()
             
             # إرجاع تحليل مختصر
             return jsonify({
@@ -4589,12 +4913,9 @@ def get_integration_suggestions():
             return jsonify({"error": "محتوى الشاهد مطلوب"}), 400
         
         # توليد اقتراحات الدمج
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
-        suggestions = loop.run_until_complete(
+        suggestions = run_async(
             text_processor._generate_integration_suggestions(witness_content)
         )
-        loop.close()
         
         # تحليل النص الحالي لتحديد أفضل نقاط الدمج
         integration_points = []
@@ -4656,17 +4977,16 @@ def analyze_text_advanced():
             return jsonify({'error': 'النص مطلوب'}), 400
         
         # حساب الإحصائيات الأساسية
-        words = text.split()
-        sentences = text.count('.') + text.count('!') + text.count('?')
-        paragraphs = len([p for p in text.split('\n') if p.strip()])
+        structure = analyze_structure(text)
+        sentences = structure.sentence_count
+        paragraphs = structure.paragraph_count
         
         # تحليل سهولة القراءة (مبسط)
-        avg_words_per_sentence = len(words) / max(sentences, 1)
+        avg_words_per_sentence = structure.avg_words_per_sentence
         readability_score = max(0, min(1, (100 - avg_words_per_sentence * 2) / 100))
         
         # تحليل الجودة (مبسط)
-        unique_words = len(set(words))
-        vocabulary_diversity = unique_words / max(len(words), 1)
+        vocabulary_diversity = structure.vocabulary_diversity
         quality_score = min(1, vocabulary_diversity * 1.5)
         
         # تحليل الأسلوب
@@ -4698,7 +5018,7 @@ def analyze_text_advanced():
         ]
         
         analysis = {
-            'wordCount': len(words),
+            'wordCount': structure.word_count,
             'sentenceCount': sentences,
             'paragraphCount': paragraphs,
             'readabilityScore': readability_score,
@@ -0,0 +1,88 @@
+"""
+جسر تشغيل الدوال غير المتزامنة من مسارات Flask
+حلقة أحداث واحدة طويلة العمر تعمل في خيط خلفي، تُرسَل إليها المهام وينتظر
+المسار نتيجتها، بدلاً من إنشاء حلقة جديدة وإغلاقها في كل طلب.
+بذلك تبقى جلسات HTTP غير المتزامنة والذاكرات المؤقتة داخل الخدمات حية بين الطلبات.
+"""
+
+import asyncio
+import atexit
+import concurrent.futures
+import threading
+from typing import Awaitable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class BackgroundEventLoop:
+    """حلقة أحداث مشتركة في خيط خلفي مع واجهة إرسال وانتظار"""
+
+    def __init__(self, name: str = "async-bridge"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """الحلقة المشتركة (تُشغَّل عند أول استخدام)"""
+        if self._loop is None or self._loop.is_closed():
+            self.start()
+        return self._loop
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+
+            ready = threading.Event()
+
+            def run_forever():
+                loop = asyncio.new_event_loop()
+                asyncio.set_event_loop(loop)
+                self._loop = loop
+                ready.set()
+                try:
+                    loop.run_forever()
+                finally:
+                    loop.run_until_complete(loop.shutdown_asyncgens())
+                    loop.close()
+
+            self._thread = threading.Thread(target=run_forever, name=self.name, daemon=True)
+            self._thread.start()
+            ready.wait()
+
+    def submit(self, coro: Awaitable[T]) -> "concurrent.futures.Future[T]":
+        """إرسال مهمة إلى الحلقة المشتركة دون انتظار نتيجتها"""
+        if self._thread is not None and threading.current_thread() is self._thread:
+            raise RuntimeError("لا يمكن انتظار مهمة من داخل خيط الحلقة المشتركة نفسه")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def run(self, coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+        """تشغيل مهمة في الحلقة المشتركة وانتظار نتيجتها من الخيط الحالي"""
+        future = self.submit(coro)
+        try:
+            return future.result(timeout)
+        except concurrent.futures.TimeoutError:
+            # إلغاء المهمة داخل الحلقة حتى لا تستمر بعد انتهاء مهلة الطلب
+            future.cancel()
+            raise
+
+    def stop(self, timeout: float = 5.0) -> None:
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            if loop is None or thread is None or not thread.is_alive():
+                return
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join(timeout)
+            self._thread = None
+
+
+# الحلقة المشتركة لجميع مسارات التطبيق
+background_loop = BackgroundEventLoop()
+atexit.register(background_loop.stop)
+
+
+def run_async(coro: Awaitable[T], timeout: Optional[float] = None) -> T:
+    """اختصار لتشغيل مهمة غير متزامنة من مسار متزامن"""
+    return background_loop.run(coro, timeout)
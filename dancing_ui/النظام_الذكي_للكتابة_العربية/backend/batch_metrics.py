@@ -0,0 +1,145 @@
+"""
+مقاييس النصوص دفعة واحدة
+تُقسَّم النصوص مرة واحدة ثم تُحسب المتوسطات والتنوع وسهولة القراءة والأسلوب
+لكل النصوص معاً كمصفوفات NumPy. صيغ النقاط هنا هي نفسها المستخدمة لنص واحد
+(calculate_readability_score و calculate_style_score) حتى لا تختلف النتائج.
+"""
+
+from typing import Any, Dict, List, Sequence
+
+from arabic_text import TextStructure, analyze_structure
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    NUMPY_AVAILABLE = False
+
+# حدود مستوى التعقيد بحسب متوسط الكلمات في الجملة
+COMPLEX_SENTENCE_WORDS = 20
+MEDIUM_SENTENCE_WORDS = 12
+
+
+def _is_array(value: Any) -> bool:
+    return NUMPY_AVAILABLE and isinstance(value, np.ndarray)
+
+
+def _clip01(value):
+    if _is_array(value):
+        return np.clip(value, 0.0, 1.0)
+    return max(0, min(1, value))
+
+
+def readability_score(avg_words_per_sentence, avg_word_length):
+    """سهولة القراءة: كلما قلت الكلمات في الجملة وقل طول الكلمات زادت السهولة"""
+    return _clip01(1 - (avg_words_per_sentence / 30) - (avg_word_length / 15))
+
+
+def style_score(vocabulary_diversity, avg_words_per_sentence):
+    """نقاط الأسلوب: متوسط تنوع المفردات وطول الجمل"""
+    sentence_factor = avg_words_per_sentence / 20
+    if _is_array(sentence_factor):
+        sentence_factor = np.minimum(sentence_factor, 1.0)
+    else:
+        sentence_factor = min(sentence_factor, 1)
+    return _clip01((vocabulary_diversity + sentence_factor) / 2)
+
+
+def complexity_level(avg_words_per_sentence) -> Any:
+    """مستوى التعقيد (قيمة واحدة أو مصفوفة)"""
+    if _is_array(avg_words_per_sentence):
+        return np.where(
+            avg_words_per_sentence > COMPLEX_SENTENCE_WORDS, 'متقدم',
+            np.where(avg_words_per_sentence > MEDIUM_SENTENCE_WORDS, 'متوسط', 'بسيط')
+        )
+    if avg_words_per_sentence > COMPLEX_SENTENCE_WORDS:
+        return 'متقدم'
+    elif avg_words_per_sentence > MEDIUM_SENTENCE_WORDS:
+        return 'متوسط'
+    return 'بسيط'
+
+
+def _counts(structures: Sequence[TextStructure]) -> Dict[str, List[int]]:
+    """الأعداد الخام لكل نص (الجزء الوحيد الذي يمر على الكلمات)"""
+    return {
+        "words": [s.word_count for s in structures],
+        "sentences": [s.sentence_count for s in structures],
+        "paragraphs": [s.paragraph_count for s in structures],
+        "word_length": [sum(len(token.normalized) for token in s.tokens) for s in structures],
+        "unique": [s.unique_word_count for s in structures],
+        "characters": [len(s.text) for s in structures]
+    }
+
+
+def _metrics_numpy(counts: Dict[str, List[int]]) -> Dict[str, List[Any]]:
+    words = np.asarray(counts["words"], dtype=np.float64)
+    sentences = np.asarray(counts["sentences"], dtype=np.float64)
+    has_words = words > 0
+    safe_words = np.where(has_words, words, 1.0)
+
+    avg_words_per_sentence = words / np.maximum(sentences, 1.0)
+    avg_word_length = np.where(has_words, np.asarray(counts["word_length"]) / safe_words, 0.0)
+    diversity = np.where(has_words, np.asarray(counts["unique"]) / safe_words, 0.0)
+
+    return {
+        "avgWordsPerSentence": avg_words_per_sentence.tolist(),
+        "avgWordLength": avg_word_length.tolist(),
+        "vocabularyDiversity": diversity.tolist(),
+        "readabilityScore": readability_score(avg_words_per_sentence, avg_word_length).tolist(),
+        "styleScore": style_score(diversity, avg_words_per_sentence).tolist(),
+        "complexityLevel": complexity_level(avg_words_per_sentence).tolist()
+    }
+
+
+def _metrics_python(counts: Dict[str, List[int]]) -> Dict[str, List[Any]]:
+    metrics: Dict[str, List[Any]] = {key: [] for key in (
+        "avgWordsPerSentence", "avgWordLength", "vocabularyDiversity",
+        "readabilityScore", "styleScore", "complexityLevel"
+    )}
+    for words, sentences, word_length, unique in zip(
+        counts["words"], counts["sentences"], counts["word_length"], counts["unique"]
+    ):
+        avg_words_per_sentence = words / max(sentences, 1)
+        avg_word_length = word_length / words if words else 0.0
+        diversity = unique / words if words else 0.0
+        metrics["avgWordsPerSentence"].append(avg_words_per_sentence)
+        metrics["avgWordLength"].append(avg_word_length)
+        metrics["vocabularyDiversity"].append(diversity)
+        metrics["readabilityScore"].append(readability_score(avg_words_per_sentence, avg_word_length))
+        metrics["styleScore"].append(style_score(diversity, avg_words_per_sentence))
+        metrics["complexityLevel"].append(complexity_level(avg_words_per_sentence))
+    return metrics
+
+
+def compute_batch_metrics(texts: Sequence[str]) -> Dict[str, Any]:
+    """مقاييس عدة نصوص مع مجاميع المخطوطة كاملة"""
+    counts = _counts([analyze_structure(text) for text in texts])
+    metrics = _metrics_numpy(counts) if NUMPY_AVAILABLE and texts else _metrics_python(counts)
+
+    results = []
+    for i in range(len(texts)):
+        results.append({
+            "wordCount": counts["words"][i],
+            "sentenceCount": counts["sentences"][i],
+            "paragraphCount": counts["paragraphs"][i],
+            "characterCount": counts["characters"][i],
+            **{key: values[i] for key, values in metrics.items()}
+        })
+
+    total_words = sum(counts["words"])
+    total_sentences = sum(counts["sentences"])
+    summary = {
+        "texts": len(texts),
+        "wordCount": total_words,
+        "sentenceCount": total_sentences,
+        "paragraphCount": sum(counts["paragraphs"]),
+        "characterCount": sum(counts["characters"]),
+        "avgWordsPerSentence": total_words / max(total_sentences, 1),
+        # متوسط مرجَّح بعدد الكلمات حتى لا تطغى الفصول القصيرة
+        "readabilityScore": (
+            sum(score * words for score, words in zip(metrics["readabilityScore"], counts["words"])) / total_words
+            if total_words else 0.0
+        )
+    }
+
+    return {"results": results, "summary": summary, "vectorized": NUMPY_AVAILABLE}
@@ -0,0 +1,221 @@
+"""
+مهام التصدير في الخلفية ومخزن ملفاتها
+- التصدير يُنفَّذ على عدد ثابت من العمال بدلاً من داخل طلب HTTP
+- الملفات الناتجة تُحفظ في مجلد بمفتاح من بصمة المحتوى (الفصول والصيغة والبيانات الوصفية)
+  وتُحذف بعد مدة صلاحية
+- الطلبات المتطابقة تعيد الملف الموجود، أو تنضم إلى المهمة الجارية لنفس المحتوى
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from execution_registry import (
+    ExecutorBusyError, STATUS_QUEUED, STATUS_RUNNING, STATUS_COMPLETED, STATUS_FAILED
+)
+from novel_export import EXPORT_FORMATS, NovelExport, write_export
+
+
+def export_artifact_key(export: NovelExport, export_format: str) -> str:
+    """بصمة طلب التصدير؛ الفصول تُضاف واحداً واحداً دون بناء نص واحد كبير"""
+    def canonical(value: Any) -> bytes:
+        return json.dumps(value, sort_keys=True, ensure_ascii=False, default=str).encode('utf-8')
+
+    digest = hashlib.sha256()
+    digest.update(canonical({
+        "format": export_format,
+        "metadata": export.metadata,
+        "quality_report": export.quality_report if export.has_report else None
+    }))
+    for chapter in export.chapters:
+        digest.update(b'\0')
+        digest.update(canonical(chapter))
+    return digest.hexdigest()
+
+
+class ArtifactStore:
+    """ملفات التصدير على القرص بمفتاح المحتوى مع مدة صلاحية"""
+
+    def __init__(self, directory: str, ttl_seconds: float = 24 * 3600):
+        self.directory = directory
+        self.ttl_seconds = ttl_seconds
+        self._last_purge = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key: str, export_format: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.{EXPORT_FORMATS[export_format][1]}")
+
+    def get(self, key: str, export_format: str) -> Optional[str]:
+        """مسار الملف إن كان موجوداً ولم تنتهِ صلاحيته"""
+        path = self.path(key, export_format)
+        try:
+            if time.time() - os.path.getmtime(path) > self.ttl_seconds:
+                os.remove(path)
+                return None
+        except OSError:
+            return None
+        return path
+
+    def render(self, key: str, export: NovelExport, export_format: str) -> str:
+        """كتابة ملف التصدير في ملف مؤقت ثم نقله ذرياً إلى مكانه"""
+        path = self.path(key, export_format)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(temp_path, 'wb') as f:
+                write_export(export, export_format, f)
+            os.replace(temp_path, path)
+        except BaseException:
+            try:
+                os.remove(temp_path)
+            except OSError:
+                pass
+            raise
+        self.purge_expired()
+        return path
+
+    def purge_expired(self, min_interval: float = 300) -> int:
+        """حذف الملفات المنتهية (مرة كل بضع دقائق على الأكثر)"""
+        now = time.time()
+        if now - self._last_purge < min_interval:
+            return 0
+        self._last_purge = now
+
+        removed = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    if now - os.path.getmtime(path) > self.ttl_seconds:
+                        os.remove(path)
+                        removed += 1
+                except OSError:
+                    continue
+        return removed
+
+
+class ExportJobManager:
+    """مهام التصدير: إرسال، متابعة، تحميل"""
+
+    def __init__(self, store: ArtifactStore, max_workers: int = 2, max_queued: int = 16):
+        self.store = store
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="export")
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._active_by_key: Dict[str, str] = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def submit(self, export: NovelExport, export_format: str) -> Dict[str, Any]:
+        """إنشاء مهمة تصدير أو إعادة مهمة/ملف موجود لنفس المحتوى"""
+        key = export_artifact_key(export, export_format)
+        with self._lock:
+            self._prune_jobs()
+            active_id = self._active_by_key.get(key)
+            if active_id is not None:
+                return dict(self._jobs[active_id])
+
+            job = {
+                "job_id": str(uuid.uuid4()),
+                "key": key,
+                "format": export_format,
+                "status": STATUS_QUEUED,
+                "cached": False,
+                "error": None,
+                "size": None,
+                "created_at": time.time(),
+                "finished_at": None
+            }
+
+            path = self.store.get(key, export_format)
+            if path is not None:
+                job.update(status=STATUS_COMPLETED, cached=True, size=os.path.getsize(path),
+                           finished_at=job["created_at"])
+                self._jobs[job["job_id"]] = job
+                return dict(job)
+
+            if self._pending >= self.max_workers + self.max_queued:
+                raise ExecutorBusyError("عدد مهام التصدير الجارية بلغ الحد الأقصى")
+            self._pending += 1
+            self._jobs[job["job_id"]] = job
+            self._active_by_key[key] = job["job_id"]
+
+        try:
+            self._pool.submit(self._run, job["job_id"], export)
+        except Exception:
+            # المجمّع مغلق أو تعذر إنشاء خيط: لا تبقى مهمة عالقة في الانتظار
+            with self._lock:
+                self._pending -= 1
+                self._jobs.pop(job["job_id"], None)
+                if self._active_by_key.get(key) == job["job_id"]:
+                    del self._active_by_key[key]
+            raise
+        return dict(job)
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def artifact_path(self, job_id: str) -> Optional[str]:
+        """مسار ملف المهمة المكتملة (None إن لم تكتمل أو انتهت صلاحية الملف)"""
+        job = self.get(job_id)
+        if job is None or job["status"] != STATUS_COMPLETED:
+            return None
+        return self.store.get(job["key"], job["format"])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_queued": self.max_queued,
+                "pending": self._pending,
+                "jobs": len(self._jobs)
+            }
+
+    def _update(self, job_id: str, **changes) -> None:
+        with self._lock:
+            self._jobs[job_id].update(changes)
+
+    def _run(self, job_id: str, export: NovelExport) -> None:
+        job = self.get(job_id)
+        try:
+            self._update(job_id, status=STATUS_RUNNING)
+            path = self.store.render(job["key"], export, job["format"])
+            self._update(job_id, status=STATUS_COMPLETED, size=os.path.getsize(path), finished_at=time.time())
+        except Exception as e:
+            print(f"خطأ في مهمة التصدير: {str(e)}")
+            self._update(job_id, status=STATUS_FAILED, error=str(e), finished_at=time.time())
+        finally:
+            with self._lock:
+                self._pending -= 1
+                self._active_by_key.pop(job["key"], None)
+
+    def _prune_jobs(self) -> None:
+        # المهام المنتهية تُنسى مع انتهاء صلاحية ملفاتها
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job["finished_at"] is not None and now - job["finished_at"] > self.store.ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+def create_export_job_manager_from_env() -> ExportJobManager:
+    """إنشاء مدير مهام التصدير من متغيرات البيئة"""
+    store = ArtifactStore(
+        directory=os.getenv('EXPORT_ARTIFACT_DIR', os.path.join('data', 'export_artifacts')),
+        ttl_seconds=float(os.getenv('EXPORT_ARTIFACT_TTL_SECONDS', 24 * 3600))
+    )
+    return ExportJobManager(
+        store,
+        max_workers=int(os.getenv('EXPORT_MAX_WORKERS', 2)),
+        max_queued=int(os.getenv('EXPORT_MAX_QUEUED', 16))
+    )
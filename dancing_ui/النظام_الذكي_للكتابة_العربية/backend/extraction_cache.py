@@ -0,0 +1,164 @@
+"""
+ذاكرة دائمة على القرص للنصوص المستخرجة من الملفات المرفوعة
+المفتاح بصمة SHA-256 لبايتات الملف نفسه، فإعادة رفع نفس PDF أو DOCX
+تعيد النص وصفحاته وبياناته الوصفية دون أي تحليل للملف.
+كل سجل JSON مضغوط بـ zlib، والحجم الكلي محدود مع حذف الأقدم استخداماً.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+RECORD_SUFFIX = '.json.z'
+
+
+def content_digest(data: bytes) -> str:
+    """بصمة محتوى الملف"""
+    return hashlib.sha256(data).hexdigest()
+
+
+class ExtractionCache:
+    """سجلات الاستخراج على القرص: (بصمة الملف، نوع الاستخراج) -> قاموس JSON
+
+    نوع الاستخراج يميّز النتائج المختلفة لنفس الملف (نص فقط، معلومات PDF،
+    صفحات المحرك المتوازي...). السجل قاموس حر عادة بالحقول text و page_texts و metadata.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 256 * 1024 * 1024, compression_level: int = 6):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.compression_level = compression_level
+        self._entries: "OrderedDict[str, int]" = OrderedDict()  # مسار السجل -> حجمه
+        self._size_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        """بناء ترتيب الاستخدام من أوقات التعديل (تُحدَّث عند كل قراءة)"""
+        records = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(RECORD_SUFFIX):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    records.append((stat.st_mtime, path, stat.st_size))
+        for _, path, size in sorted(records):
+            self._entries[path] = size
+            self._size_bytes += size
+        with self._lock:
+            self._evict()
+
+    def _path(self, digest: str, kind: str) -> str:
+        safe_kind = ''.join(char if char.isalnum() or char in '-_' else '_' for char in kind)
+        return os.path.join(self.directory, digest[:2], f"{digest}-{safe_kind}{RECORD_SUFFIX}")
+
+    def get(self, digest: str, kind: str) -> Optional[Dict[str, Any]]:
+        path = self._path(digest, kind)
+        try:
+            with open(path, 'rb') as f:
+                record = json.loads(zlib.decompress(f.read()).decode('utf-8'))
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self.misses += 1
+                self._forget(path)
+            return None
+        except (OSError, zlib.error, ValueError):
+            # سجل تالف: يُحذف ويُعاد الاستخراج
+            with self._lock:
+                self.misses += 1
+                self._remove(path)
+            return None
+
+        with self._lock:
+            self.hits += 1
+            if path in self._entries:
+                self._entries.move_to_end(path)
+        return record
+
+    def put(self, digest: str, kind: str, record: Dict[str, Any]) -> None:
+        payload = zlib.compress(
+            json.dumps(record, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8'),
+            self.compression_level
+        )
+        if len(payload) > self.max_bytes:
+            return
+
+        path = self._path(digest, kind)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(payload)
+        # استبدال ذري حتى لا يقرأ طلب آخر سجلاً ناقصاً
+        os.replace(temp_path, path)
+
+        with self._lock:
+            self._forget(path)
+            self._entries[path] = len(payload)
+            self._size_bytes += len(payload)
+            self._evict()
+
+    def get_or_extract(self, data: bytes, kind: str,
+                       extract: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """إرجاع السجل المحفوظ أو استخراجه وحفظه (الاستثناءات لا تُحفظ)"""
+        digest = content_digest(data)
+        record = self.get(digest, kind)
+        if record is None:
+            record = extract()
+            self.put(digest, kind, record)
+        return record
+
+    def _forget(self, path: str) -> None:
+        size = self._entries.pop(path, None)
+        if size is not None:
+            self._size_bytes -= size
+
+    def _remove(self, path: str) -> None:
+        self._forget(path)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def _evict(self) -> None:
+        while self._entries and self._size_bytes > self.max_bytes:
+            path = next(iter(self._entries))
+            self._remove(path)
+            self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in list(self._entries):
+                self._remove(path)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "directory": self.directory,
+                "entries": len(self._entries),
+                "size_bytes": self._size_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0
+            }
+
+
+# ذاكرة مشتركة لمسارات رفع الملفات
+extraction_cache = ExtractionCache(
+    directory=os.getenv('EXTRACTION_CACHE_DIR', os.path.join('data', 'extraction_cache')),
+    max_bytes=int(os.getenv('EXTRACTION_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+)
@@ -0,0 +1,215 @@
+"""
+تحليل تزايدي للنص على مستوى الفقرات
+يحتفظ الخادم بمقاييس كل فقرة لكل مستند، وعند كل تعديل تُحلَّل الفقرات
+المتغيرة فقط وتُطرح مقاييسها القديمة من المجاميع وتُضاف الجديدة،
+فتتناسب تكلفة التعديل مع حجم التغيير لا مع حجم الفصل.
+"""
+
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+from arabic_text import analyze_structure
+
+# حد الكلمات للجملة الطويلة وحد التكرار (مطابق لـ detect_text_issues)
+LONG_SENTENCE_WORDS = 25
+REPETITION_THRESHOLD = 3
+MIN_REPEATED_WORD_LENGTH = 4
+
+
+class DocumentOutOfSyncError(KeyError):
+    """المستند غير موجود في الذاكرة أو نسخته مختلفة ويجب إرسال نصه كاملاً"""
+
+
+@dataclass
+class ParagraphMetrics:
+    """مقاييس فقرة واحدة"""
+    word_count: int = 0
+    total_word_length: int = 0
+    sentence_lengths: List[int] = field(default_factory=list)
+    word_counts: Counter = field(default_factory=Counter)
+
+    @classmethod
+    def from_text(cls, text: str) -> "ParagraphMetrics":
+        structure = analyze_structure(text)
+        return cls(
+            word_count=structure.word_count,
+            total_word_length=sum(len(token.normalized) for token in structure.tokens),
+            sentence_lengths=[sentence.word_count for sentence in structure.sentences],
+            word_counts=Counter(token.normalized for token in structure.tokens)
+        )
+
+    @property
+    def long_sentences(self) -> int:
+        return sum(1 for length in self.sentence_lengths if length > LONG_SENTENCE_WORDS)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "wordCount": self.word_count,
+            "sentenceCount": len(self.sentence_lengths),
+            "sentenceLengths": self.sentence_lengths,
+            "longSentences": self.long_sentences
+        }
+
+
+class DocumentTotals:
+    """مجاميع المستند المحدَّثة تزايدياً
+
+    توفر نفس خصائص TextStructure المستخدمة في دوال حساب النقاط
+    (avg_words_per_sentence و avg_word_length و vocabulary_diversity ...)
+    """
+
+    def __init__(self):
+        self.word_count = 0
+        self.total_word_length = 0
+        self.sentence_count = 0
+        self.long_sentences = 0
+        self.paragraph_count = 0
+        self.word_counts: Counter = Counter()
+        self.repeated_words = set()
+
+    def add(self, metrics: ParagraphMetrics, sign: int) -> None:
+        self.word_count += sign * metrics.word_count
+        self.total_word_length += sign * metrics.total_word_length
+        self.sentence_count += sign * len(metrics.sentence_lengths)
+        self.long_sentences += sign * metrics.long_sentences
+        if metrics.word_count:
+            self.paragraph_count += sign
+
+        for word, count in metrics.word_counts.items():
+            total = self.word_counts[word] + sign * count
+            if total > 0:
+                self.word_counts[word] = total
+            else:
+                del self.word_counts[word]
+            if total > REPETITION_THRESHOLD and len(word) >= MIN_REPEATED_WORD_LENGTH:
+                self.repeated_words.add(word)
+            else:
+                self.repeated_words.discard(word)
+
+    @property
+    def avg_words_per_sentence(self) -> float:
+        return self.word_count / max(self.sentence_count, 1)
+
+    @property
+    def avg_word_length(self) -> float:
+        return self.total_word_length / self.word_count if self.word_count else 0.0
+
+    @property
+    def vocabulary_diversity(self) -> float:
+        return len(self.word_counts) / self.word_count if self.word_count else 0.0
+
+    def top_repeated_words(self, limit: int = 20) -> List[Dict[str, Any]]:
+        words = sorted(self.repeated_words, key=lambda w: self.word_counts[w], reverse=True)[:limit]
+        return [{"word": word, "count": self.word_counts[word]} for word in words]
+
+
+class IncrementalDocument:
+    """مستند مقسم إلى فقرات (سطر لكل فقرة) مع مقاييس كل فقرة"""
+
+    def __init__(self, paragraphs: List[str]):
+        self.paragraphs: List[ParagraphMetrics] = []
+        self.totals = DocumentTotals()
+        self.version = 0
+        self.updated_at = time.time()
+        self.lock = threading.Lock()
+        self.replace(0, 0, paragraphs)
+
+    def replace(self, start: int, end: int, new_paragraphs: List[str]) -> List[int]:
+        """استبدال الفقرات [start, end) بالفقرات الجديدة وإرجاع مواضعها"""
+        if not 0 <= start <= end <= len(self.paragraphs):
+            raise ValueError(f"نطاق فقرات غير صالح: {start}-{end} من {len(self.paragraphs)}")
+
+        for metrics in self.paragraphs[start:end]:
+            self.totals.add(metrics, -1)
+
+        new_metrics = [ParagraphMetrics.from_text(text) for text in new_paragraphs]
+        for metrics in new_metrics:
+            self.totals.add(metrics, 1)
+
+        self.paragraphs[start:end] = new_metrics
+        self.version += 1
+        self.updated_at = time.time()
+        return list(range(start, start + len(new_metrics)))
+
+
+class IncrementalAnalysisStore:
+    """مستندات المحرر النشطة مع حذف الأقدم استخداماً"""
+
+    def __init__(self, max_documents: int = 200):
+        self.max_documents = max_documents
+        self._documents: "OrderedDict[str, IncrementalDocument]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, document_id: str, text: str) -> IncrementalDocument:
+        """تحميل المستند كاملاً (أول مرة أو عند فقدان التزامن)"""
+        document = IncrementalDocument(text.split('\n'))
+        with self._lock:
+            self._documents[document_id] = document
+            self._documents.move_to_end(document_id)
+            while len(self._documents) > self.max_documents:
+                self._documents.popitem(last=False)
+        return document
+
+    def apply_changes(self, document_id: str, changes: List[Dict[str, Any]],
+                      expected_version: Optional[int] = None) -> Dict[str, Any]:
+        """تطبيق تغييرات الفقرات وإرجاع الفقرات المتغيرة
+
+        كل تغيير بالشكل {"start": 3, "end": 5, "paragraphs": ["...", "..."]}
+        ويستبدل الفقرات من start حتى end (غير شامل). تُطبَّق التغييرات بالترتيب.
+        """
+        with self._lock:
+            document = self._documents.get(document_id)
+            if document is None:
+                raise DocumentOutOfSyncError(document_id)
+            self._documents.move_to_end(document_id)
+
+        with document.lock:
+            if expected_version is not None and expected_version != document.version:
+                raise DocumentOutOfSyncError(document_id)
+
+            changed: Dict[int, ParagraphMetrics] = {}
+            try:
+                for change in changes:
+                    start = int(change['start'])
+                    end = int(change.get('end', start + 1))
+                    new_paragraphs = change.get('paragraphs')
+                    if new_paragraphs is None:
+                        new_paragraphs = change.get('text', '').split('\n')
+
+                    # التغييرات السابقة بعد هذا النطاق تنزاح مواضعها
+                    shift = len(new_paragraphs) - (end - start)
+                    changed = {
+                        (index + shift if index >= end else index): metrics
+                        for index, metrics in changed.items()
+                        if not start <= index < end
+                    }
+                    for index in document.replace(start, end, new_paragraphs):
+                        changed[index] = document.paragraphs[index]
+            except (KeyError, TypeError, ValueError):
+                # تغيير غير صالح في منتصف الدفعة: يُحذف المستند ليُعاد تحميله كاملاً
+                with self._lock:
+                    self._documents.pop(document_id, None)
+                raise
+
+            return {"document": document, "changed": changed}
+
+    def get(self, document_id: str) -> Optional[IncrementalDocument]:
+        with self._lock:
+            return self._documents.get(document_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "documents": len(self._documents),
+                "max_documents": self.max_documents
+            }
+
+
+# المستندات النشطة في المحرر
+incremental_store = IncrementalAnalysisStore(
+    max_documents=int(os.getenv('INCREMENTAL_ANALYSIS_MAX_DOCUMENTS', 200))
+)
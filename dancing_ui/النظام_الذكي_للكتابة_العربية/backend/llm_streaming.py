@@ -0,0 +1,178 @@
+"""
+بث ردود النموذج رمزاً برمز
+- واجهة Chat Completions المتوافقة مع OpenAI مع stream=true (OpenAI نفسها، أو
+  OpenRouter وبوابات Gemini/Claude المتوافقة عبر LLM_STREAM_BASE_URL)
+- كل حدث data: من المزود يحمل جزءاً من النص (delta) يُعاد فور وصوله
+- تحويل الأجزاء إلى أحداث SSE للواجهة ثم إرسال النتيجة النهائية للفصل
+- أسماء نماذج المهام (get_best_model_for_task) تُحوَّل إلى أسماء المزود عبر
+  LLM_STREAM_MODEL_MAP، والنموذج غير المذكور فيها يُولَّد دون بث
+"""
+
+import json
+import os
+from typing import Any, Dict, Generator, Iterable, Iterator, Optional, Union
+
+try:
+    import requests
+    REQUESTS_AVAILABLE = True
+except ImportError:
+    REQUESTS_AVAILABLE = False
+
+DEFAULT_BASE_URL = "https://api.openai.com/v1"
+DEFAULT_STREAM_MODEL = "gpt-4o-mini"
+
+
+class LLMStreamError(RuntimeError):
+    """فشل طلب البث أو خطأ أرسله المزود أثناءه"""
+
+
+def _api_key() -> Optional[str]:
+    return os.getenv('LLM_STREAM_API_KEY') or os.getenv('OPENAI_API_KEY')
+
+
+def streaming_configured() -> bool:
+    """هل يمكن البث (المكتبة ومفتاح الواجهة متوفران)"""
+    return REQUESTS_AVAILABLE and bool(_api_key())
+
+
+def stream_model_map() -> Dict[str, str]:
+    """خريطة LLM_STREAM_MODEL_MAP بصيغة "نموذج_المهمة=نموذج_المزود,..." """
+    mapping = {}
+    for entry in os.getenv('LLM_STREAM_MODEL_MAP', '').split(','):
+        task_model, separator, stream_model = entry.partition('=')
+        if separator and task_model.strip() and stream_model.strip():
+            mapping[task_model.strip()] = stream_model.strip()
+    return mapping
+
+
+def stream_model_for(model: Optional[str]) -> Optional[str]:
+    """اسم النموذج لدى مزود البث، أو None إن لم يكن لنموذج المهمة مقابل عنده"""
+    if model is None:
+        return os.getenv('LLM_STREAM_MODEL', DEFAULT_STREAM_MODEL)
+    mapping = stream_model_map()
+    if model in mapping:
+        return mapping[model]
+    if model in mapping.values() or model == os.getenv('LLM_STREAM_MODEL'):
+        return model
+    return None
+
+
+def iter_sse_data(lines: Iterable[Union[str, bytes]]) -> Iterator[str]:
+    """حمولات data: من أسطر بث SSE؛ الحدث ينتهي بسطر فارغ"""
+    buffer = []
+    for line in lines:
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.rstrip('\r')
+        if not line:
+            if buffer:
+                yield "\n".join(buffer)
+                buffer = []
+            continue
+        if line.startswith('data:'):
+            value = line[5:]
+            buffer.append(value[1:] if value.startswith(' ') else value)
+    if buffer:
+        yield "\n".join(buffer)
+
+
+def stream_llm(messages, model: Optional[str] = None, max_tokens: Optional[int] = None,
+               temperature: Optional[float] = None, session: Any = None,
+               timeout: float = 300.0) -> Generator[str, None, None]:
+    """إرجاع أجزاء النص فور وصولها من المزود"""
+    api_key = _api_key()
+    if not api_key:
+        raise LLMStreamError("مفتاح واجهة البث غير مضبوط (LLM_STREAM_API_KEY أو OPENAI_API_KEY)")
+    if session is None:
+        if not REQUESTS_AVAILABLE:
+            raise LLMStreamError("مكتبة requests غير مثبتة")
+        session = requests
+
+    payload: Dict[str, Any] = {
+        "model": model or os.getenv('LLM_STREAM_MODEL', DEFAULT_STREAM_MODEL),
+        "messages": messages,
+        "stream": True
+    }
+    if max_tokens is not None:
+        payload["max_tokens"] = max_tokens
+    if temperature is not None:
+        payload["temperature"] = temperature
+
+    base_url = os.getenv('LLM_STREAM_BASE_URL', DEFAULT_BASE_URL).rstrip('/')
+    response = session.post(
+        f"{base_url}/chat/completions",
+        headers={"Authorization": f"Bearer {api_key}", "Accept": "text/event-stream"},
+        json=payload,
+        stream=True,
+        timeout=(10, timeout)
+    )
+    try:
+        if response.status_code >= 400:
+            raise LLMStreamError(f"فشل طلب البث ({response.status_code}): {response.text[:200]}")
+        for data in iter_sse_data(response.iter_lines()):
+            if data == "[DONE]":
+                break
+            event = json.loads(data)
+            if event.get("error"):
+                raise LLMStreamError(str(event["error"]))
+            for choice in event.get("choices", []):
+                delta = (choice.get("delta") or {}).get("content")
+                if delta:
+                    yield delta
+    finally:
+        response.close()
+
+
+def format_sse(data: Any, event: Optional[str] = None) -> str:
+    """تنسيق رسالة واحدة بصيغة Server-Sent Events"""
+    message = f"data: {json.dumps(data, ensure_ascii=False)}\n\n"
+    if event:
+        message = f"event: {event}\n" + message
+    return message
+
+
+def parse_streamed_json(raw_text: str) -> Dict[str, Any]:
+    """تحويل النص المتراكم من البث إلى JSON بنفس شكل نتيجة call_llm"""
+    text = raw_text.strip()
+    if text.startswith("```"):
+        text = text.strip("`")
+        if text.startswith("json"):
+            text = text[4:]
+
+    try:
+        parsed = json.loads(text)
+    except json.JSONDecodeError:
+        start, end = text.find("{"), text.rfind("}")
+        try:
+            parsed = json.loads(text[start:end + 1]) if start != -1 and end > start else None
+        except json.JSONDecodeError:
+            parsed = None
+
+    if isinstance(parsed, dict):
+        return parsed
+    return {"content": raw_text.strip()}
+
+
+def chapter_stream_events(tokens: Iterable[str]) -> Generator[str, None, None]:
+    """أحداث token لكل جزء ثم done بالفصل المكتمل (أو error)"""
+    chunks = []
+    try:
+        for token in tokens:
+            if not token:
+                continue
+            chunks.append(token)
+            yield format_sse({"token": token}, event="token")
+
+        chapter_result = parse_streamed_json("".join(chunks))
+
+        if "content" not in chapter_result:
+            yield format_sse({
+                "error": "لم يتم توليد محتوى الفصل",
+                "details": chapter_result
+            }, event="error")
+            return
+
+        yield format_sse({"success": True, "chapter": chapter_result}, event="done")
+
+    except Exception as e:
+        yield format_sse({"error": f"خطأ في توليد الفصل: {str(e)}"}, event="error")
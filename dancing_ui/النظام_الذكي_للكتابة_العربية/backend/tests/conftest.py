@@ -0,0 +1,5 @@
+import os
+import sys
+
+# وحدات الخادم تُستورد بأسمائها المباشرة كما في app.py
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
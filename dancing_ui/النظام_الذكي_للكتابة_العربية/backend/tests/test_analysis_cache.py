@@ -0,0 +1,52 @@
+from analysis_cache import AnalysisCache
+
+def test_results_are_cached_per_text_and_params_as_copies():
+    cache = AnalysisCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return {"issues": [{"start": 0, "end": 4}]}
+
+    first = cache.get_or_compute("analysis", "نص", {"type": "full"}, compute)
+    first["issues"].clear()
+    second = cache.get_or_compute("analysis", "نص", {"type": "full"}, compute)
+    cache.get_or_compute("analysis", "نص", {"type": "quick"}, compute)
+    cache.get_or_compute("analysis", "نص آخر", {"type": "full"}, compute)
+
+    assert second == {"issues": [{"start": 0, "end": 4}]}
+    assert len(calls) == 3
+    assert cache.stats()["by_kind"]["analysis"] == {"hits": 1, "misses": 3}
+
+def test_results_rejected_by_cacheable_are_recomputed():
+    """A fallback result from a failed analysis is recomputed on the next request"""
+    cache = AnalysisCache()
+    results = iter([{"error": "boom", "overallScore": 0.5}, {"overallScore": 0.9}])
+    cacheable = lambda result: "error" not in result
+
+    assert cache.get_or_compute("analysis", "نص", None, lambda: next(results), cacheable)["error"] == "boom"
+    assert cache.get_or_compute("analysis", "نص", None, lambda: next(results), cacheable) == {"overallScore": 0.9}
+    assert cache.get_or_compute("analysis", "نص", None, lambda: next(results), cacheable) == {"overallScore": 0.9}
+    assert cache.stats()["entries"] == 1
+
+def test_results_are_cached_whatever_their_keys_by_default():
+    """Only the caller decides what a failure looks like"""
+    cache = AnalysisCache()
+    calls = []
+
+    for _ in range(2):
+        cache.get_or_compute("issues", "نص", None, lambda: calls.append(1) or {"error": "a span label"})
+
+    assert len(calls) == 1
+
+def test_entry_and_size_limits_evict_oldest():
+    cache = AnalysisCache(max_entries=2)
+    for text in ("أ", "ب", "ج"):
+        cache.get_or_compute("metrics", text, None, lambda: {"text": text})
+
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 1
+
+    small = AnalysisCache(max_bytes=20)
+    small.get_or_compute("metrics", "نص", None, lambda: {"text": "x" * 100})
+    assert small.stats()["entries"] == 0
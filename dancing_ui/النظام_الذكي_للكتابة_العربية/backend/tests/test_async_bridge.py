@@ -0,0 +1,48 @@
+import asyncio
+import concurrent.futures
+import threading
+
+import pytest
+
+from async_bridge import BackgroundEventLoop
+
+@pytest.fixture
+def bridge():
+    loop = BackgroundEventLoop(name="test-bridge")
+    yield loop
+    loop.stop()
+
+def test_calls_share_one_long_lived_loop(bridge):
+    async def current_loop():
+        await asyncio.sleep(0)
+        return asyncio.get_running_loop(), threading.current_thread().name
+
+    first = bridge.run(current_loop())
+    second = bridge.run(current_loop())
+
+    assert first == second
+    assert first[1] == "test-bridge"
+    assert not first[0].is_closed()
+
+def test_concurrent_threads_can_wait_on_the_loop(bridge):
+    async def double(value):
+        await asyncio.sleep(0.01)
+        return value * 2
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda value: bridge.run(double(value)), range(16)))
+    assert results == [value * 2 for value in range(16)]
+
+def test_timeout_cancels_the_task_inside_the_loop(bridge):
+    cancelled = threading.Event()
+
+    async def never_finishes():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    with pytest.raises(concurrent.futures.TimeoutError):
+        bridge.run(never_finishes(), timeout=0.05)
+    assert cancelled.wait(1)
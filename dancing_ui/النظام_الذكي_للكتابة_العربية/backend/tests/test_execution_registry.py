@@ -0,0 +1,117 @@
+import time
+
+from execution_registry import STATUS_COMPLETED, STATUS_RUNNING, ExecutionRegistry
+
+def test_finished_executions_expire_without_being_polled():
+    """Creating a new execution evicts expired finished ones that nobody asked for"""
+    registry = ExecutionRegistry(ttl_seconds=0.01)
+    registry.create("old")
+    registry.finish("old", STATUS_COMPLETED, result={"ok": True})
+    registry.create("running")
+    registry.mark_running("running")
+
+    time.sleep(0.05)
+    registry.create("new")
+
+    assert registry.stats()["entries"] == 2
+    assert registry.get("old") is None
+    assert registry.get("running")["status"] == STATUS_RUNNING
+
+import asyncio
+import datetime
+import threading
+
+import pytest
+
+from execution_registry import (
+    STATUS_CANCELLED, ExecutorBusyError, SQLiteSpillStore, WorkflowExecutor
+)
+
+def wait_until(condition, timeout=5):
+    deadline = time.time() + timeout
+    while not condition():
+        if time.time() > deadline:
+            raise AssertionError("condition not reached")
+        time.sleep(0.005)
+
+def blocking_workflow(release, started=None, cancelled=None):
+    async def run():
+        if started is not None:
+            started.set()
+        try:
+            while not release.is_set():
+                await asyncio.sleep(0.005)
+        except asyncio.CancelledError:
+            if cancelled is not None:
+                cancelled.set()
+            raise
+        return {"done": True}
+    return run
+
+def test_cancel_stops_the_running_coroutine():
+    executor = WorkflowExecutor(ExecutionRegistry(), max_workers=1)
+    started, cancelled, release = threading.Event(), threading.Event(), threading.Event()
+    executor.submit("run", blocking_workflow(release, started, cancelled))
+    started.wait(5)
+
+    assert executor.cancel("run")
+    assert cancelled.wait(5)
+    wait_until(lambda: executor.stats()["running"] == 0)
+    assert executor.registry.get("run")["status"] == STATUS_CANCELLED
+    assert executor.stats()["pending"] == 0
+
+def test_cancelling_a_finished_run_is_refused():
+    """The cancel route answers 409 when cancel returns False"""
+    executor = WorkflowExecutor(ExecutionRegistry(), max_workers=1)
+    release = threading.Event()
+    release.set()
+    executor.submit("run", blocking_workflow(release))
+    wait_until(lambda: executor.registry.get("run")["status"] == STATUS_COMPLETED)
+
+    assert not executor.cancel("run")
+    assert executor.registry.get("run")["result"] == {"done": True}
+
+def test_full_queue_raises_busy_until_a_slot_frees():
+    executor = WorkflowExecutor(ExecutionRegistry(), max_workers=1, max_queued=1)
+    release = threading.Event()
+    executor.submit("first", blocking_workflow(release))
+    executor.submit("second", blocking_workflow(release))
+
+    with pytest.raises(ExecutorBusyError):
+        executor.submit("third", blocking_workflow(release))
+    assert executor.registry.get("third") is None
+
+    release.set()
+    wait_until(lambda: executor.stats()["pending"] == 0)
+    executor.submit("third", blocking_workflow(release))
+    wait_until(lambda: executor.registry.get("third")["status"] == STATUS_COMPLETED)
+
+def test_finished_runs_over_max_bytes_spill_to_sqlite(tmp_path):
+    store = SQLiteSpillStore(str(tmp_path / "spill.db"), ttl_seconds=60)
+    registry = ExecutionRegistry(max_bytes=600, spill_store=store)
+    registry.create("running")
+    registry.mark_running("running")
+    for index in range(3):
+        registry.create(f"done_{index}")
+        registry.finish(f"done_{index}", STATUS_COMPLETED, result={"text": "نص" * 40})
+
+    stats = registry.stats()
+    assert stats["size_bytes"] <= 600
+    assert stats["by_status"][STATUS_RUNNING] == 1  # running records are never spilled
+    assert stats["entries"] < 4
+    for index in range(3):
+        assert registry.get(f"done_{index}")["result"] == {"text": "نص" * 40}
+
+def test_spilled_results_round_trip_as_json(tmp_path):
+    """JSON values survive unchanged; other values come back as their str()"""
+    store = SQLiteSpillStore(str(tmp_path / "spill.db"), ttl_seconds=60)
+    finished_at = datetime.datetime(2024, 1, 2, 3, 4, 5)
+    store.put("run", {"status": STATUS_COMPLETED, "result": {"scores": [1, 2.5], "name": "سير",
+                                                               "finished": finished_at}})
+
+    record = store.get("run")
+    assert record["result"]["scores"] == [1, 2.5]
+    assert record["result"]["name"] == "سير"
+    assert record["result"]["finished"] == str(finished_at)
+    assert SQLiteSpillStore(str(tmp_path / "spill.db"), ttl_seconds=60).get("run") == record
+    assert store.get("missing") is None
@@ -0,0 +1,70 @@
+import os
+import time
+
+import pytest
+
+from extraction_cache import ExtractionCache, content_digest
+
+def record_files(directory):
+    return sorted(name for _, _, files in os.walk(directory) for name in files)
+
+def test_records_round_trip_per_kind_and_survive_restart(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    digest = content_digest(b"%PDF same bytes")
+    cache.put(digest, "text", {"text": "نص عربي", "metadata": {"pages": 2}})
+
+    assert cache.get(digest, "text") == {"text": "نص عربي", "metadata": {"pages": 2}}
+    assert cache.get(digest, "pdf_pages") is None
+
+    reopened = ExtractionCache(str(tmp_path))
+    assert reopened.get(digest, "text")["text"] == "نص عربي"
+    assert reopened.stats()["entries"] == 1
+
+def test_get_or_extract_runs_once_and_does_not_store_failures(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    calls = []
+
+    def extract():
+        calls.append(1)
+        return {"text": "مستخرج"}
+
+    assert cache.get_or_extract(b"docx", "text", extract) == {"text": "مستخرج"}
+    assert cache.get_or_extract(b"docx", "text", extract) == {"text": "مستخرج"}
+    assert len(calls) == 1
+
+    def broken():
+        raise ValueError("bad file")
+
+    with pytest.raises(ValueError):
+        cache.get_or_extract(b"other", "text", broken)
+    assert cache.get(content_digest(b"other"), "text") is None
+    assert cache.stats()["hits"] == 1
+
+def test_least_recently_used_records_are_evicted(tmp_path):
+    cache = ExtractionCache(str(tmp_path), compression_level=0)
+    cache.put("a" * 64, "text", {"text": "x" * 1000})
+    size = cache.stats()["size_bytes"]
+    cache.max_bytes = size * 2
+
+    cache.put("b" * 64, "text", {"text": "y" * 1000})
+    time.sleep(0.01)
+    assert cache.get("a" * 64, "text") is not None  # a is now the most recent
+    cache.put("c" * 64, "text", {"text": "z" * 1000})
+
+    assert cache.get("b" * 64, "text") is None
+    assert cache.get("a" * 64, "text") is not None
+    assert cache.stats()["evictions"] == 1
+    assert cache.stats()["size_bytes"] <= cache.max_bytes
+    assert len(record_files(tmp_path)) == 2
+
+def test_corrupt_records_are_dropped(tmp_path):
+    cache = ExtractionCache(str(tmp_path))
+    digest = content_digest(b"file")
+    cache.put(digest, "text", {"text": "ok"})
+    path = cache._path(digest, "text")
+    with open(path, "wb") as f:
+        f.write(b"not zlib")
+
+    assert cache.get(digest, "text") is None
+    assert not os.path.exists(path)
+    assert cache.stats()["entries"] == 0
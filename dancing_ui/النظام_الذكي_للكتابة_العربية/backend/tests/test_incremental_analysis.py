@@ -0,0 +1,58 @@
+import random
+
+import pytest
+
+from incremental_analysis import DocumentOutOfSyncError, IncrementalAnalysisStore, IncrementalDocument
+
+WORDS = ["الكاتب", "يكتب", "روايته", "الطويلة", "في", "المساء", "بهدوء"]
+
+def paragraph(rng):
+    sentences = [" ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 30))) + rng.choice([".", "؟", ""])
+                 for _ in range(rng.randint(0, 3))]
+    return " ".join(sentences)
+
+def totals(document):
+    t = document.totals
+    return (t.word_count, t.total_word_length, t.sentence_count, t.long_sentences, t.paragraph_count,
+            dict(t.word_counts), t.repeated_words)
+
+def test_incremental_totals_match_a_full_reanalysis():
+    rng = random.Random(3)
+    paragraphs = [paragraph(rng) for _ in range(12)]
+    store = IncrementalAnalysisStore()
+    store.load("doc", "\n".join(paragraphs))
+
+    for version in range(1, 60):
+        start = rng.randint(0, len(paragraphs))
+        end = rng.randint(start, min(len(paragraphs), start + 3))
+        new = [paragraph(rng) for _ in range(rng.randint(0, 3))]
+        result = store.apply_changes("doc", [{"start": start, "end": end, "paragraphs": new}],
+                                     expected_version=version)
+        paragraphs[start:end] = new
+        assert sorted(result["changed"]) == list(range(start, start + len(new)))
+
+    assert totals(store.get("doc")) == totals(IncrementalDocument(paragraphs))
+
+def test_changes_in_one_batch_shift_earlier_indices():
+    store = IncrementalAnalysisStore()
+    store.load("doc", "أ\nب\nج\nد")
+
+    result = store.apply_changes("doc", [
+        {"start": 3, "end": 4, "text": "دال"},
+        {"start": 0, "end": 1, "paragraphs": ["ألف", "ألف ثانية"]},
+    ])
+
+    assert sorted(result["changed"]) == [0, 1, 4]
+    assert [metrics.word_count for metrics in result["document"].paragraphs] == [1, 2, 1, 1, 1]
+
+def test_stale_or_invalid_changes_require_a_full_reload():
+    store = IncrementalAnalysisStore()
+    store.load("doc", "نص")
+
+    with pytest.raises(DocumentOutOfSyncError):
+        store.apply_changes("doc", [], expected_version=5)
+    with pytest.raises(ValueError):
+        store.apply_changes("doc", [{"start": 4, "end": 9, "paragraphs": []}])
+    assert store.get("doc") is None
+    with pytest.raises(DocumentOutOfSyncError):
+        store.apply_changes("doc", [])
@@ -0,0 +1,52 @@
+import random
+
+from lexicon_matcher import LexiconMatcher
+
+def naive_finditer(entries, text):
+    """Leftmost-longest scan used as the reference"""
+    position, matches = 0, []
+    keys = sorted(entries, key=len, reverse=True)
+    while position < len(text):
+        key = next((key for key in keys if text.startswith(key, position)), None)
+        if key is None:
+            position += 1
+            continue
+        matches.append((position, position + len(key), key, entries[key]))
+        position += len(key)
+    return matches
+
+def test_longest_entry_wins_at_each_position():
+    matcher = LexiconMatcher({"جميل": "positive", "جميلة جداً": "very_positive", "حزين": "negative"})
+    text = "كانت الليلة جميلة جداً، والفتى جميل لكنه حزين"
+
+    assert list(matcher.finditer(text)) == naive_finditer(matcher.entries, text)
+    assert [match[2] for match in matcher.finditer(text)] == ["جميلة جداً", "جميل", "حزين"]
+    assert matcher.categories(text) == {"positive", "very_positive", "negative"}
+
+def test_replace_is_a_single_pass():
+    """Replacements are not rescanned, unlike chained str.replace calls"""
+    matcher = LexiconMatcher({"قال": "ذكر", "ذكر": "أشار"})
+    assert matcher.replace("قال ثم ذكر") == "ذكر ثم أشار"
+
+def test_random_lexicons_match_the_reference_scan():
+    rng = random.Random(7)
+    alphabet = "ابتثج.*("  # includes regex metacharacters
+    for _ in range(200):
+        entries = {"".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))): f"<{index}>"
+                   for index in range(rng.randint(1, 8))}
+        text = "".join(rng.choice(alphabet + " ") for _ in range(60))
+        matcher = LexiconMatcher(entries)
+        expected = naive_finditer(matcher.entries, text)
+
+        assert list(matcher.finditer(text)) == expected
+        replaced, position = [], 0
+        for start, end, _, value in expected:
+            replaced += [text[position:start], value]
+            position = end
+        assert matcher.replace(text) == "".join(replaced) + text[position:]
+
+def test_empty_lexicon_matches_nothing():
+    matcher = LexiconMatcher({"": "ignored"})
+    assert len(matcher) == 0
+    assert list(matcher.finditer("نص")) == []
+    assert matcher.replace("نص") == "نص"
@@ -0,0 +1,53 @@
+import io
+import json
+import zipfile
+import xml.etree.ElementTree as ET
+
+import pytest
+
+from novel_export import NovelExport, stream_export, write_export
+
+CHAPTERS = [
+    {"title": "البداية", "content": "الفقرة الأولى.\n\nالفقرة الثانية & <رمز>."},
+    "فصل نصي بلا عنوان\x01",
+]
+METADATA = {"title": "رواية الاختبار", "author": "كاتب"}
+
+def _export(include_analysis=False):
+    return NovelExport(chapters=CHAPTERS, metadata=METADATA, include_analysis=include_analysis,
+                       quality_report={"overall_score": 8, "strengths": ["حبكة"]})
+
+def test_stream_export_txt_and_json_round_trip():
+    """Streamed TXT/JSON chunks join into the full document"""
+    text = b"".join(stream_export(_export(), "txt")).decode("utf-8")
+    assert "رواية الاختبار" in text and "الفقرة الثانية & <رمز>." in text
+
+    data = json.loads(b"".join(stream_export(_export(include_analysis=True), "json")))
+    assert data["metadata"] == METADATA
+    assert [c if isinstance(c, str) else c["title"] for c in data["chapters"]] == ["البداية", CHAPTERS[1]]
+
+def test_docx_opens_with_python_docx():
+    """The hand-written WordprocessingML is a valid document with every chapter in order"""
+    docx = pytest.importorskip("docx")
+    buffer = io.BytesIO()
+    write_export(_export(include_analysis=True), "docx", buffer)
+
+    document = docx.Document(io.BytesIO(buffer.getvalue()))
+    text = "\n".join(paragraph.text for paragraph in document.paragraphs)
+    assert text.index("الفصل 1") < text.index("الفقرة الثانية & <رمز>.") < text.index("فصل نصي بلا عنوان")
+    assert "تقرير الجودة والتحليل" in text
+
+def test_epub_structure():
+    """mimetype comes first uncompressed; OPF spine lists every chapter; pages are well-formed XML"""
+    archive = zipfile.ZipFile(io.BytesIO(b"".join(stream_export(_export(), "epub"))))
+    first = archive.infolist()[0]
+    assert first.filename == "mimetype" and first.compress_type == zipfile.ZIP_STORED
+    assert archive.read("mimetype") == b"application/epub+zip"
+
+    ns = {"opf": "http://www.idpf.org/2007/opf"}
+    package = ET.fromstring(archive.read("OEBPS/content.opf"))
+    spine = [item.get("idref") for item in package.find("opf:spine", ns)]
+    assert spine == ["title", "chapter_0001", "chapter_0002"]
+    for name in archive.namelist():
+        if name.endswith(".xhtml"):
+            ET.fromstring(archive.read(name))
@@ -0,0 +1,50 @@
+import threading
+
+import pytest
+
+from request_coalescing import SingleFlight, prompt_fingerprint
+
+def test_fingerprint_ignores_key_order_only():
+    messages = [{"role": "user", "content": "اكتب"}]
+    assert prompt_fingerprint(messages, {"a": 1, "b": 2}) == prompt_fingerprint(messages, {"b": 2, "a": 1})
+    assert prompt_fingerprint(messages, {"a": 1}) != prompt_fingerprint(messages, {"a": 2})
+
+def test_concurrent_identical_calls_share_one_execution():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    calls, results = [], []
+
+    def slow_call():
+        calls.append(1)
+        started.set()
+        release.wait(5)
+        return {"content": "نتيجة"}
+
+    leader = threading.Thread(target=lambda: results.append(flight.do("key", slow_call)))
+    leader.start()
+    started.wait(5)
+    followers = [threading.Thread(target=lambda: results.append(flight.do("key", slow_call)))
+                 for _ in range(4)]
+    for thread in followers:
+        thread.start()
+    while flight.coalesced < 4:
+        threading.Event().wait(0.005)
+    release.set()
+    for thread in [leader] + followers:
+        thread.join()
+
+    assert len(calls) == 1
+    assert results == [{"content": "نتيجة"}] * 5
+    assert len({id(result) for result in results}) == 5  # every caller gets its own copy
+    assert flight.stats() == {"in_flight": 0, "executed": 1, "coalesced": 4}
+
+def test_errors_reach_every_waiter_and_are_not_remembered():
+    flight = SingleFlight()
+
+    def failing():
+        raise ValueError("rate limited")
+
+    with pytest.raises(ValueError):
+        flight.do("key", failing)
+    assert flight.do("key", lambda: "ok") == "ok"
+    assert flight.stats()["executed"] == 2
@@ -0,0 +1,57 @@
+import hashlib
+import io
+import os
+
+import pytest
+
+from upload_pipeline import UploadTooLargeError, spool_upload
+
+class CountingStream(io.BytesIO):
+    def __init__(self, data):
+        super().__init__(data)
+        self.reads = 0
+
+    def read(self, size=-1):
+        self.reads += 1
+        return super().read(size)
+
+def test_small_uploads_stay_in_memory():
+    data = "نص قصير".encode("utf-8")
+    with spool_upload(io.BytesIO(data), max_bytes=1024, memory_limit=512, chunk_size=4) as upload:
+        assert not upload.on_disk
+        assert upload.size == len(data)
+        assert upload.digest == hashlib.sha256(data).hexdigest()
+        assert upload.source() == data
+        assert bytes(upload.mmap()) == data
+
+def test_large_uploads_spill_to_disk_and_are_removed_on_close(tmp_path):
+    data = os.urandom(10_000)
+    upload = spool_upload(io.BytesIO(data), max_bytes=20_000, memory_limit=3_000,
+                          spool_dir=str(tmp_path), chunk_size=1024)
+
+    assert upload.on_disk and upload.source() == upload.path
+    assert upload.digest == hashlib.sha256(data).hexdigest()
+    with upload.open() as f:
+        assert f.read() == data
+    view = upload.mmap()
+    assert view[:] == data
+    view.close()
+    assert upload.read_bytes() == data
+
+    upload.close()
+    assert os.listdir(tmp_path) == []
+
+def test_declared_size_is_rejected_before_reading():
+    stream = CountingStream(b"x" * 10)
+    with pytest.raises(UploadTooLargeError):
+        spool_upload(stream, max_bytes=100, declared_size=101)
+    assert stream.reads == 0
+
+def test_oversized_stream_stops_early_and_leaves_no_temp_file(tmp_path):
+    """A missing or false Content-Length is caught while copying"""
+    stream = CountingStream(b"x" * 100_000)
+    with pytest.raises(UploadTooLargeError):
+        spool_upload(stream, max_bytes=5_000, memory_limit=1_000, spool_dir=str(tmp_path), chunk_size=1_000)
+
+    assert stream.reads == 6
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,94 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from workflow_scheduler import (
+    DAGScheduler, WorkflowCycleError, build_dependencies, execute_workflow_parallel, topological_order
+)
+
+def node(node_id, inputs=(), outputs=()):
+    return SimpleNamespace(id=node_id, name=node_id, inputs=list(inputs), outputs=list(outputs))
+
+def test_dependencies_from_ids_outputs_and_shared_keys():
+    nodes = [
+        node("source", outputs=["draft", "review"]),  # "review" names a node
+        node("edit", inputs=["draft"], outputs=["edited"]),  # shared data key
+        node("review", inputs=["edit"]),  # node id
+        node("loner", inputs=["unknown"]),
+    ]
+
+    assert build_dependencies(nodes) == {
+        "source": set(),
+        "edit": {"source"},
+        "review": {"source", "edit"},
+        "loner": set(),
+    }
+
+def test_topological_order_is_stable_and_rejects_cycles():
+    nodes = [node("c", inputs=["a"]), node("b"), node("a"), node("d", inputs=["c", "b"])]
+    assert topological_order(nodes, build_dependencies(nodes)) == ["b", "a", "c", "d"]
+
+    cyclic = [node("a", inputs=["c"]), node("b", inputs=["a"]), node("c", inputs=["b"]), node("free")]
+    with pytest.raises(WorkflowCycleError):
+        topological_order(cyclic, build_dependencies(cyclic))
+
+def test_scheduler_runs_branches_concurrently_and_skips_after_failure():
+    """Independent branches overlap; only nodes downstream of a failure are skipped"""
+    nodes = [
+        node("root"),
+        node("left", inputs=["root"]),
+        node("right", inputs=["root"]),
+        node("broken", inputs=["root"]),
+        node("after_broken", inputs=["broken"]),
+        node("join", inputs=["left", "right"]),
+    ]
+    running, peak = set(), []
+
+    async def run_node(current, context):
+        running.add(current.id)
+        peak.append(len(running))
+        await asyncio.sleep(0.02)
+        running.discard(current.id)
+        if current.id == "broken":
+            raise RuntimeError("boom")
+        return sorted(key for key in context if key != "seed")
+
+    progress = []
+    result = asyncio.run(DAGScheduler(max_concurrency=2).run(
+        SimpleNamespace(id="wf", nodes=nodes), {"seed": 1}, run_node, progress.append
+    ))
+
+    assert max(peak) == 2
+    assert result["status"] == "failed"
+    assert result["failed_nodes"] == ["broken"]
+    assert result["skipped_nodes"] == ["after_broken"]
+    assert result["results"]["join"] == ["left", "right"]
+    assert result["critical_path"][0] == "root" and result["critical_path"][-1] == "join"
+    assert progress[-1].progress_percentage == 100.0
+
+def test_execute_workflow_parallel_falls_back_without_execute_node():
+    class SequentialEngine:
+        async def execute_workflow(self, workflow, initial_data, progress_callback=None, **kwargs):
+            return ("sequential", kwargs)
+
+    workflow = SimpleNamespace(id="wf", nodes=[node("a")])
+    assert asyncio.run(execute_workflow_parallel(SequentialEngine(), workflow, {}, user_id="u")) == \
+        ("sequential", {"user_id": "u"})
+
+def test_execute_workflow_parallel_uses_execute_node_when_available():
+    class NodeEngine:
+        def __init__(self):
+            self.calls = []
+
+        async def execute_node(self, node, context, **kwargs):
+            self.calls.append((node.id, kwargs))
+            return node.id
+
+    engine = NodeEngine()
+    workflow = SimpleNamespace(id="wf", nodes=[node("a"), node("b", inputs=["a"])])
+    result = asyncio.run(execute_workflow_parallel(engine, workflow, {}, max_concurrency=2, user_id="u"))
+
+    assert result["status"] == "completed"
+    assert result["results"] == {"a": "a", "b": "b"}
+    assert engine.calls == [("a", {"user_id": "u"}), ("b", {"user_id": "u"})]
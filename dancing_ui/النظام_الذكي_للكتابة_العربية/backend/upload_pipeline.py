@@ -0,0 +1,119 @@
+"""
+استقبال الملفات المرفوعة على دفعات
+يُنسخ الملف على دفعات صغيرة مع حساب بصمته أثناء النسخ ورفض الملف فور تجاوزه الحد،
+ويبقى في الذاكرة إن كان صغيراً وإلا يُنقل إلى ملف مؤقت على القرص.
+المحللات تأخذ مقبض ملف أو مساراً بدلاً من نسخ كاملة من البايتات،
+فيبقى استهلاك الذاكرة لكل رفع ثابتاً مهما كبر الملف.
+"""
+
+import hashlib
+import io
+import mmap
+import os
+import tempfile
+from typing import BinaryIO, Optional, Union
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """الملف المرفوع أكبر من الحد المسموح"""
+
+
+class SpooledUpload:
+    """ملف مرفوع منسوخ مع بصمته وحجمه"""
+
+    def __init__(self, data: Optional[bytes], path: Optional[str], size: int, digest: str):
+        self._data = data
+        self.path = path
+        self.size = size
+        self.digest = digest
+
+    @property
+    def on_disk(self) -> bool:
+        return self.path is not None
+
+    def open(self) -> BinaryIO:
+        """مقبض قراءة جديد من بداية الملف"""
+        if self.path is not None:
+            return open(self.path, 'rb')
+        return io.BytesIO(self._data)
+
+    def mmap(self) -> Union[mmap.mmap, memoryview]:
+        """عرض للقراءة فقط دون نسخ (ذاكرة مربوطة بالملف إن كان على القرص)"""
+        if self.path is None:
+            return memoryview(self._data)
+        with open(self.path, 'rb') as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def source(self) -> Union[str, bytes]:
+        """مسار الملف أو بياناته (للمحللات التي تقبل أحدهما، مثل محرك PDF)"""
+        return self.path if self.path is not None else self._data
+
+    def read_bytes(self) -> bytes:
+        """البيانات كاملة في الذاكرة (للواجهات التي لا تقبل إلا bytes)"""
+        if self.path is None:
+            return self._data
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+    def close(self) -> None:
+        self._data = None
+        if self.path is not None:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+            self.path = None
+
+    def __enter__(self) -> "SpooledUpload":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def spool_upload(stream: BinaryIO, max_bytes: int, memory_limit: int = 4 * 1024 * 1024,
+                 declared_size: Optional[int] = None, spool_dir: Optional[str] = None,
+                 chunk_size: int = CHUNK_SIZE) -> SpooledUpload:
+    """نسخ الملف المرفوع على دفعات مع البصمة والتحقق من الحجم
+
+    declared_size (من ترويسة Content-Length مثلاً) يسمح بالرفض قبل قراءة أي بايت.
+    """
+    if declared_size is not None and declared_size > max_bytes:
+        raise UploadTooLargeError(f"حجم الملف {declared_size} بايت يتجاوز الحد {max_bytes} بايت")
+
+    digest = hashlib.sha256()
+    buffer: Union[io.BytesIO, BinaryIO] = io.BytesIO()
+    path = None
+    size = 0
+    try:
+        while True:
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_bytes:
+                raise UploadTooLargeError(f"حجم الملف يتجاوز الحد {max_bytes} بايت")
+            digest.update(chunk)
+
+            if path is None and size > memory_limit:
+                # تجاوز حد الذاكرة: نقل ما سبق إلى ملف مؤقت ومتابعة الكتابة فيه
+                spilled = tempfile.NamedTemporaryFile(prefix='upload_', dir=spool_dir, delete=False)
+                path = spilled.name
+                spilled.write(buffer.getbuffer())
+                buffer = spilled
+            buffer.write(chunk)
+    except BaseException:
+        buffer.close()
+        if path is not None:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+        raise
+
+    if path is not None:
+        buffer.close()
+        return SpooledUpload(None, path, size, digest.hexdigest())
+    return SpooledUpload(buffer.getvalue(), None, size, digest.hexdigest())
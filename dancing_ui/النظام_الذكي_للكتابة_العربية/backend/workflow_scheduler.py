@@ -0,0 +1,285 @@
+"""
+جدولة عقد سير العمل كرسم بياني موجّه غير دوري (DAG)
+- ترتيب طوبولوجي للعقد بناءً على المدخلات والمخرجات
+- تشغيل الفروع المستقلة بالتوازي مع حد أقصى للتزامن في كل سير عمل
+- تسجيل زمن كل عقدة وحساب المسار الحرج لإظهاره عبر progress_callback
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+NodeRunner = Callable[[Any, Dict[str, Any]], Awaitable[Any]]
+
+
+class WorkflowCycleError(ValueError):
+    """سير العمل يحتوي على حلقة ولا يمكن ترتيبه"""
+
+
+@dataclass
+class NodeTiming:
+    """توقيت تنفيذ عقدة واحدة"""
+    node_id: str
+    name: str
+    status: str = "pending"
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> Optional[float]:
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "node_id": self.node_id,
+            "name": self.name,
+            "status": self.status,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": self.duration,
+            "error": self.error
+        }
+
+
+@dataclass
+class DAGProgress:
+    """حالة التقدم بنفس الحقول التي يقرأها مسار /api/workflows/progress"""
+    total_nodes: int
+    completed_nodes: int = 0
+    failed_nodes: int = 0
+    skipped_nodes: int = 0
+    current_node: Optional[str] = None
+    running_nodes: List[str] = field(default_factory=list)
+    status: str = "running"
+    logs: List[str] = field(default_factory=list)
+    node_timings: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    critical_path: List[str] = field(default_factory=list)
+
+    @property
+    def progress_percentage(self) -> float:
+        if not self.total_nodes:
+            return 100.0
+        finished = self.completed_nodes + self.failed_nodes + self.skipped_nodes
+        return round(finished / self.total_nodes * 100, 1)
+
+
+def build_dependencies(nodes: List[Any]) -> Dict[str, Set[str]]:
+    """استخراج اعتماديات كل عقدة
+
+    تعتمد العقدة B على العقدة A إذا:
+    - ذُكر معرف A في مدخلات B، أو ذُكر معرف B في مخرجات A
+    - أو تشاركت مخرجات A ومدخلات B اسم مفتاح بيانات
+    """
+    ids = {node.id for node in nodes}
+    producers: Dict[str, Set[str]] = {}
+    for node in nodes:
+        for key in node.outputs or []:
+            if key not in ids:
+                producers.setdefault(key, set()).add(node.id)
+
+    dependencies: Dict[str, Set[str]] = {node.id: set() for node in nodes}
+    for node in nodes:
+        for key in node.inputs or []:
+            if key in ids:
+                dependencies[node.id].add(key)
+            else:
+                dependencies[node.id].update(producers.get(key, set()))
+        for key in node.outputs or []:
+            if key in ids:
+                dependencies[key].add(node.id)
+
+    for node_id, deps in dependencies.items():
+        deps.discard(node_id)
+    return dependencies
+
+
+def topological_order(nodes: List[Any], dependencies: Dict[str, Set[str]]) -> List[str]:
+    """ترتيب طوبولوجي ثابت (يحافظ على ترتيب العقد الأصلي عند التساوي)"""
+    remaining = {node_id: set(deps) for node_id, deps in dependencies.items()}
+    order: List[str] = []
+    while remaining:
+        ready = [node.id for node in nodes if node.id in remaining and not remaining[node.id]]
+        if not ready:
+            raise WorkflowCycleError(f"سير العمل يحتوي على حلقة بين العقد: {sorted(remaining)}")
+        for node_id in ready:
+            del remaining[node_id]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+        order.extend(ready)
+    return order
+
+
+def critical_path(order: List[str], dependencies: Dict[str, Set[str]], timings: Dict[str, NodeTiming]) -> List[str]:
+    """أطول مسار زمني عبر الرسم البياني (العقد التي حددت زمن التنفيذ الكلي)"""
+    longest: Dict[str, float] = {}
+    previous: Dict[str, Optional[str]] = {}
+    for node_id in order:
+        best_dep = max(dependencies[node_id], key=lambda dep: longest[dep], default=None)
+        base = longest[best_dep] if best_dep is not None else 0.0
+        longest[node_id] = base + (timings[node_id].duration or 0.0)
+        previous[node_id] = best_dep
+
+    if not longest:
+        return []
+    node_id: Optional[str] = max(longest, key=longest.get)
+    path = []
+    while node_id is not None:
+        path.append(node_id)
+        node_id = previous[node_id]
+    return list(reversed(path))
+
+
+class DAGScheduler:
+    """تشغيل عقد سير العمل بالتوازي حسب اعتمادياتها"""
+
+    def __init__(self, max_concurrency: int = 3):
+        self.max_concurrency = max(1, max_concurrency)
+
+    async def run(
+        self,
+        workflow: Any,
+        initial_data: Dict[str, Any],
+        run_node: NodeRunner,
+        progress_callback: Optional[Callable[[DAGProgress], None]] = None
+    ) -> Dict[str, Any]:
+        nodes = list(workflow.nodes)
+        nodes_by_id = {node.id: node for node in nodes}
+        dependencies = build_dependencies(nodes)
+        order = topological_order(nodes, dependencies)
+
+        dependents: Dict[str, Set[str]] = {node_id: set() for node_id in order}
+        for node_id, deps in dependencies.items():
+            for dep in deps:
+                dependents[dep].add(node_id)
+
+        timings = {node.id: NodeTiming(node.id, getattr(node, 'name', node.id)) for node in nodes}
+        progress = DAGProgress(total_nodes=len(nodes))
+        results: Dict[str, Any] = {}
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        workflow_started = time.perf_counter()
+
+        def report(message: Optional[str] = None):
+            if message:
+                progress.logs.append(message)
+            progress.node_timings = {node_id: timing.to_dict() for node_id, timing in timings.items()}
+            if progress_callback:
+                progress_callback(progress)
+
+        async def execute(node_id: str):
+            node = nodes_by_id[node_id]
+            async with semaphore:
+                timing = timings[node_id]
+                timing.status = "running"
+                timing.started_at = time.perf_counter() - workflow_started
+                progress.running_nodes.append(node_id)
+                progress.current_node = node_id
+                report(f"بدء العقدة: {timing.name}")
+
+                # كل عقدة ترى البيانات الأولية ونتائج العقد التي تعتمد عليها
+                context = dict(initial_data)
+                context.update({dep: results[dep] for dep in dependencies[node_id]})
+                try:
+                    results[node_id] = await run_node(node, context)
+                    timing.status = "completed"
+                    progress.completed_nodes += 1
+                finally:
+                    timing.finished_at = time.perf_counter() - workflow_started
+                    progress.running_nodes.remove(node_id)
+                    progress.current_node = progress.running_nodes[-1] if progress.running_nodes else None
+
+        in_degree = {node_id: len(deps) for node_id, deps in dependencies.items()}
+        running: Dict[asyncio.Task, str] = {}
+        skipped: Set[str] = set()
+
+        def launch_ready(candidates):
+            for node_id in candidates:
+                if in_degree[node_id] == 0 and node_id not in skipped:
+                    running[asyncio.ensure_future(execute(node_id))] = node_id
+
+        def skip_downstream(node_id: str):
+            for child in dependents[node_id]:
+                if child not in skipped:
+                    skipped.add(child)
+                    timings[child].status = "skipped"
+                    progress.skipped_nodes += 1
+                    skip_downstream(child)
+
+        report(f"بدء سير العمل: {len(nodes)} عقدة، حد التزامن {self.max_concurrency}")
+        launch_ready(order)
+
+        try:
+            while running:
+                done, _ = await asyncio.wait(running, return_when=asyncio.FIRST_COMPLETED)
+                newly_ready = []
+                for task in done:
+                    node_id = running.pop(task)
+                    error = task.exception()
+                    if error is not None:
+                        timings[node_id].status = "failed"
+                        timings[node_id].error = str(error)
+                        progress.failed_nodes += 1
+                        skip_downstream(node_id)
+                        report(f"فشل العقدة {timings[node_id].name}: {error}")
+                        continue
+
+                    report(f"اكتملت العقدة: {timings[node_id].name} ({timings[node_id].duration:.2f} ث)")
+                    for child in dependents[node_id]:
+                        in_degree[child] -= 1
+                        # مرة واحدة فقط حتى لو اكتمل أكثر من أب في الدفعة نفسها
+                        if in_degree[child] == 0:
+                            newly_ready.append(child)
+                launch_ready(newly_ready)
+        except asyncio.CancelledError:
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
+            raise
+
+        progress.status = "failed" if progress.failed_nodes else "completed"
+        progress.critical_path = critical_path(
+            [node_id for node_id in order if timings[node_id].duration is not None],
+            {node_id: {dep for dep in deps if timings[dep].duration is not None} for node_id, deps in dependencies.items()},
+            timings
+        )
+        report(f"انتهى سير العمل في {time.perf_counter() - workflow_started:.2f} ث")
+
+        return {
+            "workflow_id": getattr(workflow, 'id', None),
+            "status": progress.status,
+            "results": results,
+            "failed_nodes": [node_id for node_id, t in timings.items() if t.status == "failed"],
+            "skipped_nodes": sorted(skipped),
+            "node_timings": progress.node_timings,
+            "critical_path": progress.critical_path,
+            "total_duration": time.perf_counter() - workflow_started
+        }
+
+
+async def execute_workflow_parallel(
+    engine: Any,
+    workflow: Any,
+    initial_data: Dict[str, Any],
+    progress_callback: Optional[Callable[[Any], None]] = None,
+    max_concurrency: int = 3,
+    **kwargs
+) -> Any:
+    """تشغيل سير العمل بالتوازي عبر دالة تنفيذ العقدة في المحرك
+
+    يُستخدم execute_node(node, context, **kwargs) من المحرك إن وُجدت،
+    وإلا يعود التنفيذ إلى execute_workflow التسلسلي في المحرك.
+    """
+    execute_node = getattr(engine, 'execute_node', None)
+    if execute_node is None:
+        return await engine.execute_workflow(workflow, initial_data, progress_callback, **kwargs)
+
+    scheduler = DAGScheduler(max_concurrency=max_concurrency)
+    return await scheduler.run(
+        workflow,
+        initial_data,
+        lambda node, context: execute_node(node, context, **kwargs),
+        progress_callback
+    )